@@ -0,0 +1,31 @@
+"""
+app/api/v1/dependencies.py
+
+Shared request dependencies.
+
+Admin-only features (profiling, diagnostics) are gated by a static token
+sent in the X-Admin-Token header. With ADMIN_TOKEN unset they are
+disabled for everyone.
+"""
+
+import hmac
+
+from fastapi import HTTPException, Request
+
+from config import get_settings
+
+settings = get_settings()
+
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+
+def is_admin(request: Request) -> bool:
+    token = request.headers.get(ADMIN_TOKEN_HEADER)
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+
+async def require_admin(request: Request) -> None:
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.api.v1.dependencies import require_admin
+from app.services.utils.slow_query_log import slow_query_log
+from config import get_settings
+
+settings = get_settings()
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+# -----------------------------------------------------------
+# SLOW-QUERY LOG (this worker's ring buffer, newest first)
+# -----------------------------------------------------------
+@router.get("/slow-queries")
+async def get_slow_queries(limit: int = Query(50, ge=1, le=1000)):
+    entries = slow_query_log.entries(limit)
+    return {
+        "status": "success",
+        "data": {
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "capacity": settings.SLOW_QUERY_LOG_SIZE,
+            "count": len(entries),
+            "entries": entries
+        }
+    }
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    slow_query_log.clear()
+    return {"status": "success"}
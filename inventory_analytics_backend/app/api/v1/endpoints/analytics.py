@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from datetime import datetime, timedelta
+from typing import Literal
 
-from app.database.connection import get_db
+from app.database.connection import SessionLocal, ThreadedSession, get_threaded_db
+from config import get_settings
 
 # Import actual classes (NOT modules)
 from app.services.analytics.revenue_calculator import RevenueCalculator
@@ -16,11 +19,21 @@ from app.services.analytics.avg_product_age import ProductAgeAnalyzer
 from app.services.analytics.inventory_vs_cashflow import CashFlowAnalyzer
 from app.services.analytics.purchase_price_variance import PriceVarianceAnalyzer
 from app.services.analytics.credit_health import CreditHealthAnalyzer
-from app.services.analytics.forecasting import ForecastingEngine
+from app.services.analytics.forecasting import ForecastingEngine, ForecastModel
+from app.services.analytics.forecast_result_loader import forecast_store
+from app.services.analytics.hierarchical_forecast import (
+    HierarchicalForecaster, HierarchyLevel, ReconciliationMethod
+)
 from app.services.analytics.actionable_recommendations import SuggestionEngine
 
 # NEW IMPORT ↓↓↓
 from app.services.analytics.dynamic_pricing import DynamicPricingEngine
+from app.services.analytics.dashboard import DashboardService
+from app.services.utils.columnar import chart_response
+from app.services.utils.elasticity import ElasticityStore
+from app.services.utils.pagination import (
+    DEFAULT_PAGE_SIZE, clamp_limit, decode_cursor, stream_ndjson, stream_pages, ndjson_response
+)
 
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
@@ -31,7 +44,7 @@ router = APIRouter(prefix="/analytics", tags=["Analytics"])
 # -----------------------------------------------------------
 @router.get("/revenue")
 async def get_total_revenue(
-    db: Session = Depends(get_db),
+    db: ThreadedSession = Depends(get_threaded_db),
     start_date: datetime = None,
     end_date: datetime = None
 ):
@@ -40,7 +53,7 @@ async def get_total_revenue(
     if not end_date:
         end_date = datetime.now()
 
-    result = RevenueCalculator.calculate_total_revenue(db, start_date, end_date)
+    result = await db.run_sync(RevenueCalculator.calculate_total_revenue, start_date, end_date)
     return {"status": "success", "data": result}
 
 
@@ -49,11 +62,11 @@ async def get_total_revenue(
 # -----------------------------------------------------------
 @router.get("/profit")
 async def get_profit_margin(
-    db: Session = Depends(get_db),
+    db: ThreadedSession = Depends(get_threaded_db),
     start_date: datetime = None,
     end_date: datetime = None
 ):
-    result = ProfitCalculator.calculate_profit_metrics(db, start_date, end_date)
+    result = await db.run_sync(ProfitCalculator.calculate_profit_metrics, start_date, end_date)
     return {"status": "success", "data": result}
 
 
@@ -61,17 +74,47 @@ async def get_profit_margin(
 # 3. CURRENT INVENTORY VALUE
 # -----------------------------------------------------------
 @router.get("/inventory-value")
-async def get_inventory_value(db: Session = Depends(get_db)):
-    result = InventoryValueCalculator.calculate_current_inventory_value(db)
+async def get_inventory_value(db: ThreadedSession = Depends(get_threaded_db)):
+    result = await db.run_sync(InventoryValueCalculator.calculate_current_inventory_value)
     return {"status": "success", "data": result}
 
 
+@router.get("/inventory-value/products")
+async def get_inventory_value_products(
+    db: ThreadedSession = Depends(get_threaded_db),
+    category: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Per-product inventory values, keyset-paginated (or streamed as NDJSON)."""
+    after = decode_cursor(cursor, (str, str))  # (category, sku_id)
+    if format == "ndjson":
+        return ndjson_response(stream_ndjson(
+            InventoryValueCalculator.inventory_products_query(category, after),
+            InventoryValueCalculator.inventory_product_row
+        ))
+
+    page = await db.run_sync(
+        InventoryValueCalculator.get_inventory_products_page, clamp_limit(limit), after, category
+    )
+    return {"status": "success", "data": page["items"], "next_cursor": page["next_cursor"]}
+
+
 # -----------------------------------------------------------
 # 4. SALES TREND
 # -----------------------------------------------------------
 @router.get("/sales-trend")
-async def get_sales_trend(db: Session = Depends(get_db), days: int = 30):
-    result = SalesTrendAnalyzer.calculate_sales_trend(db, days)
+async def get_sales_trend(
+    db: ThreadedSession = Depends(get_threaded_db),
+    days: int = 30,
+    format: Literal["json", "columnar", "arrow"] = "json"
+):
+    if format != "json":
+        result = await db.run_sync(SalesTrendAnalyzer.calculate_sales_trend, days, True)
+        return chart_response(result, format, series="daily_data")
+
+    result = await db.run_sync(SalesTrendAnalyzer.calculate_sales_trend, days)
     return {"status": "success", "data": result}
 
 
@@ -80,11 +123,11 @@ async def get_sales_trend(db: Session = Depends(get_db), days: int = 30):
 # -----------------------------------------------------------
 @router.get("/category-revenue")
 async def get_category_revenue(
-    db: Session = Depends(get_db),
+    db: ThreadedSession = Depends(get_threaded_db),
     start_date: datetime = None,
     end_date: datetime = None
 ):
-    result = CategoryRevenueAnalyzer.calculate_category_revenue(db, start_date, end_date)
+    result = await db.run_sync(CategoryRevenueAnalyzer.calculate_category_revenue, start_date, end_date)
     return {"status": "success", "data": result}
 
 
@@ -92,9 +135,9 @@ async def get_category_revenue(
 # 6. TOP & BOTTOM PERFORMERS
 # -----------------------------------------------------------
 @router.get("/performers")
-async def get_performers(db: Session = Depends(get_db), limit: int = 10):
-    best = PerformanceAnalyzer.get_best_performers(db, limit)
-    worst = PerformanceAnalyzer.get_worst_performers(db, limit)
+async def get_performers(db: ThreadedSession = Depends(get_threaded_db), limit: int = 10):
+    best = await db.run_sync(PerformanceAnalyzer.get_best_performers, limit)
+    worst = await db.run_sync(PerformanceAnalyzer.get_worst_performers, limit)
     return {
         "status": "success",
         "data": {
@@ -108,26 +151,70 @@ async def get_performers(db: Session = Depends(get_db), limit: int = 10):
 # 7. STOCK OUT ALERTS
 # -----------------------------------------------------------
 @router.get("/stock-alerts")
-async def get_stock_alerts(db: Session = Depends(get_db)):
-    alerts = StockAlertSystem.get_stockout_alerts(db)
+async def get_stock_alerts(db: ThreadedSession = Depends(get_threaded_db)):
+    alerts = await db.run_sync(StockAlertSystem.get_stockout_alerts)
     return {"status": "success", "data": alerts}
 
 
+@router.get("/stockout-risk")
+async def get_stockout_risk(
+    db: ThreadedSession = Depends(get_threaded_db),
+    horizon_days: int = Query(14, ge=1, le=365),
+    paths: int = Query(None, ge=1, le=100_000),
+    seed: int = 0
+):
+    """Monte Carlo stockout probability and expected days of cover per SKU."""
+    result = await db.run_sync(StockAlertSystem.get_stockout_risk, horizon_days, paths, seed)
+    return {
+        "status": "success",
+        "data": result,
+        "meta": {"horizon_days": horizon_days, "paths": paths or get_settings().MONTE_CARLO_PATHS, "seed": seed}
+    }
+
+
 # -----------------------------------------------------------
 # 8. AVERAGE PRODUCT AGE
 # -----------------------------------------------------------
 @router.get("/product-age")
-async def get_product_age(db: Session = Depends(get_db)):
-    result = ProductAgeAnalyzer.calculate_average_product_age(db)
+async def get_product_age(db: ThreadedSession = Depends(get_threaded_db)):
+    result = await db.run_sync(ProductAgeAnalyzer.calculate_average_product_age)
     return {"status": "success", "data": result}
 
 
+@router.get("/product-age/products")
+async def get_product_age_products(
+    db: ThreadedSession = Depends(get_threaded_db),
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """products_by_age (oldest first), keyset-paginated (or streamed as NDJSON)."""
+    after = decode_cursor(cursor, (datetime, str))  # (first_receipt_date, sku_id)
+    if format == "ndjson":
+        today = datetime.utcnow()
+        return ndjson_response(stream_ndjson(
+            ProductAgeAnalyzer.products_by_age_query(after),
+            lambda row: ProductAgeAnalyzer.product_age_row(row, today)
+        ))
+
+    page = await db.run_sync(ProductAgeAnalyzer.get_products_by_age_page, clamp_limit(limit), after)
+    return {"status": "success", "data": page["items"], "next_cursor": page["next_cursor"]}
+
+
 # -----------------------------------------------------------
 # 9. INVENTORY VALUE VS CASH OUTFLOW
 # -----------------------------------------------------------
 @router.get("/cash-flow")
-async def get_cash_flow(db: Session = Depends(get_db), days: int = 30):
-    result = CashFlowAnalyzer.analyze_cash_flow(db, days)
+async def get_cash_flow(
+    db: ThreadedSession = Depends(get_threaded_db),
+    days: int = 30,
+    format: Literal["json", "columnar", "arrow"] = "json"
+):
+    if format != "json":
+        result = await db.run_sync(CashFlowAnalyzer.analyze_cash_flow, days, True)
+        return chart_response(result, format, series="daily_data")
+
+    result = await db.run_sync(CashFlowAnalyzer.analyze_cash_flow, days)
     return {"status": "success", "data": result}
 
 
@@ -135,8 +222,8 @@ async def get_cash_flow(db: Session = Depends(get_db), days: int = 30):
 # 10. PURCHASE PRICE VARIANCE
 # -----------------------------------------------------------
 @router.get("/price-variance")
-async def get_price_variance(db: Session = Depends(get_db)):
-    result = PriceVarianceAnalyzer.calculate_price_variance(db)
+async def get_price_variance(db: ThreadedSession = Depends(get_threaded_db)):
+    result = await db.run_sync(PriceVarianceAnalyzer.calculate_price_variance)
     return {"status": "success", "data": result}
 
 
@@ -144,8 +231,8 @@ async def get_price_variance(db: Session = Depends(get_db)):
 # 11. CREDIT HEALTH
 # -----------------------------------------------------------
 @router.get("/credit-health")
-async def get_credit_health(db: Session = Depends(get_db)):
-    result = CreditHealthAnalyzer.analyze_credit_health(db)
+async def get_credit_health(db: ThreadedSession = Depends(get_threaded_db)):
+    result = await db.run_sync(CreditHealthAnalyzer.analyze_credit_health)
     return {"status": "success", "data": result}
 
 
@@ -154,58 +241,139 @@ async def get_credit_health(db: Session = Depends(get_db)):
 # -----------------------------------------------------------
 @router.get("/forecast")
 async def get_forecast(
-    db: Session = Depends(get_db),
-    days: int = 30,
-    sku_id: str = None
+    db: ThreadedSession = Depends(get_threaded_db),
+    days: int = Query(30, ge=1),
+    sku_id: str = None,
+    model: ForecastModel = "moving_average",
+    format: Literal["json", "columnar", "arrow"] = "json"
 ):
+    # Precomputed run (scripts/build_forecasts.py) when it is fresh, long enough and the same model
+    run = forecast_store.usable_run(days, model)
+
+    if format != "json":
+        if run is not None and not sku_id:
+            return chart_response(run.forecast_columns(days), format, series="forecasts")
+        result = await db.run_sync(ForecastingEngine.forecast_columns, days, sku_id, model)
+        return chart_response(result, format, series="forecasts")
+
+    if run is not None:
+        result = run.forecast_sku(sku_id, days) if sku_id else run.forecast_all(days)
+        if result is not None:
+            return {"status": "success", "data": result}
+
     if sku_id:
-        result = ForecastingEngine.forecast_sku(db, sku_id, days)
+        result = await db.run_sync(ForecastingEngine.forecast_sku, sku_id, days, model)
     else:
-        result = ForecastingEngine.forecast_all_products(db, days)
+        result = await db.run_sync(ForecastingEngine.forecast_all_products, days, model)
+    return {"status": "success", "data": result}
+
+
+@router.get("/forecast/hierarchy")
+async def get_hierarchical_forecast(
+    db: ThreadedSession = Depends(get_threaded_db),
+    days: int = Query(30, ge=1),
+    level: HierarchyLevel = "category",
+    model: ForecastModel = "moving_average",
+    method: ReconciliationMethod = "bottom_up"
+):
+    """Reconciled forecasts for one level of total → category → sub_category → SKU."""
+    result = await db.run_sync(HierarchicalForecaster.forecast, days, level, model, method)
     return {"status": "success", "data": result}
 
 
+@router.get("/forecast/category")
+async def get_category_forecast(category: str, days: int = Query(30, ge=1)):
+    """Category totals from the precomputed forecast run (404 without one)."""
+    run = forecast_store.usable_run(days)
+    result = run.forecast_category(category, days) if run is not None else None
+    if result is None:
+        raise HTTPException(status_code=404, detail="No precomputed forecast for this category/horizon")
+    return {"status": "success", "data": result}
+
+
+@router.get("/forecast/products")
+async def get_forecast_products(
+    db: ThreadedSession = Depends(get_threaded_db),
+    days: int = Query(30, ge=1),
+    model: ForecastModel = "moving_average",
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Forecasts for all SKUs, keyset-paginated by sku_id (or streamed as NDJSON page by page)."""
+    after = decode_cursor(cursor, (str,))  # (sku_id,)
+    limit = clamp_limit(limit)
+    if format == "ndjson":
+        return ndjson_response(stream_pages(
+            lambda session, page_after: ForecastingEngine.forecast_products_page(
+                session, limit, page_after, days, model
+            ),
+            SessionLocal,
+            (str,),
+            after
+        ))
+
+    page = await db.run_sync(ForecastingEngine.forecast_products_page, limit, after, days, model)
+    return {"status": "success", "data": page["items"], "next_cursor": page["next_cursor"]}
+
+
 # -----------------------------------------------------------
 # 13. ACTIONABLE SUGGESTIONS
 # -----------------------------------------------------------
 @router.get("/suggestions")
-async def get_suggestions(db: Session = Depends(get_db)):
-    result = SuggestionEngine.generate_suggestions(db)
-    return {"status": "success", "data": result}
+async def get_suggestions(db: ThreadedSession = Depends(get_threaded_db)):
+    timings = {}
+    result = await db.run_sync(SuggestionEngine.generate_suggestions, timings)
+    return {"status": "success", "data": result, "meta": {"rule_timings_ms": timings}}
 
 
 # -----------------------------------------------------------
 # 14. DYNAMIC PRICING (NEW ENDPOINT)
 # -----------------------------------------------------------
+@router.get("/elasticity")
+async def get_elasticity(sku_id: str, db: ThreadedSession = Depends(get_threaded_db)):
+    """Stored elasticity for a SKU, with its brand/category fallbacks and fit diagnostics."""
+    result = await db.run_sync(ElasticityStore.describe, sku_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="SKU not found")
+    return {"status": "success", "data": result}
+
+
 @router.get("/dynamic-pricing")
 async def get_dynamic_pricing(
-    db: Session = Depends(get_db),
+    db: ThreadedSession = Depends(get_threaded_db),
     sku_id: str = None,
+    category: str = None,
     clearance_days: int = 14,
     margin_floor: float = 0.05
 ):
     """
     If sku_id is provided → price recommendation for that SKU.
-    If sku_id is NOT provided → run on worst 10 performers.
+    If category is provided → recommendations for every SKU in the category.
+    Otherwise → run on worst 10 performers.
     """
     if sku_id:
-        result = DynamicPricingEngine.recommend_price(
-            db, sku_id, clearance_days, margin_floor
+        result = await db.run_sync(
+            DynamicPricingEngine.recommend_price, sku_id, clearance_days, margin_floor
         )
         return {"status": "success", "data": result}
 
-    # Auto-run on worst performers
-    worst = PerformanceAnalyzer.get_worst_performers(db, limit=10)
-    output = []
-
-    for item in worst:
-        sku = item.get("sku_id")
-        if sku:
-            res = DynamicPricingEngine.recommend_price(
-                db, sku, clearance_days, margin_floor
+    if category:
+        output = await db.run_sync(
+            lambda session: DynamicPricingEngine.recommend_prices_batch(
+                session, category=category, clearance_days=clearance_days, margin_floor=margin_floor
             )
-            output.append(res)
-
+        )
+        return {"status": "success", "data": output}
+
+    # Auto-run on worst performers (one batch)
+    worst = await db.run_sync(PerformanceAnalyzer.get_worst_performers, limit=10)
+    skus = [item["sku_id"] for item in worst if item.get("sku_id")]
+    output = await db.run_sync(
+        lambda session: DynamicPricingEngine.recommend_prices_batch(
+            session, sku_ids=skus, clearance_days=clearance_days, margin_floor=margin_floor
+        )
+    )
     return {"status": "success", "data": output}
 
 
@@ -213,22 +381,24 @@ async def get_dynamic_pricing(
 # 🧨 UNIFIED DASHBOARD ENDPOINT
 # -----------------------------------------------------------
 @router.get("/dashboard")
-async def get_dashboard(db: Session = Depends(get_db)):
-    return {
-        "status": "success",
-        "data": {
-            "revenue": RevenueCalculator.calculate_total_revenue(
-                db,
-                datetime.now() - timedelta(days=30),
-                datetime.now()
-            ),
-            "profit": ProfitCalculator.calculate_profit_metrics(
-                db,
-                datetime.now() - timedelta(days=30),
-                datetime.now()
-            ),
-            "inventory_value": InventoryValueCalculator.calculate_current_inventory_value(db),
-            "alerts": StockAlertSystem.get_stockout_alerts(db),
-            "suggestions": SuggestionEngine.generate_suggestions(db)
-        }
-    }
+async def get_dashboard(timeout: float = None):
+    """
+    Sections run concurrently, each on its own session. Slow or failing
+    sections are reported in meta.sections and omitted from data
+    (status "partial").
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=30)
+
+    result = await DashboardService.build({
+        "revenue": lambda db: RevenueCalculator.calculate_total_revenue(db, start_date, end_date),
+        "profit": lambda db: ProfitCalculator.calculate_profit_metrics(db, start_date, end_date),
+        "inventory_value": InventoryValueCalculator.calculate_current_inventory_value,
+        "alerts": StockAlertSystem.get_stockout_alerts,
+        "suggestions": SuggestionEngine.generate_suggestions
+    }, timeout)
+
+    if result["status"] != "success":
+        # Partial results must not be served from the response cache
+        return JSONResponse(jsonable_encoder(result), headers={"Cache-Control": "no-store"})
+    return result
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import products, sales, stock, suppliers, analytics
+from app.api.v1.endpoints import products, sales, stock, suppliers, analytics, admin
 
 router = APIRouter()
 
@@ -8,3 +8,4 @@ router.include_router(sales.router)
 router.include_router(stock.router)
 router.include_router(suppliers.router)
 router.include_router(analytics.router)
+router.include_router(admin.router)
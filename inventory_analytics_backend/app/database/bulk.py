@@ -0,0 +1,192 @@
+"""
+app/database/bulk.py
+
+Set-based write paths for the data loaders.
+
+- PostgreSQL: COPY FROM STDIN through the raw psycopg connection
+- SQLite (and anything else): batched executemany of a Core insert()
+- Upserts: INSERT ... ON CONFLICT DO UPDATE, one statement per chunk
+- Idempotent appends: INSERT ... ON CONFLICT DO NOTHING on a unique key
+  (PostgreSQL stages the chunk in a temp table with COPY first), optionally
+  RETURNING the rows that were actually inserted
+- Throughput: ThroughputMeter, whose updates go to the listeners registered
+  with on_throughput() (app/services/utils/metrics.py exports them to
+  Prometheus when it is imported; nothing here needs prometheus_client)
+"""
+
+import io
+import time
+from typing import Callable, List, Optional
+
+import pandas as pd
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+
+# listener(label, rows added, rows/second so far), called by ThroughputMeter.add()
+ThroughputListener = Callable[[str, int, float], None]
+_throughput_listeners: List[ThroughputListener] = []
+
+
+def on_throughput(listener: ThroughputListener) -> ThroughputListener:
+    """Register a listener for every ThroughputMeter update (usable as a decorator)."""
+    if listener not in _throughput_listeners:
+        _throughput_listeners.append(listener)
+    return listener
+
+
+def frame_records(df: pd.DataFrame) -> List[dict]:
+    """DataFrame -> list of dicts with NaN/NaT turned into None."""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _copy_frame(conn: Connection, table_name: str, df: pd.DataFrame) -> None:
+    """Stream a frame into PostgreSQL with COPY ... FROM STDIN (CSV)."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+    columns = ", ".join(f'"{c}"' for c in df.columns)
+    sql = f'COPY "{table_name}" ({columns}) FROM STDIN WITH (FORMAT csv)'
+
+    dbapi_conn = conn.connection.dbapi_connection
+    with dbapi_conn.cursor() as cur:
+        if hasattr(cur, "copy"):
+            # psycopg 3
+            with cur.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            # psycopg2
+            buffer.seek(0)
+            cur.copy_expert(sql, buffer)
+
+
+class BulkWriter:
+    """Dialect-aware bulk insert/upsert of DataFrames."""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+
+    def insert_stmt(self, table: Table):
+        """Dialect-specific insert() that supports ON CONFLICT."""
+        if self.dialect == "postgresql":
+            return pg_insert(table)
+        if self.dialect == "sqlite":
+            return sqlite_insert(table)
+        raise NotImplementedError(f"ON CONFLICT not supported for dialect '{self.dialect}'")
+
+    def insert_frame(
+        self,
+        table: Table,
+        df: pd.DataFrame,
+        skip_conflicts_on: Optional[List[str]] = None
+    ) -> int:
+        """
+        Append all rows of `df` to `table`. Returns rows written.
+        - skip_conflicts_on: unique key columns; rows whose key already
+          exists are silently skipped (not counted).
+        """
+        if df.empty:
+            return 0
+
+        if not skip_conflicts_on:
+            if self.dialect == "postgresql":
+                _copy_frame(self.conn, table.name, df)
+            else:
+                self.conn.execute(table.insert(), frame_records(df))
+            return len(df)
+
+        return len(self.insert_frame_returning(table, df, skip_conflicts_on, skip_conflicts_on))
+
+    def insert_frame_returning(
+        self,
+        table: Table,
+        df: pd.DataFrame,
+        key_columns: List[str],
+        returning: List[str]
+    ) -> pd.DataFrame:
+        """
+        INSERT ... ON CONFLICT (key_columns) DO NOTHING RETURNING `returning`.
+        Returns only the rows that were actually inserted.
+        """
+        if df.empty:
+            return pd.DataFrame(columns=returning)
+
+        if self.dialect == "postgresql":
+            result = self._copy_insert_ignore(table, df, key_columns, returning)
+        else:
+            stmt = self.insert_stmt(table) \
+                .on_conflict_do_nothing(index_elements=key_columns) \
+                .returning(*[table.c[c] for c in returning])
+            result = self.conn.execute(stmt, frame_records(df))
+
+        return pd.DataFrame(result.fetchall(), columns=returning)
+
+    def _copy_insert_ignore(self, table: Table, df: pd.DataFrame, key_columns: List[str], returning: List[str]):
+        """COPY into a temp staging table, then INSERT ... SELECT ... ON CONFLICT DO NOTHING."""
+        staging = f"_stage_{table.name}"
+        columns = ", ".join(f'"{c}"' for c in df.columns)
+        keys = ", ".join(f'"{c}"' for c in key_columns)
+        returned = ", ".join(f'"{c}"' for c in returning)
+
+        self.conn.execute(text(
+            f'CREATE TEMP TABLE IF NOT EXISTS "{staging}" '
+            f'(LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DROP'
+        ))
+        self.conn.execute(text(f'TRUNCATE "{staging}"'))
+        _copy_frame(self.conn, staging, df)
+
+        return self.conn.execute(text(
+            f'INSERT INTO "{table.name}" ({columns}) '
+            f'SELECT {columns} FROM "{staging}" '
+            f'ON CONFLICT ({keys}) DO NOTHING '
+            f'RETURNING {returned}'
+        ))
+
+    def upsert_frame(self, table: Table, df: pd.DataFrame, key_columns: List[str]) -> int:
+        """
+        Insert rows, updating every non-key column when the key already exists.
+        Duplicate keys inside the frame keep the last occurrence.
+        """
+        if df.empty:
+            return 0
+
+        df = df.drop_duplicates(subset=key_columns, keep="last")
+        stmt = self.insert_stmt(table)
+
+        update_cols = {
+            c: stmt.excluded[c] for c in df.columns if c not in key_columns
+        }
+        stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_=update_cols)
+
+        self.conn.execute(stmt, frame_records(df))
+        return len(df)
+
+
+class ThroughputMeter:
+    """Counts rows and reports rows/second for a load stage (and tells the on_throughput listeners)."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows: int) -> None:
+        self.rows += rows
+        for listener in _throughput_listeners:
+            listener(self.label, rows, self.rows_per_second)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self) -> str:
+        return (
+            f"{self.rows} {self.label} rows in {self.elapsed:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s)"
+        )
@@ -1,6 +1,14 @@
+from typing import Any, AsyncIterator, Callable
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
 from app.database.models import Base
+from app.database import events  # noqa: F401  (registers ORM write hooks)
+from app.database.upgrades import ensure_row_hash
+from app.services.analytics.stock_balance import StockBalanceService
+from app.services.analytics.sales_rollup import SalesRollupService
 from config import get_settings
 
 settings = get_settings()
@@ -9,17 +17,24 @@ settings = get_settings()
 is_sqlite = settings.DATABASE_URL.startswith("sqlite")
 
 # Configure engine
+# API requests hold one connection each while their calculator runs on the
+# threadpool, so the pool is sized alongside API_THREADPOOL_SIZE
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if is_sqlite else {},  # Only for SQLite
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **({} if is_sqlite else {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW})
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        ensure_row_hash(conn)
+        StockBalanceService.ensure_built(conn)
+        SalesRollupService.ensure_built(conn)
 
 def get_db():
     db = SessionLocal()
@@ -27,3 +42,28 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ThreadedSession:
+    """
+    A sync Session used from async code: every run_sync() call runs on
+    the threadpool (contextvars included). Calls on one ThreadedSession
+    must be awaited one at a time, like any Session.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run_sync(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.session.close)
+
+
+async def get_threaded_db() -> AsyncIterator[ThreadedSession]:
+    db = ThreadedSession(SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,62 @@
+"""
+app/database/dataset_version.py
+
+Global dataset version (dataset_version table, one row).
+
+Every write that can change an analytics result bumps the counter:
+- the loaders, once per loaded file / product master load
+- ORM writes, from the after_flush hook in app/database/events.py
+
+Readers (the response cache) compare against it instead of re-running
+aggregations. The counter lives in the database so every API worker
+process sees the same value; each process re-reads it at most once per
+DATASET_VERSION_CHECK_INTERVAL seconds.
+"""
+
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+
+from app.database.bulk import BulkWriter
+from app.database.models import DatasetVersion
+from config import get_settings
+
+settings = get_settings()
+
+_cached = {"version": None, "checked_at": 0.0}
+
+
+def bump_dataset_version(conn: Connection) -> None:
+    """Increment the version inside the caller's transaction."""
+    table = DatasetVersion.__table__
+    now = datetime.utcnow()
+
+    stmt = BulkWriter(conn).insert_stmt(table).values(id=1, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={"version": table.c.version + 1, "updated_at": now}
+    )
+    conn.execute(stmt)
+
+    # Local writes are picked up on the next read instead of after the interval
+    _cached["checked_at"] = 0.0
+
+
+async def current_dataset_version() -> int:
+    """Current version (0 if nothing was ever loaded), re-read at most once per interval."""
+    now = time.monotonic()
+    if _cached["version"] is not None and now - _cached["checked_at"] < settings.DATASET_VERSION_CHECK_INTERVAL:
+        return _cached["version"]
+
+    from app.database.session import async_engine
+
+    async with async_engine.connect() as conn:
+        version = (await conn.execute(
+            select(DatasetVersion.version).where(DatasetVersion.id == 1)
+        )).scalar()
+
+    _cached["version"] = version or 0
+    _cached["checked_at"] = now
+    return _cached["version"]
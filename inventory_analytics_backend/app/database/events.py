@@ -0,0 +1,142 @@
+"""
+app/database/events.py
+
+ORM write hooks that keep the materialized tables in step with
+SalesTransaction / StockReceipt writes made through any Session.
+
+Imported once by app/database/connection.py.
+"""
+
+from collections import defaultdict
+
+import pandas as pd
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.database.models import ProductMaster, SalesTransaction, StockReceipt
+from app.database.dataset_version import bump_dataset_version
+from app.services.analytics.stock_balance import StockBalanceService
+from app.services.analytics.sales_rollup import SalesRollupService
+
+# model -> (quantity attribute, date attribute, stock_balance column)
+_MOVEMENT_MODELS = {
+    StockReceipt: ("quantity_received", "receipt_date", "received"),
+    SalesTransaction: ("quantity_sold", "transaction_date", "sold"),
+}
+
+# Writes to these models change analytics results (bump the dataset version)
+_VERSIONED_MODELS = (ProductMaster, SalesTransaction, StockReceipt)
+
+# SalesTransaction attributes that feed the sales_daily_sku rollup
+_ROLLUP_ATTRS = ["sku_id", "transaction_date", "quantity_sold", "sale_price"]
+
+
+def _track_quantity(target, value, oldvalue, initiator):
+    return value
+
+
+# active_history loads the pre-update value even when the instance was
+# expired by a previous commit, so dirty-object deltas stay correct.
+_TRACKED_ATTRS = {(SalesTransaction, attr) for attr in _ROLLUP_ATTRS}
+for _model, (_qty_attr, _date_attr, _) in _MOVEMENT_MODELS.items():
+    _TRACKED_ATTRS |= {(_model, "sku_id"), (_model, _qty_attr), (_model, _date_attr)}
+for _model, _attr in _TRACKED_ATTRS:
+    event.listen(getattr(_model, _attr), "set", _track_quantity, active_history=True, retval=True)
+
+
+def _old_value(state, attr):
+    """Value of attr before this flush's changes."""
+    history = state.attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(state.obj(), attr)
+
+
+def _collect_movements(session: Session) -> pd.DataFrame:
+    """Per-SKU stock deltas for everything in this flush."""
+    deltas = defaultdict(lambda: {"received": 0, "sold": 0, "last_movement": None})
+
+    def add(sku_id, column, qty, when=None):
+        entry = deltas[sku_id]
+        entry[column] += qty
+        if when is not None and (entry["last_movement"] is None or when > entry["last_movement"]):
+            entry["last_movement"] = when
+
+    for obj in session.new:
+        spec = _MOVEMENT_MODELS.get(type(obj))
+        if spec:
+            qty_attr, date_attr, column = spec
+            add(obj.sku_id, column, getattr(obj, qty_attr) or 0, getattr(obj, date_attr))
+
+    for obj in session.deleted:
+        spec = _MOVEMENT_MODELS.get(type(obj))
+        if spec:
+            qty_attr, _, column = spec
+            state = inspect(obj)
+            add(_old_value(state, "sku_id"), column, -(_old_value(state, qty_attr) or 0))
+
+    for obj in session.dirty:
+        spec = _MOVEMENT_MODELS.get(type(obj))
+        if not spec:
+            continue
+        qty_attr, date_attr, column = spec
+        state = inspect(obj)
+        if not any(state.attrs[a].history.has_changes() for a in ("sku_id", qty_attr, date_attr)):
+            continue
+        # Take the old row out and put the new one in (the SKU may have changed)
+        add(_old_value(state, "sku_id"), column, -(_old_value(state, qty_attr) or 0))
+        add(obj.sku_id, column, getattr(obj, qty_attr) or 0, getattr(obj, date_attr))
+
+    return pd.DataFrame(
+        [{"sku_id": sku, **entry} for sku, entry in deltas.items()],
+        columns=["sku_id", "received", "sold", "last_movement"]
+    )
+
+
+def _collect_sales_rows(session: Session) -> pd.DataFrame:
+    """Signed raw sales rows (+1 added, -1 removed) for the daily rollup."""
+    rows = []
+
+    def add(values, sign):
+        rows.append({**values, "sign": sign})
+
+    for obj in session.new:
+        if isinstance(obj, SalesTransaction):
+            add({a: getattr(obj, a) for a in _ROLLUP_ATTRS}, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, SalesTransaction):
+            state = inspect(obj)
+            add({a: _old_value(state, a) for a in _ROLLUP_ATTRS}, -1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, SalesTransaction):
+            continue
+        state = inspect(obj)
+        histories = {a: state.attrs[a].history for a in _ROLLUP_ATTRS}
+        if not any(h.has_changes() for h in histories.values()):
+            continue
+        add({a: _old_value(state, a) for a in _ROLLUP_ATTRS}, -1)
+        add({a: getattr(obj, a) for a in _ROLLUP_ATTRS}, 1)
+
+    return pd.DataFrame(rows, columns=_ROLLUP_ATTRS + ["sign"])
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_stock_movements(session, flush_context):
+    movements = _collect_movements(session)
+    if not movements.empty:
+        StockBalanceService.apply_movements(session.connection(), movements)
+
+    sales = _collect_sales_rows(session)
+    if not sales.empty:
+        conn = session.connection()
+        for sign, rows in sales.groupby("sign"):
+            SalesRollupService.apply_rows(conn, rows, sign=int(sign))
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_dataset_version(session, flush_context):
+    changed = any(isinstance(obj, _VERSIONED_MODELS) for obj in session.new) or \
+        any(isinstance(obj, _VERSIONED_MODELS) for obj in session.deleted) or \
+        any(isinstance(obj, _VERSIONED_MODELS) and session.is_modified(obj) for obj in session.dirty)
+    if changed:
+        bump_dataset_version(session.connection())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -30,6 +30,9 @@ class SalesTransaction(Base):
     quantity_sold = Column(Integer, nullable=False)
     sale_price = Column(Float, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Deterministic content hash set by the loader (makes re-runs idempotent)
+    row_hash = Column(BigInteger, unique=True, index=True, nullable=True)
     
     product = relationship("ProductMaster", back_populates="sales_transactions")
 
@@ -47,4 +50,72 @@ class StockReceipt(Base):
     unit_cost = Column(Float, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Deterministic content hash set by the loader (makes re-runs idempotent)
+    row_hash = Column(BigInteger, unique=True, index=True, nullable=True)
+
     product = relationship("ProductMaster", back_populates="stock_receipts")
+
+
+class StockBalance(Base):
+    """Materialized per-SKU stock position, maintained by loaders and ORM writes."""
+    __tablename__ = "stock_balance"
+
+    sku_id = Column(String, ForeignKey("product_master.sku_id"), primary_key=True)
+    received = Column(Integer, nullable=False, default=0)
+    sold = Column(Integer, nullable=False, default=0)
+    on_hand = Column(Integer, nullable=False, default=0, index=True)
+    last_movement = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SalesDailySku(Base):
+    """Daily per-SKU sales rollup, maintained by loaders and ORM writes."""
+    __tablename__ = "sales_daily_sku"
+
+    sku_id = Column(String, ForeignKey("product_master.sku_id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    qty = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+
+class IngestionWatermark(Base):
+    __tablename__ = "ingestion_watermarks"
+
+    # One row per loaded source file, e.g. "sales_transactions.csv"
+    source = Column(String, primary_key=True)
+    max_date = Column(DateTime, nullable=True)
+    file_checksum = Column(String, nullable=True)
+    rows_loaded = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ElasticityEstimate(Base):
+    """Precomputed price elasticities per SKU / brand / category (app/services/utils/elasticity.py)."""
+    __tablename__ = "elasticity_estimates"
+
+    # level: "sku", "brand" or "category"; key: the sku_id / brand / category
+    level = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+
+    # Value to use (after fallback) and the level it came from
+    elasticity = Column(Float, nullable=False)
+    source = Column(String, nullable=False)
+
+    # Fit diagnostics of this level's own regression (NULL when not fitted)
+    slope = Column(Float, nullable=True)
+    n_points = Column(Integer, nullable=False, default=0)
+    r_squared = Column(Float, nullable=True)
+    std_error = Column(Float, nullable=True)
+
+    lookback_days = Column(Integer, nullable=False)
+    fitted_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DatasetVersion(Base):
+    """Single-row counter bumped on every data change (drives response caching)."""
+    __tablename__ = "dataset_version"
+
+    id = Column(Integer, primary_key=True, default=1)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
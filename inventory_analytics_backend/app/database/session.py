@@ -0,0 +1,56 @@
+"""
+app/database/session.py
+
+Async engine, for the few paths that are I/O all the way down:
+- the dataset version check (app/database/dataset_version.py)
+- NDJSON streaming (AsyncSession.stream, app/services/utils/pagination.py)
+
+- PostgreSQL: psycopg 3 async driver (postgresql+psycopg)
+- SQLite: aiosqlite (sqlite+aiosqlite)
+
+It does not serve the analytics router. The calculators are synchronous
+and mix queries with pandas/numpy work, so rewriting their queries for
+AsyncSession would still leave most of each request on a worker thread.
+Routes therefore take a ThreadedSession (app/database/connection.py): a
+sync Session whose calls run on the threadpool, whose size
+(API_THREADPOOL_SIZE) and the sync engine's pool (DB_POOL_SIZE +
+DB_MAX_OVERFLOW) bound how many analytics requests run at once.
+"""
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config import get_settings
+
+settings = get_settings()
+
+# sync driver -> async driver for the same database
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Swap the driver of a sync DATABASE_URL for its async counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"❌ No async driver configured for '{backend}' databases")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    echo=settings.DEBUG
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
@@ -0,0 +1,79 @@
+"""
+app/database/upgrades.py
+
+In-place schema upgrades for databases created before a column existed
+(create_all() only creates missing tables). Run from init_db().
+
+row_hash (stock_receipts, sales_transactions): the column is added,
+backfilled with the loader's RowHasher over the existing rows in load
+order (id) and its unique index created, so incremental loads skip the
+rows that are already there. Hashes match the loader's for data loaded
+from a single file per source; with monthly split files the occurrence
+numbers restart per file, so an identical line repeated across files may
+be loaded once more by the first incremental run after the upgrade.
+"""
+
+import logging
+
+import pandas as pd
+from sqlalchemy import BigInteger, Table, bindparam, inspect, select, update
+from sqlalchemy.engine import Connection
+
+from app.database.models import SalesTransaction, StockReceipt
+from app.services.utils.file_loader import DEFAULT_CHUNK_SIZE, RowHasher
+
+logger = logging.getLogger("app.database")
+
+# Hashed columns, in the order of the loader's mappings (scripts/load_clean_data.py)
+ROW_HASH_COLUMNS = {
+    StockReceipt.__table__: ["receipt_date", "sku_id", "quantity_received", "supplier_id", "unit_cost"],
+    SalesTransaction.__table__: ["transaction_date", "sku_id", "quantity_sold", "sale_price"],
+}
+
+
+def _backfill_row_hash(conn: Connection, table: Table, columns, date_col: str,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Hash the table in id order, one keyset chunk (id > last id seen) at a
+    time, so memory stays bounded by chunk_size and no cursor is held open
+    across the updates. One RowHasher for the whole table: its occurrence
+    counter carries across chunks, as it does across the loader's chunks.
+    """
+    hasher = RowHasher(columns)
+    query = select(table.c.id, *[table.c[c] for c in columns]).order_by(table.c.id).limit(chunk_size)
+    stmt = update(table).where(table.c.id == bindparam("row_id")).values(row_hash=bindparam("hash"))
+    updated = 0
+    last_id = None
+
+    while True:
+        chunk = query if last_id is None else query.where(table.c.id > last_id)
+        rows = conn.execute(chunk).fetchall()
+        if not rows:
+            break
+        df = pd.DataFrame(rows, columns=["id"] + columns)
+        # Same dtypes as the loader's prepared frames
+        df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+        hashes = hasher.hash(df)
+        conn.execute(stmt, [
+            {"row_id": int(row_id), "hash": int(h)} for row_id, h in zip(df["id"], hashes)
+        ])
+        updated += len(df)
+        last_id = int(df["id"].iloc[-1])
+    return updated
+
+
+def ensure_row_hash(conn: Connection) -> None:
+    """Add, backfill and index row_hash where it is missing."""
+    inspector = inspect(conn)
+    for table, columns in ROW_HASH_COLUMNS.items():
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        if "row_hash" in existing:
+            continue
+
+        column_type = BigInteger().compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN row_hash {column_type}")
+        rows = _backfill_row_hash(conn, table, columns, columns[0])
+        for index in table.indexes:
+            if "row_hash" in index.columns:
+                index.create(conn, checkfirst=True)
+        logger.info("Added row_hash to %s (%d rows backfilled)", table.name, rows)
@@ -0,0 +1,79 @@
+"""
+app/middleware/etag.py
+
+Conditional GET for the analytics endpoints.
+
+The ETag is derived from the path, the normalized query, the dataset
+version and the freshness bucket the response cache uses
+(app/middleware/response_cache.py: freshness()), so it can be computed
+before the endpoint runs and both layers agree on how long a result
+stays valid:
+- results that depend only on the data keep their ETag until it changes
+- whole-day windows (forecasts) roll over once a day
+- windows that slide with now() (e.g. /revenue without start_date and
+  end_date, /cash-flow, /dashboard) get no ETag: their result changes
+  without a new dataset version, so a 304 could keep a stale body alive
+
+A matching If-None-Match is answered with 304 straight away: no
+calculator runs and no body is sent, and the dataset version itself is
+only re-read from the database once per DATASET_VERSION_CHECK_INTERVAL.
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from starlette.responses import Response
+
+from app.database.dataset_version import current_dataset_version
+from app.middleware.profiler import profiling_requested
+from app.middleware.response_cache import CACHED_PATH_PREFIX, freshness, normalized_query
+
+
+def etag_for(request: Request, version: int) -> Optional[str]:
+    """None for results that slide with the clock (no conditional GET)."""
+    kind, bucket = freshness(request)
+    if kind == "minute":
+        return None
+    key = (request.url.path, normalized_query(request), version, bucket)
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+    # Weak: equal ETags mean the same result, not byte-identical JSON
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """RFC 7232 weak comparison against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def setup_etag(app: FastAPI):
+
+    @app.middleware("http")
+    async def analytics_etag(request: Request, call_next):
+        if request.method != "GET" or not request.url.path.startswith(CACHED_PATH_PREFIX) \
+                or profiling_requested(request):
+            return await call_next(request)
+
+        etag = etag_for(request, await current_dataset_version())
+        if etag is None:
+            return await call_next(request)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+        response = await call_next(request)
+        if response.status_code == 200 and "no-store" not in response.headers.get("cache-control", ""):
+            response.headers["ETag"] = etag
+            # Clients may keep the body but must revalidate it on every use
+            response.headers["Cache-Control"] = "no-cache"
+        return response
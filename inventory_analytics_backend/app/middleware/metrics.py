@@ -0,0 +1,121 @@
+"""
+app/middleware/metrics.py
+
+Prometheus /metrics endpoint and the HTTP / DB pool instrumentation
+behind it (metric definitions: app/services/utils/metrics.py).
+
+- per route: request count by status, latency histogram (alert on
+  histogram_quantile(0.99, ...) of http_request_duration_seconds)
+- in-flight requests
+- pool: checkout wait time, configured size, connections checked out
+  (per engine, see setup_metrics)
+
+Requests are labelled with the route's path template, not the raw path
+(a path parameter never creates one series per value); paths that match
+no route, e.g. scanners probing for files, are all counted as "unmatched".
+"""
+
+import time
+
+from fastapi import FastAPI, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.routing import Match
+
+from app.database.connection import engine
+from app.database.session import async_engine
+from app.services.utils.metrics import (
+    CONTENT_TYPE_LATEST, DB_POOL_CHECKED_OUT, DB_POOL_SIZE, DB_POOL_WAIT,
+    HTTP_IN_PROGRESS, HTTP_LATENCY, HTTP_REQUESTS, render_metrics
+)
+from config import get_settings
+
+settings = get_settings()
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_template(app: FastAPI, request: Request) -> str:
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    # Responses answered before routing (response cache hits, 304s)
+    for candidate in app.router.routes:
+        match, child_scope = candidate.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(child_scope.get("route", candidate), "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+def instrument_pool(sync_engine: Engine, name: str) -> None:
+    """
+    Pool metrics for one engine. The listeners are registered on the engine,
+    not on its current pool, so they carry over to the pool that replaces it
+    after engine.dispose().
+    """
+    if getattr(sync_engine, "_metrics_instrumented", False):
+        return
+    sync_engine._metrics_instrumented = True
+
+    # size() only exists on queue pools (not on NullPool / StaticPool)
+    pool_size = DB_POOL_SIZE.labels(name)
+    if hasattr(sync_engine.pool, "size"):
+        pool_size.set(sync_engine.pool.size())
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    event.listen(sync_engine, "checkout", lambda *args: checked_out.inc())
+    event.listen(sync_engine, "checkin", lambda *args: checked_out.dec())
+
+    # New DBAPI connections: keep the size gauge right for a recreated pool
+    def on_connect(dbapi_connection, connection_record):
+        if hasattr(sync_engine.pool, "size"):
+            pool_size.set(sync_engine.pool.size())
+
+    event.listen(sync_engine, "connect", on_connect)
+
+    # There is no "before checkout" event, so the wait is timed around
+    # Engine.raw_connection(), through which every Connection gets its DBAPI
+    # connection from whichever pool is current (queue wait + opening a new
+    # connection when needed)
+    wait = DB_POOL_WAIT.labels(name)
+    raw_connection = sync_engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            wait.observe(time.perf_counter() - started)
+
+    sync_engine.raw_connection = timed_raw_connection
+
+
+def setup_metrics(app: FastAPI):
+    if not settings.METRICS_ENABLED:
+        return
+
+    # "api": sync engine behind the route calculators (threadpool), init_db and
+    # the loaders; "stream": async engine for version checks and NDJSON streams
+    instrument_pool(engine, "api")
+    instrument_pool(async_engine.sync_engine, "stream")
+
+    @app.middleware("http")
+    async def request_metrics(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        HTTP_IN_PROGRESS.inc()
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            route = route_template(app, request)
+            HTTP_REQUESTS.labels(request.method, route, str(status)).inc()
+            HTTP_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        # Sync route: reading every worker's files runs in the threadpool
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
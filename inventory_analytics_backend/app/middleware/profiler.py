@@ -0,0 +1,127 @@
+"""
+app/middleware/profiler.py
+
+On-demand profiling of API requests (admin only).
+
+`?profile=1` (or `X-Profile: 1`) with a valid X-Admin-Token runs the
+request under a StackSampler (the event loop thread plus the threads
+running endpoint / service code) and answers with a profile report
+instead of the endpoint's body:
+
+- wall_ms, and db_ms / queries from the cursor-execute listeners of
+  app/middleware/sql_instrumentation.py
+- breakdown_ms from the samples: db, orm_hydration, sqlalchemy, python,
+  waiting (see app/services/utils/stack_sampler.py)
+- call_tree: sampled call tree from the endpoint / service code down
+
+`profile=speedscope` additionally writes a speedscope file to
+PROFILE_DIR and returns its path. Profiled requests bypass the response
+cache and ETags. The sampler sees every thread in application code, so
+run profiles on a quiet worker: concurrent requests show up in the samples.
+"""
+
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.api.v1.dependencies import is_admin
+from app.middleware.sql_instrumentation import QueryStats, current_query_stats
+from app.services.utils.stack_sampler import StackSampler
+from config import get_settings
+
+settings = get_settings()
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+# Call trees start at endpoint / service code, below the middleware chain
+CALL_TREE_ROOTS = (str(BASE_DIR / "app" / "api"), str(BASE_DIR / "app" / "services"))
+PROFILE_HEADER = "x-profile"
+PROFILE_VALUES = {"1", "true", "speedscope"}
+
+
+def profile_mode(request: Request) -> str:
+    """"", "1"/"true" or "speedscope" (query parameter first, then header)."""
+    value = request.query_params.get("profile") or request.headers.get(PROFILE_HEADER) or ""
+    value = value.strip().lower()
+    return value if value in PROFILE_VALUES else ""
+
+
+def profiling_requested(request: Request) -> bool:
+    return request.url.path.startswith("/api/") and profile_mode(request) != ""
+
+
+def profile_dir() -> Path:
+    path = Path(settings.PROFILE_DIR)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def save_speedscope(sampler: StackSampler, request: Request) -> str:
+    name = f"{request.method} {request.url.path}"
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", request.url.path).strip("-")
+    path = profile_dir() / f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{slug}.speedscope.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sampler.to_speedscope(name), f)
+    return str(path)
+
+
+def setup_profiler(app: FastAPI):
+
+    @app.middleware("http")
+    async def request_profiler(request: Request, call_next):
+        if not profiling_requested(request):
+            return await call_next(request)
+        if not is_admin(request):
+            return JSONResponse(
+                status_code=403,
+                content={"status": "error", "message": "Profiling requires a valid X-Admin-Token"}
+            )
+
+        stats = current_query_stats.get()
+        token = None
+        if stats is None:
+            stats = QueryStats(request.url.path)
+            token = current_query_stats.set(stats)
+        queries_before, db_ms_before = stats.count, stats.total_ms
+
+        sampler = StackSampler(
+            threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL, CALL_TREE_ROOTS
+        ).start()
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+            # Streaming bodies do their work while being read
+            body_bytes = 0
+            async for chunk in response.body_iterator:
+                body_bytes += len(chunk)
+        finally:
+            wall_ms = (time.perf_counter() - started) * 1000
+            sampler.stop()
+            if token is not None:
+                current_query_stats.reset(token)
+
+        profile = {
+            "method": request.method,
+            "path": request.url.path,
+            "query": str(request.url.query),
+            "response_status": response.status_code,
+            "response_bytes": body_bytes,
+            "wall_ms": round(wall_ms, 2),
+            "db_ms": round(stats.total_ms - db_ms_before, 2),
+            "queries": stats.count - queries_before,
+            "sampled_ms": round(sum(sampler.samples.values()) * 1000, 2),
+            "breakdown_ms": sampler.breakdown_ms(),
+            "call_tree": sampler.call_tree(CALL_TREE_ROOTS)
+        }
+        if profile_mode(request) == "speedscope":
+            profile["speedscope_file"] = save_speedscope(sampler, request)
+
+        return JSONResponse(
+            {"status": "success", "data": {"profile": profile}},
+            headers={"Cache-Control": "no-store"}
+        )
@@ -0,0 +1,169 @@
+"""
+app/middleware/response_cache.py
+
+In-process response cache for the analytics GET endpoints.
+
+Key: path + normalized query string + dataset version + freshness bucket.
+- normalized query: parameters sorted, blank values dropped
+- dataset version: any load or ORM write bumps it, which makes every
+  older entry unreachable (they age out through TTL/LRU)
+- freshness bucket (freshness(), shared with the ETags of
+  app/middleware/etag.py): none for results that depend only on the
+  data, today's date for whole-day windows ending yesterday, and the
+  current minute for windows that slide with datetime.now()
+
+Only successful (200) responses without `Cache-Control: no-store` are
+stored (e.g. a partial dashboard is not). Memory is bounded by
+RESPONSE_CACHE_MAX_ENTRIES with least-recently-used eviction.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import FastAPI, Request
+from starlette.responses import Response
+
+from app.database.dataset_version import current_dataset_version
+from app.middleware.profiler import profiling_requested
+from app.services.utils.metrics import CACHE_LOOKUPS
+from config import get_settings
+
+settings = get_settings()
+
+CACHED_PATH_PREFIX = "/api/v1/analytics/"
+
+# Results that depend only on the data
+UNDATED_ENDPOINTS = {
+    CACHED_PATH_PREFIX + path for path in (
+        "inventory-value", "inventory-value/products", "performers",
+        "stock-alerts", "price-variance", "elasticity"
+    )
+}
+# Whole-day windows ending yesterday (the forecast history): change once a day
+DAY_ALIGNED_ENDPOINTS = {
+    CACHED_PATH_PREFIX + path for path in (
+        "forecast", "forecast/hierarchy", "forecast/category", "forecast/products"
+    )
+}
+# Windows that default to (now() - 30 days, now()) but are fixed once both bounds are given
+WINDOW_PARAM_ENDPOINTS = {
+    CACHED_PATH_PREFIX + path for path in ("revenue", "profit", "category-revenue")
+}
+WINDOW_PARAMS = ("start_date", "end_date")
+
+# Headers that must not be replayed from a stored response
+_HOP_HEADERS = {"content-length", "transfer-encoding", "connection"}
+
+
+class ResponseCache:
+    """LRU + TTL store of (status, headers, body) with hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl: float, name: str = "response"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, list, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_counter = CACHE_LOOKUPS.labels(name, "hit")
+        self._miss_counter = CACHE_LOOKUPS.labels(name, "miss")
+
+    def get(self, key: Tuple) -> Optional[Tuple[int, list, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self._hit_counter.inc()
+        return entry[1:]
+
+    def set(self, key: Tuple, status: int, headers: list, body: bytes) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, status, headers, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL)
+
+
+def normalized_query(request: Request) -> str:
+    """Query string with parameters sorted and blank values dropped."""
+    params = [(k, v) for k, v in parse_qsl(request.url.query, keep_blank_values=True) if v != ""]
+    return urlencode(sorted(params))
+
+
+def freshness(request: Request) -> Tuple[str, str]:
+    """
+    (kind, bucket): how long a result stays valid for one dataset version.
+    - "data": until the data changes (bucket "")
+    - "day": until midnight (bucket: today's date)
+    - "minute": the window ends at now(), so only briefly (bucket: the minute)
+    """
+    path = request.url.path
+    if path in UNDATED_ENDPOINTS:
+        return "data", ""
+    if path in WINDOW_PARAM_ENDPOINTS and all(request.query_params.get(p) for p in WINDOW_PARAMS):
+        return "data", ""
+    if path in DAY_ALIGNED_ENDPOINTS:
+        return "day", date.today().isoformat()
+    return "minute", datetime.now().strftime("%Y-%m-%dT%H:%M")
+
+
+def cache_key(request: Request, version: int) -> Tuple:
+    return request.url.path, normalized_query(request), version, freshness(request)[1]
+
+
+def setup_response_cache(app: FastAPI):
+
+    @app.middleware("http")
+    async def analytics_response_cache(request: Request, call_next):
+        if not settings.RESPONSE_CACHE_ENABLED or request.method != "GET" \
+                or not request.url.path.startswith(CACHED_PATH_PREFIX) or profiling_requested(request):
+            return await call_next(request)
+
+        key = cache_key(request, await current_dataset_version())
+        cached = response_cache.get(key)
+        if cached is not None:
+            status, headers, body = cached
+            response = Response(content=body, status_code=status)
+            response.headers.update(dict(headers))
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+        response = await call_next(request)
+        if response.status_code != 200 or "no-store" in response.headers.get("cache-control", ""):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS]
+        response_cache.set(key, response.status_code, headers, body)
+
+        replay = Response(content=body, status_code=response.status_code)
+        replay.headers.update(dict(headers))
+        replay.headers["X-Cache"] = "MISS"
+        return replay
@@ -0,0 +1,166 @@
+"""
+app/middleware/sql_instrumentation.py
+
+Per-request SQL instrumentation.
+
+before/after_cursor_execute listeners on both engines (the async API
+engine and the sync loader/init engine) add every statement to the
+QueryStats of the current request, found through a context variable
+(contextvars follow the request into threadpool calls and into the
+dashboard's section threads, which is also why record() takes a lock).
+
+For every request the middleware then:
+- adds `Server-Timing: db;dur=..;desc="N queries", app;dur=..`
+- logs one structured (JSON) line on the "app.sql" logger
+- flags statements executed N_PLUS_ONE_THRESHOLD+ times with identical
+  SQL text (different parameters) as likely N+1 patterns, and logs those
+  requests at WARNING
+
+Queries run while a streaming body is sent (NDJSON) happen after the
+headers and are not counted.
+
+The listeners are installed even with SQL_INSTRUMENTATION_ENABLED off:
+they also feed the slow-query log (app/services/utils/slow_query_log.py)
+and the profiler's DB time, and cost one perf_counter() pair per
+statement outside a request.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.database.connection import engine
+from app.database.session import async_engine
+from app.services.utils.slow_query_log import EXPLAIN_CONNECTION_FLAG, slow_query_log
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger("app.sql")
+
+STATEMENT_PREVIEW_CHARS = 300
+
+
+class QueryStats:
+    """Statements executed while handling one request."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            self.statements[statement] += 1
+            if duration_ms > self.slowest_ms:
+                self.slowest_ms = duration_ms
+                self.slowest_statement = statement
+
+    def repeated_statements(self, threshold: int) -> list:
+        return [
+            {"statement": _preview(statement), "count": count}
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > STATEMENT_PREVIEW_CHARS:
+        return statement[:STATEMENT_PREVIEW_CHARS] + "…"
+    return statement
+
+
+# The start time lives on the statement's execution context: a statement
+# that fails (and never reaches after_cursor_execute) leaves nothing behind,
+# and nested statements on one connection cannot take each other's times.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started_at", None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration_ms)
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold > 0 and duration_ms >= threshold and not conn.info.get(EXPLAIN_CONNECTION_FLAG):
+        slow_query_log.record(
+            statement, parameters, executemany, duration_ms, conn.dialect.name,
+            stats.path if stats is not None else None
+        )
+
+
+def instrument_engine(sync_engine: Engine) -> None:
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(stats: QueryStats, total_ms: float) -> str:
+    return (
+        f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries", '
+        f'db-slowest;dur={stats.slowest_ms:.2f}, '
+        f'app;dur={total_ms:.2f}'
+    )
+
+
+def setup_sql_instrumentation(app: FastAPI):
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    slow_query_log.start(engine)
+
+    if not settings.SQL_INSTRUMENTATION_ENABLED:
+        return
+
+    @app.middleware("http")
+    async def sql_instrumentation(request: Request, call_next):
+        stats = QueryStats(request.url.path)
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            current_query_stats.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        response.headers["Server-Timing"] = server_timing(stats, total_ms)
+
+        repeated = stats.repeated_statements(settings.N_PLUS_ONE_THRESHOLD)
+        record = {
+            "event": "request_sql",
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.total_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "slowest_ms": round(stats.slowest_ms, 2),
+            "slowest_statement": _preview(stats.slowest_statement) if stats.slowest_statement else None,
+        }
+        if repeated:
+            record["n_plus_one_suspects"] = repeated
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
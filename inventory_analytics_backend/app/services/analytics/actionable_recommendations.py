@@ -1,88 +1,137 @@
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.database.models import ProductMaster, SalesTransaction, StockReceipt
+from app.database.models import ProductMaster, StockBalance
+from app.services.analytics.sales_rollup import SalesRollupService
 from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import time
+
+REORDER_THRESHOLD = 10
+VELOCITY_LOOKBACK_DAYS = 90
+
+PRIORITY_RANK = {"HIGH": 3, "MEDIUM": 2, "LOW": 1}
+
+
+class SuggestionContext:
+    """
+    Shared, lazily built aggregates for one suggestion run.
+    Rules join against these instead of querying per SKU, so the whole
+    engine issues a constant number of queries regardless of catalog size.
+    """
+
+    def __init__(self, db: Session, now: datetime = None, lookback_days: int = VELOCITY_LOOKBACK_DAYS):
+        self.db = db
+        self.now = now or datetime.now()
+        self.lookback_days = lookback_days
+        self._stock = None
+        self._velocity = None
+
+    @property
+    def stock(self):
+        """Subquery: sku_id, product_name, on_hand (0 for SKUs that never moved)."""
+        if self._stock is None:
+            self._stock = self.db.query(
+                ProductMaster.sku_id.label("sku_id"),
+                ProductMaster.product_name.label("product_name"),
+                func.coalesce(StockBalance.on_hand, 0).label("on_hand")
+            ).outerjoin(StockBalance, ProductMaster.sku_id == StockBalance.sku_id)\
+             .subquery("stock")
+        return self._stock
+
+    @property
+    def velocity(self):
+        """Subquery: sku_id, qty sold in the lookback window (SKUs with sales only)."""
+        if self._velocity is None:
+            daily = SalesRollupService.daily_sales(self.now - timedelta(days=self.lookback_days))
+            self._velocity = self.db.query(
+                daily.c.sku_id.label("sku_id"),
+                func.sum(daily.c.qty).label("qty")
+            ).group_by(daily.c.sku_id).subquery("velocity")
+        return self._velocity
+
+
+# name -> rule(ctx) returning a list of suggestion dicts, run in order
+SUGGESTION_RULES: Dict[str, Callable[[SuggestionContext], List[dict]]] = {}
+
+
+def suggestion_rule(name: str):
+    """Register a suggestion rule (a function taking a SuggestionContext)."""
+    def register(rule):
+        SUGGESTION_RULES[name] = rule
+        return rule
+    return register
+
 
 class SuggestionEngine:
-    
+
     @staticmethod
-    def generate_suggestions(db: Session):
-        """Generate actionable suggestions"""
+    def generate_suggestions(db: Session, timings: Optional[dict] = None):
+        """
+        Generate actionable suggestions from every registered rule.
+        - timings: optional dict filled with per-rule duration in ms
+        """
+        ctx = SuggestionContext(db)
         suggestions = []
-        
-        # 1. Reorder suggestions
-        low_stock = SuggestionEngine._get_reorder_suggestions(db)
-        suggestions.extend(low_stock)
-        
-        # 2. Discontinuation suggestions
-        slow_movers = SuggestionEngine._get_discontinuation_suggestions(db)
-        suggestions.extend(slow_movers)
-        
-        # 3. Price adjustment suggestions
-        high_margin = SuggestionEngine._get_price_adjustment_suggestions(db)
-        suggestions.extend(high_margin)
-        
-        return sorted(suggestions, key=lambda x: x["priority"], reverse=True)
-    
+
+        for name, rule in SUGGESTION_RULES.items():
+            started = time.perf_counter()
+            suggestions.extend(rule(ctx))
+            if timings is not None:
+                timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+        return sorted(suggestions, key=lambda x: PRIORITY_RANK.get(x["priority"], 0), reverse=True)
+
     @staticmethod
-    def _get_reorder_suggestions(db: Session):
+    @suggestion_rule("reorder")
+    def _get_reorder_suggestions(ctx: SuggestionContext):
         """Products that need reordering"""
-        suggestions = []
-        
-        inventory_data = db.query(
-            ProductMaster.sku_id,
-            ProductMaster.product_name,
-            func.coalesce(func.sum(StockReceipt.quantity_received), 0).label("total_received"),
-            func.coalesce(func.sum(SalesTransaction.quantity_sold), 0).label("total_sold")
-        ).outerjoin(StockReceipt, ProductMaster.sku_id == StockReceipt.sku_id)\
-         .outerjoin(SalesTransaction, ProductMaster.sku_id == SalesTransaction.sku_id)\
-         .group_by(ProductMaster.sku_id, ProductMaster.product_name).all()
-        
-        for item in inventory_data:
-            current_qty = item.total_received - item.total_sold
-            if current_qty < 10:
-                suggestions.append({
-                    "suggestion_type": "REORDER",
-                    "sku_id": item.sku_id,
-                    "product_name": item.product_name,
-                    "reason": f"Current stock: {current_qty} units",
-                    "priority": "HIGH" if current_qty == 0 else "MEDIUM",
-                    "recommended_action": f"Place reorder for 50 units of {item.product_name}"
-                })
-        
-        return suggestions
-    
+        stock, velocity = ctx.stock, ctx.velocity
+
+        inventory_data = ctx.db.query(
+            stock.c.sku_id,
+            stock.c.product_name,
+            stock.c.on_hand.label("current_qty"),
+            func.coalesce(velocity.c.qty, 0).label("recent_qty")
+        ).outerjoin(velocity, velocity.c.sku_id == stock.c.sku_id)\
+         .filter(stock.c.on_hand < REORDER_THRESHOLD).all()
+
+        return [
+            {
+                "suggestion_type": "REORDER",
+                "sku_id": item.sku_id,
+                "product_name": item.product_name,
+                "reason": f"Current stock: {item.current_qty} units",
+                "priority": "HIGH" if item.current_qty == 0 else "MEDIUM",
+                "average_daily_sales": round(item.recent_qty / ctx.lookback_days, 2),
+                "recommended_action": f"Place reorder for 50 units of {item.product_name}"
+            } for item in inventory_data
+        ]
+
     @staticmethod
-    def _get_discontinuation_suggestions(db: Session):
-        """Products with low sales that should be discontinued"""
-        suggestions = []
-        
-        # Products with zero sales in last 90 days
-        start_date = datetime.now() - timedelta(days=90)
-        
-        all_products = db.query(ProductMaster.sku_id, ProductMaster.product_name).all()
-        
-        for product in all_products:
-            sales = db.query(func.sum(SalesTransaction.quantity_sold)).filter(
-                and_(
-                    SalesTransaction.sku_id == product.sku_id,
-                    SalesTransaction.transaction_date >= start_date
-                )
-            ).first()
-            
-            if not sales or sales == 0:
-                suggestions.append({
-                    "suggestion_type": "DISCONTINUE",
-                    "sku_id": product.sku_id,
-                    "product_name": product.product_name,
-                    "reason": "No sales in last 90 days",
-                    "priority": "LOW",
-                    "recommended_action": f"Consider discontinuing {product.product_name}"
-                })
-        
-        return suggestions
-    
+    @suggestion_rule("discontinue")
+    def _get_discontinuation_suggestions(ctx: SuggestionContext):
+        """Products with no sales in the lookback window (anti-join)"""
+        velocity = ctx.velocity
+
+        slow_movers = ctx.db.query(
+            ProductMaster.sku_id,
+            ProductMaster.product_name
+        ).outerjoin(velocity, velocity.c.sku_id == ProductMaster.sku_id)\
+         .filter(func.coalesce(velocity.c.qty, 0) == 0).all()
+
+        return [
+            {
+                "suggestion_type": "DISCONTINUE",
+                "sku_id": product.sku_id,
+                "product_name": product.product_name,
+                "reason": f"No sales in last {ctx.lookback_days} days",
+                "priority": "LOW",
+                "recommended_action": f"Consider discontinuing {product.product_name}"
+            } for product in slow_movers
+        ]
+
     @staticmethod
-    def _get_price_adjustment_suggestions(db: Session):
+    @suggestion_rule("price_adjustment")
+    def _get_price_adjustment_suggestions(ctx: SuggestionContext):
         """Products that may benefit from price adjustments"""
         return []  # Can be extended with ML/pricing logic
@@ -1,10 +1,63 @@
-from sqlalchemy import func
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from app.database.models import ProductMaster, StockReceipt
+from app.services.utils.pagination import keyset_after, page_result
 from datetime import datetime
+from typing import Any, List, Optional
 
 class ProductAgeAnalyzer:
 
+    @staticmethod
+    def products_by_age_query(after: Optional[List[Any]] = None):
+        """
+        First receipt date per SKU, oldest first (keyset order:
+        first_receipt_date, sku_id). `after` is the key of the last row seen.
+        """
+        first_receipts = select(
+            ProductMaster.sku_id,
+            ProductMaster.product_name,
+            ProductMaster.category,
+            func.min(StockReceipt.receipt_date).label("first_receipt_date")
+        ).join(
+            StockReceipt, ProductMaster.sku_id == StockReceipt.sku_id
+        ).group_by(
+            ProductMaster.sku_id,
+            ProductMaster.product_name,
+            ProductMaster.category
+        ).subquery("first_receipts")
+
+        stmt = select(first_receipts)\
+            .where(first_receipts.c.first_receipt_date.isnot(None))\
+            .order_by(first_receipts.c.first_receipt_date, first_receipts.c.sku_id)
+
+        if after:
+            stmt = stmt.where(keyset_after(
+                [first_receipts.c.first_receipt_date, first_receipts.c.sku_id], after
+            ))
+        return stmt
+
+    @staticmethod
+    def product_age_row(item, today: datetime = None):
+        today = today or datetime.utcnow()
+        return {
+            "sku_id": item.sku_id,
+            "product_name": item.product_name,
+            "category": item.category,
+            "first_receipt_date": item.first_receipt_date.isoformat(),
+            "age_days": (today - item.first_receipt_date).days
+        }
+
+    @staticmethod
+    def get_products_by_age_page(db: Session, limit: int, after: Optional[List[Any]] = None):
+        """One keyset page of products_by_age (oldest first)."""
+        rows = db.execute(ProductAgeAnalyzer.products_by_age_query(after).limit(limit + 1)).all()
+        today = datetime.utcnow()
+        return page_result(
+            rows, limit,
+            key=lambda r: (r.first_receipt_date, r.sku_id),
+            formatter=lambda r: ProductAgeAnalyzer.product_age_row(r, today)
+        )
+
     @staticmethod
     def calculate_average_product_age(db: Session):
         """
@@ -33,15 +86,7 @@ class ProductAgeAnalyzer:
             if item.first_receipt_date is None:
                 continue
 
-            age_days = (today - item.first_receipt_date).days
-
-            product_ages.append({
-                "sku_id": item.sku_id,
-                "product_name": item.product_name,
-                "category": item.category,
-                "first_receipt_date": item.first_receipt_date.isoformat(),
-                "age_days": age_days
-            })
+            product_ages.append(ProductAgeAnalyzer.product_age_row(item, today))
 
         if not product_ages:
             return {
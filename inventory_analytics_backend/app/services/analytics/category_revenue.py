@@ -1,6 +1,7 @@
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.database.models import SalesTransaction, ProductMaster
+from app.database.models import ProductMaster
+from app.services.analytics.sales_rollup import SalesRollupService
 from datetime import datetime, timedelta
 
 class CategoryRevenueAnalyzer:
@@ -13,20 +14,18 @@ class CategoryRevenueAnalyzer:
         if not end_date:
             end_date = datetime.now()
         
+        daily = SalesRollupService.daily_sales(start_date, end_date)
+        
         results = db.query(
             ProductMaster.category,
             ProductMaster.sub_category,
-            func.sum(SalesTransaction.quantity_sold).label("quantity"),
-            func.sum(SalesTransaction.quantity_sold * SalesTransaction.sale_price).label("revenue"),
-            func.count(SalesTransaction.id).label("transaction_count")
-        ).join(ProductMaster, SalesTransaction.sku_id == ProductMaster.sku_id)\
-         .filter(
-            and_(
-                SalesTransaction.transaction_date >= start_date,
-                SalesTransaction.transaction_date <= end_date
-            )
-        ).group_by(ProductMaster.category, ProductMaster.sub_category)\
-         .order_by(func.sum(SalesTransaction.quantity_sold * SalesTransaction.sale_price).desc()).all()
+            func.sum(daily.c.qty).label("quantity"),
+            func.sum(daily.c.revenue).label("revenue"),
+            func.sum(daily.c.txn_count).label("transaction_count")
+        ).select_from(daily)\
+         .join(ProductMaster, daily.c.sku_id == ProductMaster.sku_id)\
+         .group_by(ProductMaster.category, ProductMaster.sub_category)\
+         .order_by(func.sum(daily.c.revenue).desc()).all()
         
         total_revenue = sum(float(r.revenue) if r.revenue else 0 for r in results)
         
@@ -0,0 +1,101 @@
+"""
+app/services/analytics/dashboard.py
+
+Concurrent fan-out for the unified dashboard.
+
+Each section is a synchronous calculator call run on a bounded thread
+pool (DASHBOARD_CONCURRENCY workers) with its own pooled Session, so
+sections overlap instead of running back to back, and neither their
+queries nor their pandas/Python work ever run on the event loop.
+Sections that miss the deadline or fail are reported as such and left
+out of the data; the rest of the dashboard is still returned. A thread
+cannot be interrupted, so a timed-out section finishes in the background
+(and closes its session) while the response goes out without it.
+"""
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database.connection import SessionLocal
+from config import get_settings
+
+settings = get_settings()
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.DASHBOARD_CONCURRENCY,
+    thread_name_prefix="dashboard"
+)
+
+
+def _run_section(section: Callable[[Session], Any]):
+    """Run one section on its own session; returns (result, duration_ms)."""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        return section(db), round((time.perf_counter() - started) * 1000, 2)
+    finally:
+        db.close()
+
+
+class DashboardService:
+
+    @staticmethod
+    async def build(
+        sections: Dict[str, Callable[[Session], Any]],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Run all sections concurrently.
+        - sections: name -> callable(db) returning the section payload
+        - timeout: per-section deadline in seconds, counted from the start
+          of the request (default: DASHBOARD_SECTION_TIMEOUT)
+        """
+        timeout = settings.DASHBOARD_SECTION_TIMEOUT if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        def elapsed_ms():
+            return round((time.perf_counter() - started) * 1000, 2)
+
+        # Each section gets a copy of the request context (SQL instrumentation)
+        futures = {
+            name: loop.run_in_executor(_executor, contextvars.copy_context().run, _run_section, section)
+            for name, section in sections.items()
+        }
+
+        async def wait(name, future):
+            try:
+                result, duration_ms = await asyncio.wait_for(asyncio.shield(future), timeout)
+                return name, result, {"status": "ok", "duration_ms": duration_ms}
+            except asyncio.TimeoutError:
+                return name, None, {"status": "timeout", "duration_ms": elapsed_ms()}
+            except Exception as e:
+                return name, None, {"status": "error", "message": str(e), "duration_ms": elapsed_ms()}
+
+        outcomes = await asyncio.gather(*(wait(name, future) for name, future in futures.items()))
+
+        data, section_meta = {}, {}
+        for name, result, meta in outcomes:
+            section_meta[name] = meta
+            if meta["status"] == "ok":
+                data[name] = result
+
+        complete = all(meta["status"] == "ok" for meta in section_meta.values())
+        return {
+            "status": "success" if complete else "partial",
+            "data": data,
+            "meta": {
+                "duration_ms": elapsed_ms(),
+                "sections": section_meta
+            }
+        }
+
+    @staticmethod
+    def shutdown():
+        """Stop accepting work; running sections are not waited for."""
+        _executor.shutdown(wait=False)
@@ -9,19 +9,23 @@ Robust DynamicPricingEngine:
 - Clean fallbacks when data is sparse
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database.models import ProductMaster, SalesTransaction, StockReceipt
+from sqlalchemy import and_, func, select
+from app.database.models import ProductMaster, SalesTransaction, StockBalance
+from app.services.analytics.stock_balance import StockBalanceService
+from app.services.utils.elasticity import (
+    ElasticityStore, DEFAULT_ELASTICITY, ELASTICITY_MIN, ELASTICITY_MAX
+)
 
 import numpy as np
 from datetime import datetime, timedelta
 
 
 class DynamicPricingEngine:
-    DEFAULT_ELASTICITY_FALLBACK = -1.2
-    ELASTICITY_MIN = -5.0
-    ELASTICITY_MAX = -0.2
+    DEFAULT_ELASTICITY_FALLBACK = DEFAULT_ELASTICITY
+    ELASTICITY_MIN = ELASTICITY_MIN
+    ELASTICITY_MAX = ELASTICITY_MAX
 
     @staticmethod
     def _get_sales_aggregates(
@@ -155,12 +159,8 @@ class DynamicPricingEngine:
         cost_price = float(product.unit_cost_price or 0.0)
         original_price = float(product.unit_selling_price or 0.0)
 
-        # 2) Current stock (sum of receipts - sum of sales across all time)
-        received = db.query(func.coalesce(func.sum(StockReceipt.quantity_received), 0))\
-                    .filter(StockReceipt.sku_id == sku_id).scalar() or 0
-        sold = db.query(func.coalesce(func.sum(SalesTransaction.quantity_sold), 0))\
-                 .filter(SalesTransaction.sku_id == sku_id).scalar() or 0
-        current_stock = int(max(received - sold, 0))
+        # 2) Current stock (materialized receipts - sales across all time)
+        current_stock = max(StockBalanceService.get_on_hand(db, sku_id), 0)
 
         if current_stock <= 0:
             return {
@@ -212,8 +212,10 @@ class DynamicPricingEngine:
                     "status": "no_sales_history"
                 }
 
-        # 4) Elasticity estimation using aggregated pairs
-        elasticity = DynamicPricingEngine.estimate_elasticity_from_pairs(pairs)
+        # 4) Elasticity: precomputed store, else a fit on the aggregated pairs
+        elasticity = ElasticityStore.get(db, sku_id)
+        if elasticity is None:
+            elasticity = DynamicPricingEngine.estimate_elasticity_from_pairs(pairs)
 
         # 5) Required daily sales to clear inventory
         daily_sales_required = float(current_stock) / max(int(clearance_days), 1)
@@ -314,3 +316,259 @@ class DynamicPricingEngine:
             "base_daily_qty": round(base_daily_qty, 2),
             "status": "success"
         }
+
+    # -------------------------------------------------------------
+    # Batch API (whole category / SKU list in a few grouped queries)
+    # -------------------------------------------------------------
+    @staticmethod
+    def _elasticities_from_buckets(
+        codes: np.ndarray, prices: np.ndarray, quantities: np.ndarray, n_skus: int
+    ) -> np.ndarray:
+        """
+        estimate_elasticity_from_pairs for every SKU at once: least-squares
+        slope of log(qty) on log(price) per SKU (codes = SKU row of each
+        price bucket), with the same fallback and caps.
+        """
+        elasticity = np.full(n_skus, DynamicPricingEngine.DEFAULT_ELASTICITY_FALLBACK)
+        valid = (prices > 0) & (quantities > 0)
+        if not valid.any():
+            return elasticity
+
+        codes = codes[valid]
+        x = np.log(prices[valid])
+        y = np.log(quantities[valid])
+
+        # Buckets are grouped by price, so the bucket count is the number of distinct prices
+        n = np.bincount(codes, minlength=n_skus).astype(float)
+        safe_n = np.maximum(n, 1)
+        x_mean = np.bincount(codes, x, minlength=n_skus) / safe_n
+        y_mean = np.bincount(codes, y, minlength=n_skus) / safe_n
+        dx = x - x_mean[codes]
+        sxx = np.bincount(codes, dx * dx, minlength=n_skus)
+        sxy = np.bincount(codes, dx * (y - y_mean[codes]), minlength=n_skus)
+
+        fitted = (n >= 2) & (sxx > 0)
+        slope = np.divide(sxy, sxx, out=np.zeros(n_skus), where=fitted)
+        capped = np.clip(slope, DynamicPricingEngine.ELASTICITY_MIN, DynamicPricingEngine.ELASTICITY_MAX)
+        elasticity[fitted] = capped[fitted]
+        return elasticity
+
+    @staticmethod
+    def recommend_prices_batch(
+        db: Session,
+        sku_ids: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        clearance_days: int = 14,
+        margin_floor: float = 0.05,
+        lookback_days: int = 90,
+        candidate_lower_pct: float = 0.5,
+        candidate_upper_pct: float = 1.2,
+        candidate_steps: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        recommend_price for many SKUs: either an explicit sku_ids list
+        (results in that order) or every SKU of a category (by sku_id).
+        Product metadata + stock, price buckets and history spans are
+        fetched in one grouped query each, and the SKU x candidate demand
+        matrix is evaluated in NumPy.
+        """
+        if sku_ids is None and category is None:
+            raise ValueError("recommend_prices_batch needs sku_ids or category")
+
+        # 1) Product metadata + current stock (one query)
+        products_q = db.query(
+            ProductMaster.sku_id,
+            ProductMaster.product_name,
+            ProductMaster.category,
+            ProductMaster.unit_cost_price,
+            ProductMaster.unit_selling_price,
+            func.coalesce(StockBalance.on_hand, 0).label("on_hand")
+        ).outerjoin(StockBalance, StockBalance.sku_id == ProductMaster.sku_id)
+
+        if sku_ids is not None:
+            products_q = products_q.filter(ProductMaster.sku_id.in_(sku_ids))
+            sku_filter = SalesTransaction.sku_id.in_(sku_ids)
+        else:
+            products_q = products_q.filter(ProductMaster.category == category).order_by(ProductMaster.sku_id)
+            sku_filter = SalesTransaction.sku_id.in_(
+                select(ProductMaster.sku_id).where(ProductMaster.category == category)
+            )
+
+        products = products_q.all()
+        index = {p.sku_id: i for i, p in enumerate(products)}
+        n_skus = len(products)
+
+        cost = np.array([float(p.unit_cost_price or 0.0) for p in products])
+        original = np.array([float(p.unit_selling_price or 0.0) for p in products])
+        stock = np.array([max(int(p.on_hand or 0), 0) for p in products], dtype=float)
+
+        # 2) Price buckets per SKU over the lookback window (one query)
+        windowed = bool(lookback_days and lookback_days > 0)
+        buckets_q = db.query(
+            SalesTransaction.sku_id,
+            SalesTransaction.sale_price,
+            func.sum(SalesTransaction.quantity_sold)
+        ).filter(sku_filter)
+        if windowed:
+            cutoff = datetime.utcnow() - timedelta(days=lookback_days)
+            buckets_q = buckets_q.filter(SalesTransaction.transaction_date >= cutoff)
+        buckets = [b for b in buckets_q.group_by(SalesTransaction.sku_id, SalesTransaction.sale_price).all()
+                   if b[0] in index]
+
+        codes = np.array([index[b[0]] for b in buckets], dtype=int)
+        bucket_prices = np.array([float(b[1]) if b[1] is not None else 0.0 for b in buckets])
+        bucket_qty = np.array([float(b[2] or 0) for b in buckets])
+
+        total_qty = np.bincount(codes, bucket_qty, minlength=n_skus)
+        has_pairs = np.bincount(codes, minlength=n_skus) > 0
+
+        # Days in window: fixed, or each SKU's first..last sale span (one query)
+        if windowed:
+            days_in_window = np.full(n_skus, float(lookback_days))
+        else:
+            days_in_window = np.ones(n_skus)
+            spans = db.query(
+                SalesTransaction.sku_id,
+                func.min(SalesTransaction.transaction_date),
+                func.max(SalesTransaction.transaction_date)
+            ).filter(sku_filter).group_by(SalesTransaction.sku_id).all()
+            for sku, first, last in spans:
+                if sku in index and first and last:
+                    days_in_window[index[sku]] = max((last - first).days, 1)
+
+        # 3) Baseline price (quantity-weighted over buckets) and daily demand
+        weighted = np.bincount(codes, np.where(bucket_prices > 0, bucket_prices * bucket_qty, 0.0), minlength=n_skus)
+        base_price = np.where(has_pairs & (total_qty > 0), weighted / np.maximum(total_qty, 1e-12), original)
+        base_daily = total_qty / np.maximum(days_in_window, 1)
+
+        # SKUs without sales in the window fall back to their last sale ever (one query)
+        no_history = ~has_pairs & (total_qty == 0) & (stock > 0)
+        has_last_sale = np.zeros(n_skus, dtype=bool)
+        if no_history.any():
+            needed = [products[i].sku_id for i in np.flatnonzero(no_history)]
+            last_dates = select(
+                SalesTransaction.sku_id.label("sku_id"),
+                func.max(SalesTransaction.transaction_date).label("last_date")
+            ).where(SalesTransaction.sku_id.in_(needed)).group_by(SalesTransaction.sku_id).subquery()
+            last_sales = db.query(
+                SalesTransaction.sku_id, SalesTransaction.sale_price, SalesTransaction.quantity_sold
+            ).join(last_dates, and_(
+                SalesTransaction.sku_id == last_dates.c.sku_id,
+                SalesTransaction.transaction_date == last_dates.c.last_date
+            )).all()
+            for sku, price, quantity in last_sales:
+                i = index[sku]
+                if has_last_sale[i]:
+                    continue
+                has_last_sale[i] = True
+                base_price[i] = float(price or original[i])
+                base_daily[i] = float(quantity or 1)
+
+        # 4) Elasticity per SKU: precomputed store, else fitted on the buckets
+        elasticity = DynamicPricingEngine._elasticities_from_buckets(codes, bucket_prices, bucket_qty, n_skus)
+        stored = ElasticityStore.for_skus(db, list(index))
+        for sku, value in stored.items():
+            elasticity[index[sku]] = value
+
+        # 5) SKU x candidate grid and demand matrix
+        price_center = np.where(original > 0, original, np.where(base_price != 0, base_price, cost * (1 + margin_floor)))
+        grid = np.linspace(price_center * candidate_lower_pct, price_center * candidate_upper_pct, candidate_steps, axis=1)
+        min_allowed = (cost * (1 + margin_floor))[:, None]
+
+        demand_defined = (grid > 0) & (base_price[:, None] > 0) & (base_daily[:, None] > 0)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            demand = np.where(
+                demand_defined,
+                base_daily[:, None] * (grid / np.where(base_price > 0, base_price, 1.0)[:, None]) ** elasticity[:, None],
+                0.0
+            )
+            days_to_clear = np.where(demand > 0, stock[:, None] / demand, np.inf)
+
+        valid = (grid >= min_allowed) & (demand > 0) & np.isfinite(demand)
+        meets = valid & (days_to_clear <= clearance_days)
+
+        # Highest price that meets the target, else the lowest valid price
+        last_meeting = candidate_steps - 1 - np.argmax(meets[:, ::-1], axis=1)
+        first_valid = np.argmax(valid, axis=1)
+        choice = np.where(meets.any(axis=1), last_meeting, first_valid)
+        picked = valid.any(axis=1)
+
+        rows = np.arange(n_skus)
+        best_price = grid[rows, choice]
+        best_daily = demand[rows, choice]
+        best_days = days_to_clear[rows, choice]
+
+        # 6) Output, one dict per SKU (same shape as recommend_price)
+        results = []
+        for i, product in enumerate(products):
+            results.append(DynamicPricingEngine._batch_result(
+                product, cost[i], original[i], int(stock[i]), has_pairs[i] or total_qty[i] > 0 or has_last_sale[i],
+                float(base_price[i]), float(base_daily[i]), float(elasticity[i]),
+                float(best_price[i]) if picked[i] else None, float(best_daily[i]), float(best_days[i]),
+                price_center[i], clearance_days, margin_floor
+            ))
+
+        if sku_ids is None:
+            return results
+        by_sku = {r["sku_id"]: r for r in results}
+        return [by_sku.get(sku, {"error": "SKU not found", "sku_id": sku}) for sku in sku_ids]
+
+    @staticmethod
+    def _batch_result(
+        product, cost_price: float, original_price: float, current_stock: int, has_history: bool,
+        base_price: float, base_daily_qty: float, elasticity: float,
+        price: Optional[float], projected_daily: float, days_to_clear: float,
+        price_center: float, clearance_days: int, margin_floor: float
+    ) -> Dict[str, Any]:
+        if current_stock <= 0:
+            return {
+                "sku_id": product.sku_id,
+                "status": "no_stock",
+                "message": "No stock available for pricing"
+            }
+
+        if not has_history:
+            fallback_price = max(original_price, cost_price * (1 + margin_floor))
+            return {
+                "sku_id": product.sku_id,
+                "product_name": product.product_name,
+                "category": product.category,
+                "current_price": original_price,
+                "recommended_price": round(fallback_price, 2),
+                "discount_percentage": round(max(0, (original_price - fallback_price) / (original_price or 1) * 100), 2),
+                "cost_price": cost_price,
+                "margin_after_discount": round(fallback_price - cost_price, 2),
+                "margin_floor_used": margin_floor,
+                "current_inventory": current_stock,
+                "clearance_days_target": clearance_days,
+                "projected_daily_sales": 0.0,
+                "projected_days_to_clear": float("inf"),
+                "elasticity_estimate": None,
+                "status": "no_sales_history"
+            }
+
+        if price is None:
+            price = max(cost_price * (1 + margin_floor), price_center * 0.9)
+            projected_daily = DynamicPricingEngine.predict_demand(base_price, base_daily_qty, elasticity, price)
+            days_to_clear = float(current_stock) / projected_daily if projected_daily > 0 else float("inf")
+
+        recommended_price = round(price, 2)
+        return {
+            "sku_id": product.sku_id,
+            "product_name": product.product_name,
+            "category": product.category,
+            "current_price": round(original_price, 2),
+            "recommended_price": recommended_price,
+            "discount_percentage": round(max(0.0, (original_price - recommended_price) / (original_price or 1) * 100.0), 2),
+            "cost_price": round(cost_price, 2),
+            "margin_after_discount": round(recommended_price - cost_price, 2),
+            "margin_floor_used": margin_floor,
+            "current_inventory": current_stock,
+            "clearance_days_target": clearance_days,
+            "projected_daily_sales": round(projected_daily, 2),
+            "projected_days_to_clear": round(days_to_clear, 2),
+            "elasticity_estimate": round(elasticity, 4),
+            "base_price_used": round(base_price, 2),
+            "base_daily_qty": round(base_daily_qty, 2),
+            "status": "success"
+        }
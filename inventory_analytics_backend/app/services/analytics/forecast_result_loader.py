@@ -0,0 +1,249 @@
+"""
+app/services/analytics/forecast_result_loader.py
+
+Offline forecast store, written by scripts/build_forecasts.py and read by
+/analytics/forecast.
+
+Layout (FORECAST_STORE_DIR):
+
+    forecast_results/
+    ├── CURRENT                       # run id of the live run
+    └── runs/<run_id>/
+        ├── sku_forecast.npy          # float32 SKU x day forecasts
+        ├── sku_average.npy           # float64 average daily sales per SKU
+        ├── category_forecast.npy     # float32 category x day (sum of its SKUs)
+        └── metadata.json             # run info + sku_ids / categories (row order)
+
+A run directory is written completely under a temporary name and renamed
+into place, then CURRENT is replaced (os.replace), so readers only ever
+see whole runs. The API memory-maps the current run once; a per-SKU read
+is a dict lookup for the row offset plus one row slice. CURRENT is
+re-checked at most every FORECAST_STORE_CHECK_INTERVAL seconds and a new
+run is swapped in with a single reference assignment.
+"""
+
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import get_settings
+
+settings = get_settings()
+
+BASE_DIR = Path(__file__).resolve().parents[3]
+CURRENT_FILE = "CURRENT"
+RUNS_DIR = "runs"
+KEEP_RUNS = 3
+
+
+def store_dir() -> Path:
+    path = Path(settings.FORECAST_STORE_DIR)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+class ForecastRun:
+    """One loaded (memory-mapped) run."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / "metadata.json", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+
+        self.sku_forecast = np.load(path / "sku_forecast.npy", mmap_mode="r")
+        self.sku_average = np.load(path / "sku_average.npy", mmap_mode="r")
+        self.category_forecast = np.load(path / "category_forecast.npy", mmap_mode="r")
+
+        self.sku_index = {sku: i for i, sku in enumerate(self.metadata["sku_ids"])}
+        self.category_index = {c: i for i, c in enumerate(self.metadata["categories"])}
+        self.start_date = date.fromisoformat(self.metadata["start_date"])
+        self.horizon_days = int(self.metadata["horizon_days"])
+        self.model = self.metadata.get("model", "moving_average")
+
+    @property
+    def run_id(self) -> str:
+        return self.metadata["run_id"]
+
+    def is_fresh(self) -> bool:
+        created_at = datetime.fromisoformat(self.metadata["created_at"])
+        return datetime.utcnow() - created_at <= timedelta(hours=settings.FORECAST_STORE_MAX_AGE_HOURS)
+
+    def offset(self) -> int:
+        """Column of tomorrow's forecast (runs built on an earlier day are shifted)."""
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return max((tomorrow - self.start_date).days, 0)
+
+    def covers(self, forecast_days: int) -> bool:
+        return self.offset() + forecast_days <= self.horizon_days
+
+    def window(self, forecast_days: int) -> slice:
+        offset = self.offset()
+        return slice(offset, offset + forecast_days)
+
+    def dates(self, forecast_days: int) -> List[str]:
+        first = self.start_date + timedelta(days=self.offset())
+        return [(first + timedelta(days=day)).isoformat() for day in range(forecast_days)]
+
+    def _quantities(self, values: np.ndarray) -> np.ndarray:
+        # Same rounding as ForecastingEngine.run_model for the run's model
+        if self.model == "moving_average":
+            return np.rint(values).astype(np.int32)
+        return np.round(values.astype(np.float64), 2)
+
+    def _sku_result(self, row: int, sku_id: str, dates: List[str]) -> dict:
+        quantities = self._quantities(self.sku_forecast[row, self.window(len(dates))]).tolist()
+        return {
+            "sku_id": sku_id,
+            "forecast_days": len(dates),
+            "model": self.model,
+            "average_daily_sales": round(float(self.sku_average[row]), 2),
+            "forecast": [{"date": d, "forecast_quantity": q} for d, q in zip(dates, quantities)]
+        }
+
+    def forecast_sku(self, sku_id: str, forecast_days: int) -> Optional[dict]:
+        row = self.sku_index.get(sku_id)
+        if row is None:
+            return None
+        return self._sku_result(row, sku_id, self.dates(forecast_days))
+
+    def forecast_all(self, forecast_days: int) -> List[dict]:
+        dates = self.dates(forecast_days)
+        return [self._sku_result(row, sku, dates) for sku, row in self.sku_index.items()]
+
+    def forecast_columns(self, forecast_days: int) -> dict:
+        return {
+            "forecast_days": forecast_days,
+            "model": self.model,
+            "dates": self.dates(forecast_days),
+            "forecasts": {
+                "sku_id": self.metadata["sku_ids"],
+                "average_daily_sales": np.round(np.asarray(self.sku_average), 2),
+                "forecast_quantity": self._quantities(self.sku_forecast[:, self.window(forecast_days)])
+            }
+        }
+
+    def forecast_category(self, category: str, forecast_days: int) -> Optional[dict]:
+        row = self.category_index.get(category)
+        if row is None:
+            return None
+        dates = self.dates(forecast_days)
+        quantities = self._quantities(self.category_forecast[row, self.window(forecast_days)]).tolist()
+        return {
+            "category": category,
+            "forecast_days": forecast_days,
+            "model": self.model,
+            "forecast": [{"date": d, "forecast_quantity": q} for d, q in zip(dates, quantities)]
+        }
+
+
+class ForecastResultLoader:
+
+    def __init__(self):
+        self._run: Optional[ForecastRun] = None
+        self._checked_at = 0.0
+
+    def current(self) -> Optional[ForecastRun]:
+        """The live run (None if there is none), re-checking CURRENT at most once per interval."""
+        now = time.monotonic()
+        if now - self._checked_at < settings.FORECAST_STORE_CHECK_INTERVAL:
+            return self._run
+        self._checked_at = now
+
+        try:
+            run_id = (store_dir() / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        except OSError:
+            self._run = None
+            return None
+
+        if self._run is None or self._run.run_id != run_id:
+            try:
+                self._run = ForecastRun(store_dir() / RUNS_DIR / run_id)
+            except (OSError, ValueError, KeyError):
+                # Keep serving the previous run rather than failing reads
+                pass
+        return self._run
+
+    def usable_run(self, forecast_days: int, model: Optional[str] = None) -> Optional[ForecastRun]:
+        """
+        Current run if it is fresh, covers forecast_days and (when given)
+        was built with `model`; else None (compute live).
+        """
+        run = self.current()
+        if run is None or not run.covers(forecast_days) or not run.is_fresh():
+            return None
+        if model is not None and run.model != model:
+            return None
+        return run
+
+    @staticmethod
+    def write_run(
+        sku_ids: List[str],
+        sku_average: np.ndarray,
+        sku_forecast: np.ndarray,
+        sku_categories: Dict[str, str],
+        start_date: date,
+        extra_metadata: Optional[dict] = None
+    ) -> str:
+        """
+        Write a complete run and make it current. sku_forecast is
+        SKU x day (row i belongs to sku_ids[i]). Returns the run id.
+        """
+        root = store_dir()
+        runs = root / RUNS_DIR
+        runs.mkdir(parents=True, exist_ok=True)
+
+        created_at = datetime.utcnow()
+        run_id = created_at.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+        sku_forecast = np.asarray(sku_forecast, dtype=np.float32)
+        categories = sorted(set(sku_categories.get(sku, "Unknown") for sku in sku_ids))
+        category_row = {category: i for i, category in enumerate(categories)}
+        category_rows = np.array(
+            [category_row[sku_categories.get(sku, "Unknown")] for sku in sku_ids], dtype=np.int64
+        )
+        category_forecast = np.zeros((len(categories), sku_forecast.shape[1]), dtype=np.float32)
+        np.add.at(category_forecast, category_rows, sku_forecast)
+
+        metadata = {
+            "run_id": run_id,
+            "created_at": created_at.isoformat(),
+            "start_date": start_date.isoformat(),
+            "horizon_days": int(sku_forecast.shape[1]),
+            "n_skus": len(sku_ids),
+            **(extra_metadata or {}),
+            "sku_ids": list(sku_ids),
+            "categories": categories
+        }
+
+        staging = runs / (run_id + ".tmp")
+        staging.mkdir()
+        np.save(staging / "sku_forecast.npy", sku_forecast)
+        np.save(staging / "sku_average.npy", np.asarray(sku_average, dtype=np.float64))
+        np.save(staging / "category_forecast.npy", category_forecast)
+        with open(staging / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        os.replace(staging, runs / run_id)
+
+        pointer = root / (CURRENT_FILE + ".tmp")
+        pointer.write_text(run_id, encoding="utf-8")
+        os.replace(pointer, root / CURRENT_FILE)
+
+        ForecastResultLoader._prune_runs(runs, keep=run_id)
+        return run_id
+
+    @staticmethod
+    def _prune_runs(runs: Path, keep: str) -> None:
+        """Delete all but the newest KEEP_RUNS runs (API workers may still map an older one)."""
+        finished = sorted(p for p in runs.iterdir() if p.is_dir() and not p.name.endswith(".tmp"))
+        for old in finished[:-KEEP_RUNS]:
+            if old.name != keep:
+                shutil.rmtree(old, ignore_errors=True)
+
+
+forecast_store = ForecastResultLoader()
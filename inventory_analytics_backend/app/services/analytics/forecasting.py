@@ -1,65 +1,266 @@
-from sqlalchemy import func, and_
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from app.database.models import SalesTransaction, ProductMaster
+from app.services.analytics.sales_rollup import SalesRollupService
+from app.services.utils.pagination import page_result
 from datetime import datetime, timedelta
-import statistics
+from typing import List, Literal, Optional, Tuple, get_args
+import numpy as np
+import pandas as pd
+
+HISTORY_DAYS = 60
+MOVING_AVERAGE_WINDOW = 7
+
+ForecastModel = Literal["moving_average", "croston", "sba", "holt_winters"]
+FORECAST_MODELS = get_args(ForecastModel)
+DEFAULT_MODEL = "moving_average"
+
+# Croston / SBA smoothing of demand sizes and intervals
+CROSTON_ALPHA = 0.1
+
+# Holt-Winters (additive, damped trend, weekly season)
+SEASON_LENGTH = 7
+HW_ALPHA = 0.2
+HW_BETA = 0.05
+HW_GAMMA = 0.1
+HW_PHI = 0.98
 
 class ForecastingEngine:
-    
+
+    @staticmethod
+    def sales_matrix(
+        db: Session,
+        history_days: int = HISTORY_DAYS,
+        sku_id: Optional[str] = None,
+        after_sku: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[str], pd.DatetimeIndex, np.ndarray]:
+        """
+        Daily quantity sold for every SKU with sales in the last `history_days`
+        complete days (today, still in progress, is left out: it would read
+        as a low-demand day), as a dense SKU x day matrix (days without
+        sales are 0).
+        - after_sku/limit: only the first `limit` SKUs (by sku_id) after `after_sku`
+        Returns (sku_ids, days, matrix) with matrix.shape == (len(sku_ids), len(days)).
+        """
+        today = pd.Timestamp(datetime.now().date())
+        first_day = today - pd.Timedelta(days=history_days)
+        last_day = today - pd.Timedelta(days=1)
+        daily = SalesRollupService.daily_sales(
+            first_day.to_pydatetime(), today.to_pydatetime() - timedelta(microseconds=1), sku_id=sku_id
+        )
+
+        # One grouped query for all SKUs (Core select: plain tuples, no ORM row overhead)
+        stmt = select(
+            daily.c.sku_id,
+            daily.c.day,
+            func.sum(daily.c.qty).label("quantity")
+        ).group_by(daily.c.sku_id, daily.c.day)
+
+        if after_sku is not None or limit is not None:
+            page_skus = select(daily.c.sku_id).group_by(daily.c.sku_id).order_by(daily.c.sku_id)
+            if after_sku is not None:
+                page_skus = page_skus.where(daily.c.sku_id > after_sku)
+            if limit is not None:
+                page_skus = page_skus.limit(limit)
+            stmt = stmt.where(daily.c.sku_id.in_(page_skus.scalar_subquery()))
+
+        rows = db.execute(stmt).all()
+
+        days = pd.date_range(first_day, last_day, freq="D")
+        if not rows:
+            return [], days, np.zeros((0, len(days)))
+
+        history = pd.DataFrame(rows, columns=["sku_id", "day", "quantity"])
+        history["day"] = pd.to_datetime(history["day"])
+
+        sku_codes, sku_ids = pd.factorize(history["sku_id"], sort=True)
+        day_codes = (history["day"] - first_day).dt.days.to_numpy()
+
+        matrix = np.zeros((len(sku_ids), len(days)))
+        np.add.at(matrix, (sku_codes, day_codes), history["quantity"].fillna(0).to_numpy(dtype=float))
+        return list(sku_ids), days, matrix
+
+    @staticmethod
+    def _moving_average(matrix: np.ndarray, forecast_days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Trailing moving average for every row of the matrix at once.
+        Returns (average_daily_sales, forecast) with forecast.shape == (rows, forecast_days).
+        """
+        moving_avg = matrix[:, -MOVING_AVERAGE_WINDOW:].mean(axis=1)
+        forecast = np.repeat(np.round(moving_avg).astype(np.int32)[:, None], forecast_days, axis=1)
+        return np.round(moving_avg, 2), forecast
+
+    @staticmethod
+    def _croston(matrix: np.ndarray, forecast_days: int, sba: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Croston's method for intermittent demand, all SKUs at once: separate
+        exponential smoothing of non-zero demand sizes and of the intervals
+        between them; the daily rate is size / interval (flat forecast).
+        sba: Syntetos-Boylan bias correction, rate * (1 - alpha / 2).
+        """
+        n_skus = matrix.shape[0]
+        size = np.zeros(n_skus)
+        interval = np.ones(n_skus)
+        since_last = np.ones(n_skus)
+        seen = np.zeros(n_skus, dtype=bool)
+
+        # Loop over days only; every step updates all SKUs
+        for day in range(matrix.shape[1]):
+            demand = matrix[:, day]
+            hit = demand > 0
+            first = hit & ~seen
+            update = hit & seen
+
+            size[first] = demand[first]
+            interval[first] = since_last[first]
+            size[update] += CROSTON_ALPHA * (demand[update] - size[update])
+            interval[update] += CROSTON_ALPHA * (since_last[update] - interval[update])
+
+            seen |= hit
+            since_last = np.where(hit, 1.0, since_last + 1.0)
+
+        rate = np.where(seen, size / interval, 0.0)
+        if sba:
+            rate *= 1 - CROSTON_ALPHA / 2
+
+        rate = np.round(rate, 2)
+        return rate, np.repeat(rate[:, None], forecast_days, axis=1)
+
     @staticmethod
-    def forecast_sku(db: Session, sku_id: str, forecast_days: int = 30):
-        """Simple moving average forecast for a SKU"""
-        # Get last 60 days of sales data
-        start_date = datetime.now() - timedelta(days=60)
-        
-        sales_history = db.query(
-            func.date(SalesTransaction.transaction_date).label("date"),
-            func.sum(SalesTransaction.quantity_sold).label("quantity")
-        ).filter(
-            and_(
-                SalesTransaction.sku_id == sku_id,
-                SalesTransaction.transaction_date >= start_date
-            )
-        ).group_by(func.date(SalesTransaction.transaction_date))\
-         .order_by("date").all()
-        
-        quantities = [r.quantity or 0 for r in sales_history]
-        
-        if not quantities:
+    def _holt_winters(matrix: np.ndarray, forecast_days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Additive Holt-Winters with a damped trend and weekly seasonality,
+        all SKUs at once (fixed smoothing parameters). Needs two full weeks
+        of history; shorter histories fall back to the moving average.
+        """
+        n_skus, n_days = matrix.shape
+        m = SEASON_LENGTH
+        if n_days < 2 * m:
+            average, forecast = ForecastingEngine._moving_average(matrix, forecast_days)
+            return average, forecast.astype(float)
+
+        first_week = matrix[:, :m].mean(axis=1)
+        level = first_week
+        trend = (matrix[:, m:2 * m].mean(axis=1) - first_week) / m
+        season = matrix[:, :m] - first_week[:, None]
+
+        for day in range(m, n_days):
+            demand = matrix[:, day]
+            s = season[:, day % m]
+            previous_level = level
+            level = HW_ALPHA * (demand - s) + (1 - HW_ALPHA) * (previous_level + HW_PHI * trend)
+            trend = HW_BETA * (level - previous_level) + (1 - HW_BETA) * HW_PHI * trend
+            season[:, day % m] = HW_GAMMA * (demand - level) + (1 - HW_GAMMA) * s
+
+        # h-step damped trend: (phi + phi^2 + ... + phi^h) * trend
+        steps = np.arange(1, forecast_days + 1)
+        damping = np.cumsum(HW_PHI ** steps)
+        season_index = (n_days + steps - 1) % m
+        forecast = level[:, None] + damping[None, :] * trend[:, None] + season[:, season_index]
+
+        forecast = np.round(np.clip(forecast, 0, None), 2)
+        return np.round(forecast.mean(axis=1), 2), forecast
+
+    @staticmethod
+    def run_model(matrix: np.ndarray, forecast_days: int, model: str = DEFAULT_MODEL) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Forecast every row of the SKU x day matrix with `model` (one of
+        FORECAST_MODELS). Returns (average_daily_sales, forecast) with
+        forecast.shape == (rows, forecast_days); moving_average forecasts
+        are whole units, the other models keep two decimals.
+        """
+        if model == "moving_average":
+            return ForecastingEngine._moving_average(matrix, forecast_days)
+        if model == "croston":
+            return ForecastingEngine._croston(matrix, forecast_days)
+        if model == "sba":
+            return ForecastingEngine._croston(matrix, forecast_days, sba=True)
+        if model == "holt_winters":
+            return ForecastingEngine._holt_winters(matrix, forecast_days)
+        raise ValueError(f"Unknown forecast model: {model}")
+
+    @staticmethod
+    def _forecast_dates(forecast_days: int) -> List[str]:
+        today = datetime.now()
+        return [(today + timedelta(days=day)).date().isoformat() for day in range(1, forecast_days + 1)]
+
+    @staticmethod
+    def _forecasts(
+        sku_ids: List[str],
+        matrix: np.ndarray,
+        forecast_days: int,
+        model: str = DEFAULT_MODEL
+    ) -> List[dict]:
+        """One forecast dict per SKU (row of the matrix)."""
+        average_daily, forecast = ForecastingEngine.run_model(matrix, forecast_days, model)
+        dates = ForecastingEngine._forecast_dates(forecast_days)
+
+        return [
+            {
+                "sku_id": sku,
+                "forecast_days": forecast_days,
+                "model": model,
+                "average_daily_sales": avg,
+                "forecast": [{"date": d, "forecast_quantity": qty} for d, qty in zip(dates, quantities)]
+            } for sku, avg, quantities in zip(sku_ids, average_daily.tolist(), forecast.tolist())
+        ]
+
+    @staticmethod
+    def forecast_sku(db: Session, sku_id: str, forecast_days: int = 30, model: str = DEFAULT_MODEL):
+        """Forecast for a SKU (moving average unless another model is given)"""
+        sku_ids, _, matrix = ForecastingEngine.sales_matrix(db, sku_id=sku_id)
+
+        if not sku_ids:
             return {
                 "sku_id": sku_id,
                 "forecast_available": False,
                 "reason": "Insufficient sales history"
             }
-        
-        # Calculate moving average
-        window = 7
-        moving_avg = statistics.mean(quantities[-window:]) if len(quantities) >= window else statistics.mean(quantities)
-        
-        forecast = []
-        for day in range(1, forecast_days + 1):
-            forecast_date = datetime.now() + timedelta(days=day)
-            forecast.append({
-                "date": forecast_date.date().isoformat(),
-                "forecast_quantity": round(moving_avg)
-            })
-        
+
+        return ForecastingEngine._forecasts(sku_ids, matrix, forecast_days, model)[0]
+
+    @staticmethod
+    def forecast_products_page(
+        db: Session,
+        limit: int,
+        after: Optional[List[str]] = None,
+        forecast_days: int = 30,
+        model: str = DEFAULT_MODEL
+    ):
+        """One keyset page (by sku_id) of forecast_all_products."""
+        sku_ids, _, matrix = ForecastingEngine.sales_matrix(
+            db, after_sku=after[0] if after else None, limit=limit + 1
+        )
+        forecasts = ForecastingEngine._forecasts(sku_ids, matrix, forecast_days, model)
+        return page_result(forecasts, limit, key=lambda f: (f["sku_id"],), formatter=lambda f: f)
+
+    @staticmethod
+    def forecast_all_products(db: Session, forecast_days: int = 30, model: str = DEFAULT_MODEL):
+        """Forecast for all products with sales in the history window (one query, vectorized)"""
+        sku_ids, _, matrix = ForecastingEngine.sales_matrix(db)
+        return ForecastingEngine._forecasts(sku_ids, matrix, forecast_days, model)
+
+    @staticmethod
+    def forecast_columns(
+        db: Session,
+        forecast_days: int = 30,
+        sku_id: Optional[str] = None,
+        model: str = DEFAULT_MODEL
+    ):
+        """
+        Same forecasts as forecast_all_products / forecast_sku as parallel
+        arrays: the dates are listed once, forecasts.forecast_quantity is a
+        SKU x day matrix (row i belongs to forecasts.sku_id[i]).
+        """
+        sku_ids, _, matrix = ForecastingEngine.sales_matrix(db, sku_id=sku_id)
+        average_daily, forecast = ForecastingEngine.run_model(matrix, forecast_days, model)
         return {
-            "sku_id": sku_id,
             "forecast_days": forecast_days,
-            "average_daily_sales": round(moving_avg, 2),
-            "forecast": forecast
+            "model": model,
+            "dates": ForecastingEngine._forecast_dates(forecast_days),
+            "forecasts": {
+                "sku_id": sku_ids,
+                "average_daily_sales": average_daily,
+                "forecast_quantity": forecast
+            }
         }
-    
-    @staticmethod
-    def forecast_all_products(db: Session, forecast_days: int = 30):
-        """Forecast for all products"""
-        products = db.query(ProductMaster.sku_id).all()
-        
-        forecasts = []
-        for product in products:
-            forecast = ForecastingEngine.forecast_sku(db, product.sku_id, forecast_days)
-            if forecast.get("forecast_available", True):
-                forecasts.append(forecast)
-        
-        return forecasts
@@ -0,0 +1,146 @@
+"""
+app/services/analytics/hierarchical_forecast.py
+
+Hierarchical forecasts: total → category → sub_category → SKU
+(ProductMaster.category / sub_category).
+
+The SKU x day sales matrix is aggregated to every node of the hierarchy
+with one sparse summing matrix S (nodes x SKUs, a 1 where the SKU
+belongs to the node), the base forecasts for all nodes come from one
+vectorized run_model call, and they are made coherent (every node equals
+the sum of its children) by reconciliation:
+- bottom_up: SKU base forecasts, summed up through S
+- top_down: the total's base forecast, split to SKUs by their historical
+  share of total sales, then summed up through S
+"""
+
+from typing import Dict, List, Literal, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.database.models import ProductMaster
+from app.services.analytics.forecasting import ForecastingEngine, DEFAULT_MODEL, HISTORY_DAYS
+
+ReconciliationMethod = Literal["bottom_up", "top_down"]
+HierarchyLevel = Literal["total", "category", "sub_category", "sku"]
+
+TOTAL_KEY = "ALL"
+
+
+class Hierarchy:
+    """Nodes of the product hierarchy over a fixed SKU order, with its summing matrix."""
+
+    def __init__(self, sku_ids: List[str], categories: Dict[str, Tuple[str, str]]):
+        self.sku_ids = list(sku_ids)
+        sku_category = [categories.get(sku, ("Unknown", "Unknown"))[0] for sku in self.sku_ids]
+        # Sub-category names repeat across categories, so nodes are keyed by both
+        sku_sub = [(c, categories.get(sku, ("Unknown", "Unknown"))[1]) for sku, c in zip(self.sku_ids, sku_category)]
+
+        category_keys = sorted(set(sku_category))
+        sub_keys = sorted(set(sku_sub))
+
+        self.levels: Dict[str, slice] = {}
+        self.keys: List[str] = []
+        self.parents: List[Optional[str]] = []
+
+        def add_level(name, keys, parents):
+            start = len(self.keys)
+            self.keys.extend(keys)
+            self.parents.extend(parents)
+            self.levels[name] = slice(start, len(self.keys))
+
+        add_level("total", [TOTAL_KEY], [None])
+        add_level("category", category_keys, [TOTAL_KEY] * len(category_keys))
+        add_level("sub_category", [f"{c} / {s}" for c, s in sub_keys], [c for c, _ in sub_keys])
+        add_level("sku", self.sku_ids, [f"{c} / {s}" for c, s in sku_sub])
+
+        # One non-zero per SKU and aggregate level: rows = nodes, columns = SKUs
+        n_skus = len(self.sku_ids)
+        category_row = {c: i for i, c in enumerate(category_keys)}
+        sub_row = {k: i for i, k in enumerate(sub_keys)}
+        columns = np.arange(n_skus)
+        rows = np.concatenate([
+            np.zeros(n_skus, dtype=np.int64),
+            self.levels["category"].start + np.array([category_row[c] for c in sku_category], dtype=np.int64),
+            self.levels["sub_category"].start + np.array([sub_row[k] for k in sku_sub], dtype=np.int64),
+            self.levels["sku"].start + columns
+        ])
+        self.summing = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, np.tile(columns, 4))),
+            shape=(len(self.keys), n_skus)
+        )
+
+    @staticmethod
+    def load(db: Session, sku_ids: List[str]) -> "Hierarchy":
+        categories = {
+            sku: (category, sub_category) for sku, category, sub_category in db.query(
+                ProductMaster.sku_id, ProductMaster.category, ProductMaster.sub_category
+            ).filter(ProductMaster.sku_id.in_(sku_ids)).all()
+        }
+        return Hierarchy(sku_ids, categories)
+
+
+class HierarchicalForecaster:
+
+    @staticmethod
+    def reconcile(
+        hierarchy: Hierarchy,
+        history: np.ndarray,
+        forecast_days: int,
+        model: str = DEFAULT_MODEL,
+        method: str = "bottom_up"
+    ) -> np.ndarray:
+        """
+        Coherent forecasts for every node (nodes x forecast_days, in
+        hierarchy.keys order) from the SKU x day history.
+        """
+        S = hierarchy.summing
+        all_history = S @ history
+        _, base = ForecastingEngine.run_model(all_history, forecast_days, model)
+        base = np.asarray(base, dtype=float)
+
+        if method == "bottom_up":
+            sku_forecast = base[hierarchy.levels["sku"]]
+        elif method == "top_down":
+            total_sales = all_history[0].sum()
+            shares = history.sum(axis=1) / total_sales if total_sales > 0 else np.zeros(history.shape[0])
+            sku_forecast = shares[:, None] * base[0][None, :]
+        else:
+            raise ValueError(f"Unknown reconciliation method: {method}")
+
+        return S @ sku_forecast
+
+    @staticmethod
+    def forecast(
+        db: Session,
+        forecast_days: int = 30,
+        level: str = "category",
+        model: str = DEFAULT_MODEL,
+        method: str = "bottom_up",
+        history_days: int = HISTORY_DAYS
+    ) -> dict:
+        """Reconciled forecasts for every node of one hierarchy level."""
+        sku_ids, _, history = ForecastingEngine.sales_matrix(db, history_days)
+        hierarchy = Hierarchy.load(db, sku_ids)
+        forecasts = HierarchicalForecaster.reconcile(hierarchy, history, forecast_days, model, method)
+
+        dates = ForecastingEngine._forecast_dates(forecast_days)
+        rows = hierarchy.levels[level]
+        values = np.round(forecasts[rows], 2)
+
+        return {
+            "level": level,
+            "model": model,
+            "method": method,
+            "forecast_days": forecast_days,
+            "nodes": [
+                {
+                    "key": key,
+                    "parent": parent,
+                    "forecast_total": round(float(node.sum()), 2),
+                    "forecast": [{"date": d, "forecast_quantity": q} for d, q in zip(dates, node.tolist())]
+                } for key, parent, node in zip(hierarchy.keys[rows], hierarchy.parents[rows], values)
+            ]
+        }
@@ -1,10 +1,84 @@
-from sqlalchemy import func, case
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from app.database.models import ProductMaster, StockReceipt, SalesTransaction
+from app.database.models import ProductMaster, StockReceipt, StockBalance, SalesTransaction
+from app.services.utils.pagination import keyset_after, page_result
+from typing import Any, List, Optional
 
 
 class InventoryValueCalculator:
 
+    @staticmethod
+    def on_hand_since_start():
+        """
+        (sold_before_start subquery, on-hand expression) for valuing inventory
+        from the first receipt date on.
+
+        stock_balance.on_hand counts every sale; sales dated before the first
+        receipt (history from before stock was tracked) are added back. Only
+        that date range of sales is aggregated (transaction_date index).
+        """
+        start = select(func.min(StockReceipt.receipt_date)).scalar_subquery()
+        sold_before_start = select(
+            SalesTransaction.sku_id.label("sku_id"),
+            func.sum(SalesTransaction.quantity_sold).label("qty")
+        ).where(SalesTransaction.transaction_date < start)\
+         .group_by(SalesTransaction.sku_id).subquery("sold_before_start")
+
+        on_hand = StockBalance.on_hand + func.coalesce(sold_before_start.c.qty, 0)
+        return sold_before_start, on_hand
+
+    @staticmethod
+    def inventory_products_query(category: str = None, after: Optional[List[Any]] = None):
+        """
+        Products with stock on hand (keyset order: category, sku_id).
+        `after` is the key of the last row seen.
+        """
+        sold_before_start, on_hand = InventoryValueCalculator.on_hand_since_start()
+        stmt = select(
+            ProductMaster.category,
+            ProductMaster.sku_id,
+            ProductMaster.product_name,
+            ProductMaster.unit_cost_price,
+            on_hand.label("on_hand")
+        ).join(StockBalance, ProductMaster.sku_id == StockBalance.sku_id)\
+         .outerjoin(sold_before_start, sold_before_start.c.sku_id == ProductMaster.sku_id)\
+         .where(on_hand > 0)\
+         .order_by(ProductMaster.category, ProductMaster.sku_id)
+
+        if category:
+            stmt = stmt.where(ProductMaster.category == category)
+        if after:
+            stmt = stmt.where(keyset_after([ProductMaster.category, ProductMaster.sku_id], after))
+        return stmt
+
+    @staticmethod
+    def inventory_product_row(item):
+        return {
+            "category": item.category,
+            "sku_id": item.sku_id,
+            "product_name": item.product_name,
+            "quantity": item.on_hand,
+            "unit_cost": float(item.unit_cost_price),
+            "value": item.on_hand * item.unit_cost_price
+        }
+
+    @staticmethod
+    def get_inventory_products_page(
+        db: Session,
+        limit: int,
+        after: Optional[List[Any]] = None,
+        category: str = None
+    ):
+        """One keyset page of per-product inventory values."""
+        rows = db.execute(
+            InventoryValueCalculator.inventory_products_query(category, after).limit(limit + 1)
+        ).all()
+        return page_result(
+            rows, limit,
+            key=lambda r: (r.category, r.sku_id),
+            formatter=InventoryValueCalculator.inventory_product_row
+        )
+
     @staticmethod
     def calculate_current_inventory_value(db: Session):
 
@@ -21,45 +95,19 @@ class InventoryValueCalculator:
                 "by_category": []
             }
 
-        # 2️⃣ Query inventory using CASE (correct usage)
+        # 2️⃣ On-hand stock from the materialized stock_balance table,
+        #    counting only sales on/after the first receipt date
+        sold_before_start, on_hand = InventoryValueCalculator.on_hand_since_start()
         inventory_data = db.query(
             ProductMaster.sku_id,
             ProductMaster.product_name,
             ProductMaster.category,
             ProductMaster.unit_cost_price,
             ProductMaster.unit_selling_price,
-
-            # receipts after cutoff
-            func.coalesce(
-                func.sum(
-                    case(
-                        (StockReceipt.receipt_date >= first_receipt_date,
-                         StockReceipt.quantity_received),
-                        else_=0
-                    )
-                ), 0
-            ).label("total_received"),
-
-            # sales after cutoff
-            func.coalesce(
-                func.sum(
-                    case(
-                        (SalesTransaction.transaction_date >= first_receipt_date,
-                         SalesTransaction.quantity_sold),
-                        else_=0
-                    )
-                ), 0
-            ).label("total_sold")
-
-        ).outerjoin(StockReceipt, ProductMaster.sku_id == StockReceipt.sku_id) \
-         .outerjoin(SalesTransaction, ProductMaster.sku_id == SalesTransaction.sku_id) \
-         .group_by(
-            ProductMaster.sku_id,
-            ProductMaster.product_name,
-            ProductMaster.category,
-            ProductMaster.unit_cost_price,
-            ProductMaster.unit_selling_price
-        ).all()
+            on_hand.label("on_hand")
+        ).join(StockBalance, ProductMaster.sku_id == StockBalance.sku_id) \
+         .outerjoin(sold_before_start, sold_before_start.c.sku_id == ProductMaster.sku_id) \
+         .filter(on_hand > 0).all()
 
         # 3️⃣ Build valuation results
         total_inventory_value = 0.0
@@ -67,9 +115,7 @@ class InventoryValueCalculator:
         by_category = {}
 
         for item in inventory_data:
-            current_qty = max(item.total_received - item.total_sold, 0)
-            if current_qty <= 0:
-                continue
+            current_qty = item.on_hand
 
             inventory_value = current_qty * item.unit_cost_price
 
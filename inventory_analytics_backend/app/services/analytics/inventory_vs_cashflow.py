@@ -1,14 +1,19 @@
-from sqlalchemy import func
+from sqlalchemy import Date, func
 from sqlalchemy.orm import Session
-from app.database.models import ProductMaster, StockReceipt, SalesTransaction
+from app.database.models import ProductMaster, StockReceipt, SalesTransaction, StockBalance
+from app.services.analytics.sales_rollup import SalesRollupService
 from datetime import datetime, timedelta
 
 
 class CashFlowAnalyzer:
 
     @staticmethod
-    def analyze_cash_flow(db: Session, days: int = 30):
-        """Analyze inventory value and cash flow for the last N days."""
+    def analyze_cash_flow(db: Session, days: int = 30, columnar: bool = False):
+        """
+        Analyze inventory value and cash flow for the last N days.
+        - columnar: also return the per-day series behind the totals as
+          parallel arrays (daily_data), for charting
+        """
 
         start_date = datetime.now() - timedelta(days=days)
 
@@ -40,28 +45,13 @@ class CashFlowAnalyzer:
 
         # -------------------------------
         # 3. CURRENT INVENTORY VALUE
-        # (Fix: Use a subquery to avoid nested aggregates)
+        # (from the materialized stock_balance table)
         # -------------------------------
-        subquery = (
-            db.query(
-                ProductMaster.sku_id.label("sku_id"),
-                func.coalesce(func.sum(StockReceipt.quantity_received), 0).label("received"),
-                func.coalesce(func.sum(SalesTransaction.quantity_sold), 0).label("sold"),
-                ProductMaster.unit_cost_price.label("unit_cost_price"),
-            )
-            .outerjoin(StockReceipt, ProductMaster.sku_id == StockReceipt.sku_id)
-            .outerjoin(SalesTransaction, ProductMaster.sku_id == SalesTransaction.sku_id)
-            .group_by(ProductMaster.sku_id, ProductMaster.unit_cost_price)
-            .subquery()
-        )
-
         inventory_value = (
             db.query(
-                func.sum(
-                    (subquery.c.received - subquery.c.sold)
-                    * subquery.c.unit_cost_price
-                )
+                func.sum(StockBalance.on_hand * ProductMaster.unit_cost_price)
             )
+            .join(ProductMaster, ProductMaster.sku_id == StockBalance.sku_id)
             .scalar()
         )
 
@@ -83,7 +73,7 @@ class CashFlowAnalyzer:
         # -------------------------------
         # RESPONSE
         # -------------------------------
-        return {
+        result = {
             "period_days": days,
             "total_cash_inflow": round(total_cash_inflow, 2),
             "total_cash_outflow": round(total_cash_outflow, 2),
@@ -91,3 +81,34 @@ class CashFlowAnalyzer:
             "current_inventory_value": round(current_inventory_value, 2),
             "cash_conversion_ratio": round(cash_conversion_ratio, 2),
         }
+        if columnar:
+            result["daily_data"] = CashFlowAnalyzer.daily_cash_flow(db, start_date)
+        return result
+
+    @staticmethod
+    def daily_cash_flow(db: Session, start_date: datetime):
+        """Per-day inflow (sales) / outflow (purchases) since start_date, as parallel arrays."""
+        daily = SalesRollupService.daily_sales(start_date)
+        inflow = dict(
+            db.query(daily.c.day, func.sum(daily.c.revenue))
+            .group_by(daily.c.day)
+            .all()
+        )
+
+        receipt_day = func.date(StockReceipt.receipt_date, type_=Date)
+        outflow = dict(
+            db.query(receipt_day, func.sum(StockReceipt.quantity_received * StockReceipt.unit_cost))
+            .filter(StockReceipt.receipt_date >= start_date)
+            .group_by(receipt_day)
+            .all()
+        )
+
+        dates = sorted(set(inflow) | set(outflow))
+        cash_inflow = [round(float(inflow.get(d) or 0), 2) for d in dates]
+        cash_outflow = [round(float(outflow.get(d) or 0), 2) for d in dates]
+        return {
+            "date": [str(d) for d in dates],
+            "cash_inflow": cash_inflow,
+            "cash_outflow": cash_outflow,
+            "net_cash_flow": [round(i - o, 2) for i, o in zip(cash_inflow, cash_outflow)]
+        }
@@ -1,6 +1,7 @@
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.database.models import SalesTransaction, ProductMaster, StockReceipt
+from app.services.analytics.sales_rollup import SalesRollupService
 from datetime import datetime, timedelta
 
 class ProfitCalculator:
@@ -13,15 +14,12 @@ class ProfitCalculator:
         if not end_date:
             end_date = datetime.now()
         
+        daily = SalesRollupService.daily_sales(start_date, end_date)
+        
         # Sales data
         sales_result = db.query(
-            func.sum(SalesTransaction.quantity_sold * SalesTransaction.sale_price).label("total_revenue"),
-            func.sum(SalesTransaction.quantity_sold).label("total_qty_sold")
-        ).filter(
-            and_(
-                SalesTransaction.transaction_date >= start_date,
-                SalesTransaction.transaction_date <= end_date
-            )
+            func.sum(daily.c.revenue).label("total_revenue"),
+            func.sum(daily.c.qty).label("total_qty_sold")
         ).first()
         
         total_revenue = float(sales_result.total_revenue) if sales_result.total_revenue else 0.0
@@ -29,15 +27,10 @@ class ProfitCalculator:
         # Cost of goods sold (from sales transactions with product cost)
         cogs_result = db.query(
             func.sum(
-                SalesTransaction.quantity_sold * ProductMaster.unit_cost_price
+                daily.c.qty * ProductMaster.unit_cost_price
             ).label("total_cogs")
-        ).join(ProductMaster, SalesTransaction.sku_id == ProductMaster.sku_id)\
-         .filter(
-            and_(
-                SalesTransaction.transaction_date >= start_date,
-                SalesTransaction.transaction_date <= end_date
-            )
-        ).first()
+        ).select_from(daily)\
+         .join(ProductMaster, daily.c.sku_id == ProductMaster.sku_id).first()
         
         total_cogs = float(cogs_result.total_cogs) if cogs_result.total_cogs else 0.0
         total_profit = total_revenue - total_cogs
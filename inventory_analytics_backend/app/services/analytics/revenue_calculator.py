@@ -1,7 +1,7 @@
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from app.database.models import SalesTransaction
+from app.services.analytics.sales_rollup import SalesRollupService
 
 
 class RevenueCalculator:
@@ -23,18 +23,9 @@ class RevenueCalculator:
             start_date = end_date - timedelta(days=30)
 
         try:
+            daily = SalesRollupService.daily_sales(start_date, end_date)
             total_revenue = (
-                db.query(
-                    func.coalesce(
-                        func.sum(
-                            SalesTransaction.quantity_sold *
-                            SalesTransaction.sale_price
-                        ),
-                        0.0
-                    )
-                )
-                .filter(SalesTransaction.transaction_date >= start_date)
-                .filter(SalesTransaction.transaction_date <= end_date)
+                db.query(func.coalesce(func.sum(daily.c.revenue), 0.0))
                 .scalar()
             )
         except Exception as e:
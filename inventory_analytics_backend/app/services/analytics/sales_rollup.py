@@ -0,0 +1,185 @@
+"""
+app/services/analytics/sales_rollup.py
+
+Daily per-SKU sales rollup (sales_daily_sku table) and the query layer
+that serves sales analytics from it.
+
+daily_sales(start, end) returns one row per (sku_id, day) for a window:
+whole days inside the window come from the rollup, and only the partial
+first/last day (when the window is not day-aligned) is aggregated from
+raw sales_transactions. Request latency therefore depends on the number
+of days x SKUs, not on raw transaction volume.
+
+The table is kept current by:
+- the loaders: rebuild() after a full load, apply_rows() per chunk of
+  newly inserted rows in incremental mode
+- ORM writes: app/database/events.py applies deltas on every flush
+"""
+
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import Date, and_, or_, func, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Subquery
+
+from app.database.bulk import BulkWriter, frame_records
+from app.database.models import SalesTransaction, SalesDailySku
+
+ROLLUP_COLUMNS = ["sku_id", "day", "qty", "revenue", "txn_count"]
+
+
+def _day_start(value: datetime) -> datetime:
+    return datetime.combine(value.date(), time.min)
+
+
+class SalesRollupService:
+
+    @staticmethod
+    def rebuild(conn: Connection) -> int:
+        """Recompute the whole rollup from sales_transactions. Returns rows written."""
+        day = func.date(SalesTransaction.transaction_date, type_=Date)
+        rows = select(
+            SalesTransaction.sku_id,
+            day,
+            func.sum(SalesTransaction.quantity_sold),
+            func.sum(SalesTransaction.quantity_sold * SalesTransaction.sale_price),
+            func.count(SalesTransaction.id)
+        ).where(SalesTransaction.transaction_date.isnot(None)) \
+         .group_by(SalesTransaction.sku_id, day)
+
+        table = SalesDailySku.__table__
+        conn.execute(table.delete())
+        conn.execute(table.insert().from_select(ROLLUP_COLUMNS, rows))
+        return conn.execute(select(func.count()).select_from(table)).scalar() or 0
+
+    @staticmethod
+    def ensure_built(conn: Connection) -> None:
+        """Build the rollup once for databases loaded before it existed."""
+        if conn.execute(select(SalesDailySku.sku_id).limit(1)).first():
+            return
+        if conn.execute(select(SalesTransaction.id).limit(1)).first():
+            SalesRollupService.rebuild(conn)
+
+    @staticmethod
+    def apply_rows(conn: Connection, rows: pd.DataFrame, sign: int = 1) -> int:
+        """
+        Add (sign=1) or remove (sign=-1) raw sales rows from the rollup.
+        rows: columns sku_id, transaction_date, quantity_sold, sale_price.
+        """
+        rows = rows.dropna(subset=["transaction_date"])
+        if rows.empty:
+            return 0
+
+        deltas = pd.DataFrame({
+            "sku_id": rows["sku_id"],
+            "day": pd.to_datetime(rows["transaction_date"]).dt.date,
+            "qty": rows["quantity_sold"] * sign,
+            "revenue": rows["quantity_sold"] * rows["sale_price"] * sign,
+            "txn_count": sign
+        })
+        return SalesRollupService.apply_deltas(conn, deltas)
+
+    @staticmethod
+    def apply_deltas(conn: Connection, deltas: pd.DataFrame) -> int:
+        """
+        Upsert per-(sku_id, day) deltas of qty/revenue/txn_count.
+        Days whose transaction count drops to zero are removed.
+        """
+        if deltas.empty:
+            return 0
+
+        deltas = deltas.groupby(["sku_id", "day"], as_index=False).agg(
+            qty=("qty", "sum"), revenue=("revenue", "sum"), txn_count=("txn_count", "sum")
+        )
+        deltas = deltas[deltas["txn_count"] != 0]
+        if deltas.empty:
+            return 0
+
+        table = SalesDailySku.__table__
+        stmt = BulkWriter(conn).insert_stmt(table)
+        current, new = table.c, stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sku_id", "day"],
+            set_={
+                "qty": current.qty + new.qty,
+                "revenue": current.revenue + new.revenue,
+                "txn_count": current.txn_count + new.txn_count
+            }
+        )
+        conn.execute(stmt, frame_records(deltas))
+
+        if (deltas["txn_count"] < 0).any():
+            conn.execute(table.delete().where(table.c.txn_count <= 0))
+        return len(deltas)
+
+    @staticmethod
+    def daily_sales(
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        sku_id: Optional[str] = None
+    ) -> Subquery:
+        """
+        Per-(sku_id, day) sales for transaction_date in [start_date, end_date]
+        (either bound may be None = open). Columns: sku_id, day, qty, revenue,
+        txn_count.
+        """
+        # Whole days [first_full, last_full) are read from the rollup
+        first_full = None
+        if start_date is not None:
+            first_full = _day_start(start_date)
+            if first_full < start_date:
+                first_full += timedelta(days=1)
+        last_full = _day_start(end_date) if end_date is not None else None
+
+        if first_full is not None and last_full is not None and first_full > last_full:
+            # Window lies inside a single day
+            rollup_where = None
+            raw_ranges = [(start_date, end_date)]
+        else:
+            rollup_where = []
+            if first_full is not None:
+                rollup_where.append(SalesDailySku.day >= first_full.date())
+            if last_full is not None:
+                rollup_where.append(SalesDailySku.day < last_full.date())
+
+            raw_ranges = []
+            if start_date is not None and start_date < first_full:
+                raw_ranges.append((start_date, first_full - timedelta(microseconds=1)))
+            if last_full is not None:
+                raw_ranges.append((last_full, end_date))
+
+        parts = []
+
+        if rollup_where is not None:
+            if sku_id is not None:
+                rollup_where.append(SalesDailySku.sku_id == sku_id)
+            parts.append(
+                select(
+                    SalesDailySku.sku_id.label("sku_id"),
+                    SalesDailySku.day.label("day"),
+                    SalesDailySku.qty.label("qty"),
+                    SalesDailySku.revenue.label("revenue"),
+                    SalesDailySku.txn_count.label("txn_count")
+                ).where(*rollup_where)
+            )
+
+        if raw_ranges:
+            t = SalesTransaction.transaction_date
+            day = func.date(t, type_=Date)
+            raw_where = [and_(t >= lo, t <= hi) for lo, hi in raw_ranges]
+            raw = select(
+                SalesTransaction.sku_id.label("sku_id"),
+                day.label("day"),
+                func.sum(SalesTransaction.quantity_sold).label("qty"),
+                func.sum(SalesTransaction.quantity_sold * SalesTransaction.sale_price).label("revenue"),
+                func.count(SalesTransaction.id).label("txn_count")
+            ).where(or_(*raw_where))
+            if sku_id is not None:
+                raw = raw.where(SalesTransaction.sku_id == sku_id)
+            parts.append(raw.group_by(SalesTransaction.sku_id, day))
+
+        if len(parts) == 1:
+            return parts[0].subquery("daily_sales")
+        return union_all(*parts).subquery("daily_sales")
@@ -1,38 +1,52 @@
 from sqlalchemy import func, text
 from sqlalchemy.orm import Session
-from app.database.models import SalesTransaction, ProductMaster
+from app.services.analytics.sales_rollup import SalesRollupService
 from datetime import datetime, timedelta
 
 class SalesTrendAnalyzer:
     
     @staticmethod
-    def calculate_sales_trend(db: Session, days: int = 30):
-        """Calculate daily sales trend"""
+    def calculate_sales_trend(db: Session, days: int = 30, columnar: bool = False):
+        """
+        Calculate daily sales trend
+        - columnar: daily_data as parallel arrays ({"date": [...], ...})
+          instead of one dict per day
+        """
         start_date = datetime.now() - timedelta(days=days)
         
+        daily = SalesRollupService.daily_sales(start_date)
+        
         results = db.query(
-            func.date(SalesTransaction.transaction_date).label("date"),
-            func.sum(SalesTransaction.quantity_sold).label("quantity"),
-            func.sum(SalesTransaction.quantity_sold * SalesTransaction.sale_price).label("revenue"),
-            func.count(SalesTransaction.id).label("transaction_count")
-        ).filter(SalesTransaction.transaction_date >= start_date)\
-         .group_by(func.date(SalesTransaction.transaction_date))\
-         .order_by("date").all()
+            daily.c.day.label("date"),
+            func.sum(daily.c.qty).label("quantity"),
+            func.sum(daily.c.revenue).label("revenue"),
+            func.sum(daily.c.txn_count).label("transaction_count")
+        ).group_by(daily.c.day)\
+         .order_by(daily.c.day).all()
         
-        trend_data = [
-            {
-                "date": str(r.date),
-                "quantity": r.quantity or 0,
-                "revenue": float(r.revenue) if r.revenue else 0.0,
-                "transactions": r.transaction_count or 0
-            } for r in results
-        ]
+        dates = [str(r.date) for r in results]
+        quantity = [r.quantity or 0 for r in results]
+        revenue = [float(r.revenue) if r.revenue else 0.0 for r in results]
+        transactions = [r.transaction_count or 0 for r in results]
+        
+        if columnar:
+            trend_data = {
+                "date": dates,
+                "quantity": quantity,
+                "revenue": revenue,
+                "transactions": transactions
+            }
+        else:
+            trend_data = [
+                {"date": d, "quantity": q, "revenue": rev, "transactions": t}
+                for d, q, rev, t in zip(dates, quantity, revenue, transactions)
+            ]
         
         # Calculate trend metrics
-        total_qty = sum(t["quantity"] for t in trend_data)
-        total_revenue = sum(t["revenue"] for t in trend_data)
-        avg_daily_qty = total_qty / len(trend_data) if trend_data else 0
-        avg_daily_revenue = total_revenue / len(trend_data) if trend_data else 0
+        total_qty = sum(quantity)
+        total_revenue = sum(revenue)
+        avg_daily_qty = total_qty / len(dates) if dates else 0
+        avg_daily_revenue = total_revenue / len(dates) if dates else 0
         
         return {
             "trend_period_days": days,
@@ -48,12 +62,13 @@ class SalesTrendAnalyzer:
         """Weekly sales trend"""
         start_date = datetime.now() - timedelta(weeks=weeks)
         
+        daily = SalesRollupService.daily_sales(start_date)
+        
         results = db.query(
-            func.date_trunc('week', SalesTransaction.transaction_date).label("week"),
-            func.sum(SalesTransaction.quantity_sold).label("quantity"),
-            func.sum(SalesTransaction.quantity_sold * SalesTransaction.sale_price).label("revenue")
-        ).filter(SalesTransaction.transaction_date >= start_date)\
-         .group_by(func.date_trunc('week', SalesTransaction.transaction_date))\
+            func.date_trunc('week', daily.c.day).label("week"),
+            func.sum(daily.c.qty).label("quantity"),
+            func.sum(daily.c.revenue).label("revenue")
+        ).group_by(func.date_trunc('week', daily.c.day))\
          .order_by("week").all()
         
         return [
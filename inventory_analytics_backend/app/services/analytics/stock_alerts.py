@@ -1,6 +1,8 @@
 from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.database.models import ProductMaster, StockReceipt, SalesTransaction
+from app.database.models import ProductMaster, StockBalance
+from app.services.analytics.forecasting import ForecastingEngine, HISTORY_DAYS
+from app.services.utils.monte_carlo import simulate_stockouts, DEFAULT_HORIZON_DAYS, DEFAULT_SEED
 from config import get_settings
 
 class StockAlertSystem:
@@ -11,25 +13,22 @@ class StockAlertSystem:
         if not min_threshold:
             min_threshold = get_settings().MIN_STOCK_LEVEL
         
+        # On-hand comes from the materialized stock_balance table (O(#SKUs));
+        # SKUs that never moved have no balance row and count as 0.
+        on_hand = func.coalesce(StockBalance.on_hand, 0)
+
         inventory_data = db.query(
             ProductMaster.sku_id,
             ProductMaster.product_name,
             ProductMaster.category,
             ProductMaster.unit_cost_price,
-            func.coalesce(func.sum(StockReceipt.quantity_received), 0).label("total_received"),
-            func.coalesce(func.sum(SalesTransaction.quantity_sold), 0).label("total_sold")
-        ).outerjoin(StockReceipt, ProductMaster.sku_id == StockReceipt.sku_id)\
-         .outerjoin(SalesTransaction, ProductMaster.sku_id == SalesTransaction.sku_id)\
-         .group_by(
-            ProductMaster.sku_id,
-            ProductMaster.product_name,
-            ProductMaster.category,
-            ProductMaster.unit_cost_price
-        ).all()
+            on_hand.label("current_qty")
+        ).outerjoin(StockBalance, ProductMaster.sku_id == StockBalance.sku_id)\
+         .filter((on_hand == 0) | (on_hand < min_threshold)).all()
         
         alerts = []
         for item in inventory_data:
-            current_qty = item.total_received - item.total_sold
+            current_qty = item.current_qty
             
             if current_qty == 0:
                 alerts.append({
@@ -53,3 +52,54 @@ class StockAlertSystem:
                 })
         
         return sorted(alerts, key=lambda x: x["priority"], reverse=True)
+
+    @staticmethod
+    def get_stockout_risk(
+        db: Session,
+        horizon_days: int = DEFAULT_HORIZON_DAYS,
+        n_paths: int = None,
+        seed: int = DEFAULT_SEED,
+        history_days: int = HISTORY_DAYS
+    ):
+        """
+        Monte Carlo stockout risk for every SKU with sales in the last
+        history_days: probability of running out within horizon_days and
+        expected days of cover, riskiest first.
+        """
+        settings = get_settings()
+        n_paths = n_paths or settings.MONTE_CARLO_PATHS
+
+        sku_ids, _, history = ForecastingEngine.sales_matrix(db, history_days)
+        if not sku_ids:
+            return []
+
+        products = {
+            p.sku_id: p for p in db.query(
+                ProductMaster.sku_id,
+                ProductMaster.product_name,
+                ProductMaster.category,
+                func.coalesce(StockBalance.on_hand, 0).label("on_hand")
+            ).outerjoin(StockBalance, ProductMaster.sku_id == StockBalance.sku_id)
+             .filter(ProductMaster.sku_id.in_(sku_ids)).all()
+        }
+        on_hand = [max(int(products[sku].on_hand), 0) if sku in products else 0 for sku in sku_ids]
+
+        risk = simulate_stockouts(
+            history, on_hand, horizon_days, n_paths, seed, settings.MONTE_CARLO_CHUNK_ELEMENTS
+        )
+
+        results = [
+            {
+                "sku_id": sku,
+                "product_name": products[sku].product_name if sku in products else None,
+                "category": products[sku].category if sku in products else None,
+                "current_quantity": qty,
+                "stockout_probability": round(float(p), 4),
+                "expected_days_of_cover": round(float(cover), 2),
+                "expected_demand": round(float(demand), 2)
+            } for sku, qty, p, cover, demand in zip(
+                sku_ids, on_hand, risk["stockout_probability"],
+                risk["expected_days_of_cover"], risk["expected_demand"]
+            )
+        ]
+        return sorted(results, key=lambda r: (-r["stockout_probability"], r["expected_days_of_cover"]))
@@ -0,0 +1,142 @@
+"""
+app/services/analytics/stock_balance.py
+
+Materialized per-SKU stock position (stock_balance table).
+
+Every calculator that needs on-hand stock reads this table in O(#SKUs)
+instead of outer-joining ProductMaster to both StockReceipt and
+SalesTransaction (which fans out to receipts x sales rows per SKU).
+
+The table is kept current by:
+- the loaders: rebuild() after a full load, apply_movements() per chunk
+  of newly inserted rows in incremental mode
+- ORM writes: app/database/events.py applies deltas on every flush
+"""
+
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import func, select, literal, case
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database.bulk import BulkWriter, frame_records
+from app.database.models import ProductMaster, StockReceipt, SalesTransaction, StockBalance
+
+
+class StockBalanceService:
+
+    @staticmethod
+    def rebuild(conn: Connection) -> int:
+        """Recompute the whole table with two independent aggregates (no fan-out)."""
+        received = select(
+            StockReceipt.sku_id.label("sku_id"),
+            func.sum(StockReceipt.quantity_received).label("qty"),
+            func.max(StockReceipt.receipt_date).label("last_date")
+        ).group_by(StockReceipt.sku_id).subquery()
+
+        sold = select(
+            SalesTransaction.sku_id.label("sku_id"),
+            func.sum(SalesTransaction.quantity_sold).label("qty"),
+            func.max(SalesTransaction.transaction_date).label("last_date")
+        ).group_by(SalesTransaction.sku_id).subquery()
+
+        received_qty = func.coalesce(received.c.qty, 0)
+        sold_qty = func.coalesce(sold.c.qty, 0)
+
+        rows = select(
+            ProductMaster.sku_id,
+            received_qty,
+            sold_qty,
+            received_qty - sold_qty,
+            case(
+                (received.c.last_date.is_(None), sold.c.last_date),
+                (sold.c.last_date.is_(None), received.c.last_date),
+                (received.c.last_date > sold.c.last_date, received.c.last_date),
+                else_=sold.c.last_date
+            ),
+            literal(datetime.utcnow())
+        ).outerjoin(received, received.c.sku_id == ProductMaster.sku_id) \
+         .outerjoin(sold, sold.c.sku_id == ProductMaster.sku_id) \
+         .where((received.c.sku_id.isnot(None)) | (sold.c.sku_id.isnot(None)))
+
+        table = StockBalance.__table__
+        conn.execute(table.delete())
+        conn.execute(table.insert().from_select(
+            ["sku_id", "received", "sold", "on_hand", "last_movement", "updated_at"], rows
+        ))
+        return conn.execute(select(func.count()).select_from(table)).scalar() or 0
+
+    @staticmethod
+    def ensure_built(conn: Connection) -> None:
+        """Build the table once for databases loaded before it existed."""
+        has_balance = conn.execute(select(StockBalance.sku_id).limit(1)).first()
+        if has_balance:
+            return
+
+        has_movements = conn.execute(select(StockReceipt.id).limit(1)).first() or \
+            conn.execute(select(SalesTransaction.id).limit(1)).first()
+        if has_movements:
+            StockBalanceService.rebuild(conn)
+
+    @staticmethod
+    def apply_movements(conn: Connection, movements: pd.DataFrame) -> int:
+        """
+        Add per-SKU deltas to the table (upsert).
+        movements: columns sku_id, received, sold, last_movement (one row per SKU).
+        """
+        if movements.empty:
+            return 0
+
+        table = StockBalance.__table__
+        movements = movements.assign(
+            on_hand=movements["received"] - movements["sold"],
+            updated_at=datetime.utcnow()
+        )
+
+        stmt = BulkWriter(conn).insert_stmt(table)
+        current, new = table.c, stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sku_id"],
+            set_={
+                "received": current.received + new.received,
+                "sold": current.sold + new.sold,
+                "on_hand": current.on_hand + new.on_hand,
+                "last_movement": case(
+                    (current.last_movement.is_(None), new.last_movement),
+                    (new.last_movement > current.last_movement, new.last_movement),
+                    else_=current.last_movement
+                ),
+                "updated_at": new.updated_at
+            }
+        )
+        conn.execute(stmt, frame_records(movements))
+        return len(movements)
+
+    @staticmethod
+    def movements_from_rows(df: pd.DataFrame, qty_col: str, date_col: str, kind: str) -> pd.DataFrame:
+        """
+        Aggregate inserted receipt/sale rows into per-SKU deltas.
+        kind: "received" or "sold".
+        """
+        if df.empty:
+            return pd.DataFrame(columns=["sku_id", "received", "sold", "last_movement"])
+
+        grouped = df.groupby("sku_id").agg(
+            qty=(qty_col, "sum"),
+            last_movement=(date_col, "max")
+        ).reset_index()
+
+        other = "sold" if kind == "received" else "received"
+        return pd.DataFrame({
+            "sku_id": grouped["sku_id"],
+            kind: grouped["qty"].astype("int64"),
+            other: 0,
+            "last_movement": grouped["last_movement"]
+        })
+
+    @staticmethod
+    def get_on_hand(db: Session, sku_id: str) -> int:
+        """Current on-hand quantity for one SKU (0 if it never moved)."""
+        on_hand = db.query(StockBalance.on_hand).filter(StockBalance.sku_id == sku_id).scalar()
+        return int(on_hand or 0)
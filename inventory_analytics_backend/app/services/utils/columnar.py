@@ -0,0 +1,90 @@
+"""
+app/services/utils/columnar.py
+
+Compact response formats for the chart endpoints (format=columnar|arrow).
+
+- columnar: one JSON object of parallel arrays ({"date": [...],
+  "revenue": [...]}) instead of a list of per-row dicts repeating every
+  key; serialized with orjson (NumPy arrays natively) when installed
+- arrow: the same columns as an Arrow IPC stream, for clients that can
+  read it directly into typed arrays (needs pyarrow)
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: only needed for format=arrow
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(content, separators=(",", ":"), default=_json_default).encode()
+
+
+class ColumnarJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _arrow_array(values):
+    if isinstance(values, np.ndarray) and values.ndim == 2:
+        # e.g. SKU x horizon forecasts: one fixed-size list per row
+        if values.shape[1] == 0:
+            # Arrow has no zero-width fixed-size lists: one empty list per row
+            return pa.array([[]] * values.shape[0], type=pa.list_(pa.from_numpy_dtype(values.dtype)))
+        return pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), values.shape[1])
+    return pa.array(values)
+
+
+def arrow_response(columns: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Equal-length columns as a single-batch Arrow IPC stream; scalar
+    summary fields travel as JSON in the schema metadata.
+    """
+    if pa is None:
+        raise HTTPException(status_code=406, detail="format=arrow requires pyarrow on the server")
+
+    table = pa.table({name: _arrow_array(values) for name, values in columns.items()})
+    if metadata:
+        table = table.replace_schema_metadata({key: dumps(value) for key, value in metadata.items()})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+
+def chart_response(data: Dict[str, Any], format: str, series: str):
+    """
+    Response for a columnar calculator result: data[series] holds the
+    parallel arrays, every other key is a scalar/summary field.
+    """
+    if format == "arrow":
+        metadata = {key: value for key, value in data.items() if key != series}
+        return arrow_response(data[series], metadata)
+    return ColumnarJSONResponse({"status": "success", "data": data})
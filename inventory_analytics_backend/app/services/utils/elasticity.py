@@ -0,0 +1,225 @@
+"""
+app/services/utils/elasticity.py
+
+Precomputed price elasticities (elasticity_estimates table).
+
+Elasticities barely move day to day, so instead of re-fitting on every
+pricing call they are fitted for all SKUs at once by refresh() (after
+each sales load, or scripts/refresh_elasticities.py) and read back by
+primary key.
+
+- SKU level: log-log regression over the SKU's (price, quantity) buckets
+- brand / category level: pooled within-SKU regression (each SKU's own
+  mean removed first, so price levels of different SKUs do not leak into
+  the slope)
+- fallback: a sparse SKU uses its brand, then its category, then
+  DEFAULT_ELASTICITY; the stored `source` says which one was used
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database.bulk import frame_records
+from app.database.dataset_version import bump_dataset_version
+from app.database.models import ElasticityEstimate, ProductMaster, SalesTransaction
+
+DEFAULT_ELASTICITY = -1.2
+ELASTICITY_MIN = -5.0
+ELASTICITY_MAX = -0.2
+
+DEFAULT_LOOKBACK_DAYS = 90
+MIN_SKU_POINTS = 3      # distinct prices needed to trust a SKU's own fit
+MIN_GROUP_POINTS = 5    # pooled points needed to trust a brand/category fit
+
+LEVELS = ("sku", "brand", "category")
+
+
+def _group_fit(groups: np.ndarray, x: np.ndarray, y: np.ndarray, n_groups: int, n_params: np.ndarray) -> dict:
+    """
+    Least-squares slope of y on x per group (vectorized with bincount),
+    with r^2 and the slope's standard error. n_params: fitted parameters
+    per group (for the residual degrees of freedom).
+    """
+    n = np.bincount(groups, minlength=n_groups).astype(float)
+    safe_n = np.maximum(n, 1)
+    dx = x - (np.bincount(groups, x, minlength=n_groups) / safe_n)[groups]
+    dy = y - (np.bincount(groups, y, minlength=n_groups) / safe_n)[groups]
+
+    sxx = np.bincount(groups, dx * dx, minlength=n_groups)
+    sxy = np.bincount(groups, dx * dy, minlength=n_groups)
+    syy = np.bincount(groups, dy * dy, minlength=n_groups)
+
+    fitted = sxx > 1e-12
+    slope = np.divide(sxy, sxx, out=np.full(n_groups, np.nan), where=fitted)
+    sse = np.where(fitted, np.maximum(syy - np.nan_to_num(slope) * sxy, 0.0), np.nan)
+    r_squared = np.where(fitted & (syy > 0), 1 - sse / np.where(syy > 0, syy, 1), np.nan)
+
+    dof = n - n_params
+    has_dof = fitted & (dof > 0)
+    std_error = np.full(n_groups, np.nan)
+    std_error[has_dof] = np.sqrt(sse[has_dof] / dof[has_dof] / sxx[has_dof])
+
+    return {"slope": slope, "n_points": n.astype(int), "r_squared": r_squared, "std_error": std_error}
+
+
+def _capped(values: np.ndarray) -> np.ndarray:
+    return np.clip(values, ELASTICITY_MIN, ELASTICITY_MAX)
+
+
+def _nullable(values: np.ndarray) -> list:
+    return [None if np.isnan(v) else round(float(v), 6) for v in values]
+
+
+class ElasticityStore:
+
+    @staticmethod
+    def refresh(conn: Connection, lookback_days: int = DEFAULT_LOOKBACK_DAYS) -> Dict[str, int]:
+        """
+        Refit every SKU, brand and category from one grouped query and
+        replace the table. Returns the number of rows written per level.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=lookback_days)
+        buckets = pd.DataFrame(conn.execute(
+            select(
+                SalesTransaction.sku_id,
+                SalesTransaction.sale_price,
+                func.sum(SalesTransaction.quantity_sold)
+            ).where(SalesTransaction.transaction_date >= cutoff)
+             .group_by(SalesTransaction.sku_id, SalesTransaction.sale_price)
+        ).all(), columns=["sku_id", "price", "qty"])
+
+        products = pd.DataFrame(conn.execute(
+            select(ProductMaster.sku_id, ProductMaster.brand, ProductMaster.category)
+            .order_by(ProductMaster.sku_id)
+        ).all(), columns=["sku_id", "brand", "category"])
+
+        sku_codes = pd.Index(products["sku_id"])
+        brand_codes, brands = pd.factorize(products["brand"], sort=True)
+        category_codes, categories = pd.factorize(products["category"], sort=True)
+
+        # Buckets are grouped by price, so each valid one is a distinct price point
+        buckets = buckets[(buckets["price"] > 0) & (buckets["qty"] > 0)]
+        buckets = buckets[buckets["sku_id"].isin(sku_codes)]
+        sku = sku_codes.get_indexer(buckets["sku_id"])
+        x = np.log(buckets["price"].to_numpy(dtype=float))
+        y = np.log(buckets["qty"].to_numpy(dtype=float))
+
+        # 1) SKU level
+        sku_fit = _group_fit(sku, x, y, len(products), np.full(len(products), 2))
+
+        # 2) Brand / category level: pooled over SKUs with at least two points
+        per_sku = np.bincount(sku, minlength=len(products))
+        pooled = per_sku[sku] >= 2
+        safe = np.maximum(per_sku, 1)
+        x_within = (x - (np.bincount(sku, x, minlength=len(products)) / safe)[sku])[pooled]
+        y_within = (y - (np.bincount(sku, y, minlength=len(products)) / safe)[sku])[pooled]
+        pooled_sku = sku[pooled]
+
+        def pooled_fit(codes, n_groups):
+            groups = codes[pooled_sku]
+            skus_in_group = np.bincount(codes[np.flatnonzero(per_sku >= 2)], minlength=n_groups)
+            return _group_fit(groups, x_within, y_within, n_groups, skus_in_group + 1)
+
+        brand_fit = pooled_fit(brand_codes, len(brands))
+        category_fit = pooled_fit(category_codes, len(categories))
+
+        def accepted(fit, min_points):
+            return _capped(np.where(
+                (fit["n_points"] >= min_points) & ~np.isnan(fit["slope"]), fit["slope"], np.nan
+            ))
+
+        # 3) Resolve fallbacks: category -> default, brand -> category, SKU -> brand
+        category_value = accepted(category_fit, MIN_GROUP_POINTS)
+        category_source = np.where(np.isnan(category_value), "default", "category")
+        category_value = np.where(np.isnan(category_value), DEFAULT_ELASTICITY, category_value)
+
+        # A brand can span categories; it falls back to its most common one
+        brand_category = products.groupby(brand_codes)["category"].agg(lambda c: c.mode().iat[0])
+        brand_parent = categories.get_indexer(brand_category.reindex(range(len(brands))))
+        brand_value = accepted(brand_fit, MIN_GROUP_POINTS)
+        brand_source = np.where(np.isnan(brand_value), category_source[brand_parent], "brand")
+        brand_value = np.where(np.isnan(brand_value), category_value[brand_parent], brand_value)
+
+        sku_value = accepted(sku_fit, MIN_SKU_POINTS)
+        sku_source = np.where(np.isnan(sku_value), brand_source[brand_codes], "sku")
+        sku_value = np.where(np.isnan(sku_value), brand_value[brand_codes], sku_value)
+
+        now = datetime.utcnow()
+        frames = [
+            pd.DataFrame({"level": level, "key": list(keys), "elasticity": np.round(value, 6),
+                          "source": source, "slope": _nullable(fit["slope"]),
+                          "n_points": fit["n_points"], "r_squared": _nullable(fit["r_squared"]),
+                          "std_error": _nullable(fit["std_error"])})
+            for level, keys, value, source, fit in (
+                ("sku", products["sku_id"], sku_value, sku_source, sku_fit),
+                ("brand", brands, brand_value, brand_source, brand_fit),
+                ("category", categories, category_value, category_source, category_fit),
+            )
+        ]
+        rows = pd.concat(frames, ignore_index=True).assign(lookback_days=lookback_days, fitted_at=now)
+
+        table = ElasticityEstimate.__table__
+        conn.execute(table.delete())
+        if not rows.empty:
+            conn.execute(table.insert(), frame_records(rows))
+
+        # Pricing results change with the store
+        bump_dataset_version(conn)
+        return rows.groupby("level").size().to_dict()
+
+    @staticmethod
+    def get(db: Session, sku_id: str) -> Optional[float]:
+        """Stored elasticity for one SKU (None if the store was never refreshed)."""
+        return db.query(ElasticityEstimate.elasticity).filter(
+            ElasticityEstimate.level == "sku",
+            ElasticityEstimate.key == sku_id
+        ).scalar()
+
+    @staticmethod
+    def for_skus(db: Session, sku_ids: List[str]) -> Dict[str, float]:
+        """Stored elasticities for many SKUs (SKUs not in the store are left out)."""
+        if not sku_ids:
+            return {}
+        return dict(db.query(ElasticityEstimate.key, ElasticityEstimate.elasticity).filter(
+            ElasticityEstimate.level == "sku",
+            ElasticityEstimate.key.in_(sku_ids)
+        ).all())
+
+    @staticmethod
+    def describe(db: Session, sku_id: str) -> Optional[dict]:
+        """SKU estimate with the brand and category estimates it can fall back to."""
+        product = db.query(ProductMaster).filter(ProductMaster.sku_id == sku_id).first()
+        if not product:
+            return None
+
+        keys = {"sku": sku_id, "brand": product.brand, "category": product.category}
+        rows = {
+            row.level: row for row in db.query(ElasticityEstimate).filter(
+                ElasticityEstimate.level.in_(LEVELS),
+                ElasticityEstimate.key.in_(list(keys.values()))
+            ).all() if keys[row.level] == row.key
+        }
+
+        def estimate(level):
+            row = rows.get(level)
+            if row is None:
+                return None
+            return {
+                "key": keys[level],
+                "elasticity": row.elasticity,
+                "source": row.source,
+                "slope": row.slope,
+                "n_points": row.n_points,
+                "r_squared": row.r_squared,
+                "std_error": row.std_error,
+                "lookback_days": row.lookback_days,
+                "fitted_at": row.fitted_at
+            }
+
+        return {level: estimate(level) for level in LEVELS}
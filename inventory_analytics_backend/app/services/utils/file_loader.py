@@ -0,0 +1,141 @@
+"""
+app/services/utils/file_loader.py
+
+Chunked readers for the cleaned staging files in data/clean.
+
+The loaders never hold a whole file in memory: every reader yields
+DataFrames of at most `chunk_size` rows, already renamed to the DB
+column names and restricted to the mapped columns.
+
+CSV and typed Parquet staging files are both supported; Parquet is read
+column-by-column and row groups entirely older than a watermark are
+skipped from their statistics without being decoded.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for Parquet staging files
+    pq = None
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def iter_csv_chunks(
+    path: str,
+    mapping: Dict[str, str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a cleaned CSV in chunks.
+    - mapping: source column -> DB column; unmapped columns are never parsed.
+    """
+    reader = pd.read_csv(
+        path,
+        usecols=lambda c: c.strip() in mapping,
+        chunksize=chunk_size,
+    )
+
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip()
+        chunk = chunk.rename(columns=mapping)
+        yield chunk[list(mapping.values())]
+
+
+def iter_parquet_chunks(
+    path: str,
+    mapping: Dict[str, str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    date_column: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a typed Parquet staging file in record batches.
+    - only the mapped columns are decoded
+    - date_column/since: source date column and watermark; row groups whose
+      max date is older than `since` are skipped.
+    """
+    if pq is None:
+        raise RuntimeError("❌ pyarrow is required to load Parquet staging files (pip install pyarrow)")
+
+    pf = pq.ParquetFile(path)
+    columns = [c for c in pf.schema_arrow.names if c in mapping]
+    row_groups = list(range(pf.num_row_groups))
+
+    if date_column and since is not None and date_column in pf.schema_arrow.names:
+        col_idx = pf.schema_arrow.get_field_index(date_column)
+        kept = []
+        for i in row_groups:
+            stats = pf.metadata.row_group(i).column(col_idx).statistics
+            if stats is not None and stats.has_min_max and stats.null_count == 0 \
+                    and pd.Timestamp(stats.max) < pd.Timestamp(since):
+                continue
+            kept.append(i)
+        row_groups = kept
+
+    if not row_groups:
+        return
+
+    for batch in pf.iter_batches(batch_size=chunk_size, row_groups=row_groups, columns=columns):
+        chunk = batch.to_pandas().rename(columns=mapping)
+        yield chunk[list(mapping.values())]
+
+
+def iter_clean_chunks(
+    path: str,
+    mapping: Dict[str, str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    date_column: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> Iterator[pd.DataFrame]:
+    """Dispatch to the CSV or Parquet reader based on the file extension."""
+    if str(path).endswith(".parquet"):
+        return iter_parquet_chunks(path, mapping, chunk_size, date_column, since)
+    return iter_csv_chunks(path, mapping, chunk_size)
+
+
+def file_checksum(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RowHasher:
+    """
+    Deterministic 64-bit row hashes for one source file.
+
+    Identical lines are legitimate in POS exports (same SKU, qty and price
+    on the same day), so the hash covers the row content plus the
+    occurrence number of that content within the file. The occurrence
+    counts are carried across chunks.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.seen = pd.Series(dtype="int64")
+
+    def hash(self, df: pd.DataFrame) -> pd.Series:
+        """Return an int64 hash per row of `df` (same index as df)."""
+        content = pd.util.hash_pandas_object(df[self.columns], index=False)
+
+        occurrence = content.groupby(content).cumcount()
+        if not self.seen.empty:
+            occurrence += self.seen.reindex(content.values, fill_value=0).values
+
+        counts = content.value_counts()
+        self.seen = self.seen.add(counts, fill_value=0).astype("int64")
+
+        hashed = pd.util.hash_pandas_object(
+            pd.DataFrame({"content": content.values, "occurrence": occurrence.values}),
+            index=False
+        )
+        return pd.Series(hashed.values.view(np.int64), index=df.index)
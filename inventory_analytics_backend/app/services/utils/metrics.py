@@ -0,0 +1,96 @@
+"""
+app/services/utils/metrics.py
+
+Prometheus metrics shared by the API workers and the loader scripts.
+
+With PROMETHEUS_MULTIPROC_DIR set, every process (each uvicorn worker,
+scripts/load_clean_data.py) writes its samples to its own memory-mapped
+files in that directory and /metrics aggregates all of them, so counters
+stay cheap (no cross-process locking) and cover every worker. The
+variable has to be in the environment before prometheus_client is
+imported, which is why it is exported here from the settings. Empty the
+directory whenever the workers are (re)started, never while they run.
+
+Without it, /metrics only reports the worker that answers the scrape.
+"""
+
+import os
+
+from app.database.bulk import on_throughput
+from config import get_settings
+
+settings = get_settings()
+
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import (  # noqa: E402  (needs PROMETHEUS_MULTIPROC_DIR first)
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+
+# Analytics endpoints range from sub-millisecond cache hits to multi-second
+# live forecasts; the upper buckets keep p99 estimates usable for the latter
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# HTTP (route = path template, e.g. /api/v1/analytics/forecast/{sku_id})
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", multiprocess_mode="livesum"
+)
+
+# DB connection pool (engine = "api" for the sync engine behind the routes,
+# "stream" for the async engine: dataset version checks and NDJSON streams)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool",
+    ["engine"], buckets=POOL_WAIT_BUCKETS
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured pool size", ["engine"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out", ["engine"], multiprocess_mode="livesum"
+)
+
+# Caches (hit ratio = rate(hits) / rate(hits + misses))
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups", ["cache", "result"]
+)
+
+# Loader throughput (stage = ThroughputMeter label)
+LOADER_ROWS = Counter(
+    "loader_rows_total", "Rows written by the loader", ["stage"]
+)
+LOADER_ROWS_PER_SECOND = Gauge(
+    "loader_rows_per_second", "Throughput of the latest load of a stage", ["stage"],
+    multiprocess_mode="mostrecent"
+)
+
+
+@on_throughput
+def _record_loader_throughput(label: str, rows: int, rows_per_second: float) -> None:
+    LOADER_ROWS.labels(label).inc(rows)
+    LOADER_ROWS_PER_SECOND.labels(label).set(rows_per_second)
+
+
+def render_metrics() -> bytes:
+    """Exposition text for all processes (multiprocess mode) or this one."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a stopped worker's live gauges (in-progress requests, pool usage)."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
@@ -0,0 +1,96 @@
+"""
+app/services/utils/monte_carlo.py
+
+Vectorized Monte Carlo stockout simulation.
+
+Daily demand paths are bootstrapped from each SKU's own daily sales
+history (every simulated day is a random historical day of that SKU), for
+all SKUs at once. Each path is run against the SKU's on-hand stock:
+- stockout: cumulative demand exceeds on-hand within the horizon
+- days of cover: full days before that happens (the horizon if it
+  never does)
+
+Memory is bounded by simulating the paths in chunks of at most
+max_chunk_elements SKU x path cells (the day axis is accumulated, never
+materialized), so 10k paths x 5k SKUs runs in a few hundred MB. Each
+chunk draws from its own child of one SeedSequence, so a seed gives the
+same result for the same chunking.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_PATHS = 1000
+DEFAULT_HORIZON_DAYS = 14
+DEFAULT_SEED = 0
+DEFAULT_MAX_CHUNK_ELEMENTS = 5_000_000
+
+
+def simulate_stockouts(
+    history: np.ndarray,
+    on_hand: np.ndarray,
+    horizon_days: int = DEFAULT_HORIZON_DAYS,
+    n_paths: int = DEFAULT_PATHS,
+    seed: Optional[int] = DEFAULT_SEED,
+    max_chunk_elements: int = DEFAULT_MAX_CHUNK_ELEMENTS
+) -> Dict[str, np.ndarray]:
+    """
+    history: SKU x day matrix of historical daily demand
+    on_hand: current stock per SKU (len == history.shape[0])
+    Returns per-SKU arrays: stockout_probability, expected_days_of_cover
+    and expected_demand (mean cumulative demand over the horizon).
+    """
+    n_skus, n_days = history.shape
+    on_hand = np.asarray(on_hand, dtype=float)
+    if n_skus == 0 or n_days == 0:
+        return {
+            "stockout_probability": (on_hand <= 0).astype(float),
+            "expected_days_of_cover": np.where(on_hand <= 0, 0.0, float(horizon_days)),
+            "expected_demand": np.zeros(n_skus)
+        }
+
+    history = np.ascontiguousarray(history, dtype=np.float32)
+    flat_history = history.ravel()
+    index_dtype = np.int32 if n_skus * n_days < 2 ** 31 else np.int64
+    row_offsets = (np.arange(n_skus, dtype=index_dtype) * n_days)[:, None]
+    stock = on_hand.astype(np.float32)[:, None]
+
+    chunk_paths = int(max(1, min(n_paths, max_chunk_elements // max(n_skus, 1))))
+    chunk_sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    stockouts = np.zeros(n_skus)
+    cover_total = np.zeros(n_skus)
+    demand_total = np.zeros(n_skus)
+
+    for size, chunk_seed in zip(chunk_sizes, seeds):
+        rng = np.random.default_rng(chunk_seed)
+        cumulative = np.zeros((n_skus, size), dtype=np.float32)
+        cover = np.full((n_skus, size), horizon_days, dtype=np.int32)
+        out = np.zeros((n_skus, size), dtype=bool)
+
+        for day in range(horizon_days):
+            sampled_days = rng.integers(0, n_days, size=(n_skus, size), dtype=index_dtype)
+            cumulative += flat_history[row_offsets + sampled_days]
+            newly_out = ~out & (cumulative > stock)
+            cover[newly_out] = day
+            out |= newly_out
+
+        stockouts += out.sum(axis=1)
+        cover_total += cover.sum(axis=1)
+        demand_total += cumulative.sum(axis=1, dtype=np.float64)
+
+    stockout_probability = stockouts / n_paths
+    expected_days_of_cover = cover_total / n_paths
+
+    # No stock at all: out from day 0, whatever the demand
+    empty = on_hand <= 0
+    stockout_probability[empty] = 1.0
+    expected_days_of_cover[empty] = 0.0
+
+    return {
+        "stockout_probability": stockout_probability,
+        "expected_days_of_cover": expected_days_of_cover,
+        "expected_demand": demand_total / n_paths
+    }
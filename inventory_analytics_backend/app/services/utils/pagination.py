@@ -0,0 +1,149 @@
+"""
+app/services/utils/pagination.py
+
+Keyset pagination and NDJSON streaming helpers for row-level analytics.
+
+- Cursors are opaque url-safe strings encoding the sort key of the last
+  row returned; the next page starts strictly after it, so every page is
+  an index range scan instead of an OFFSET over everything before it.
+- NDJSON streams pull rows through a server-side cursor (yield_per) on
+  their own AsyncSession and write one JSON object per line as rows
+  arrive, so memory stays flat regardless of result size.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from starlette.concurrency import run_in_threadpool
+
+from app.database.session import AsyncSessionLocal
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], key_types: Sequence[type]) -> Optional[List[Any]]:
+    """
+    Decode a cursor from a query parameter. key_types: the type of each
+    sort key column, in order; anything else (tampered, or a cursor from
+    another endpoint) is a 400.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(raw, list):
+            raise ValueError("cursor is not a list")
+        values = [_decode_value(v) for v in raw]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if len(values) != len(key_types) or not all(
+        isinstance(value, key_type) for value, key_type in zip(values, key_types)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_after(columns: Sequence, values: Sequence[Any]):
+    """
+    WHERE clause for rows strictly after `values` in ascending
+    (columns...) order: (a > x) OR (a = x AND b > y) OR ...
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, column > values[i]))
+    return or_(*clauses)
+
+
+def page_result(rows: list, limit: int, key: Callable[[Any], Sequence[Any]], formatter: Callable) -> dict:
+    """
+    Build one page from up to limit + 1 rows (the extra row only signals
+    that another page exists).
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [formatter(row) for row in rows],
+        "next_cursor": encode_cursor(key(rows[-1])) if has_more and rows else None
+    }
+
+
+async def stream_ndjson(
+    stmt: Select,
+    formatter: Callable[[Any], dict],
+    batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[bytes]:
+    """Yield one JSON line per row of `stmt`, fetched through a server-side cursor."""
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield "".join(
+                json.dumps(jsonable_encoder(formatter(row))) + "\n" for row in rows
+            ).encode()
+
+
+async def stream_pages(
+    fetch_page: Callable[..., dict],
+    session_factory: Callable[[], Session],
+    key_types: Sequence[type],
+    after: Optional[List[Any]] = None
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON over keyset pages, for rows that cannot come from a single
+    cursor (e.g. forecasts, which need each SKU's whole history):
+    fetch_page(db, after) returns a page_result() dict whose keys have
+    key_types. Pages are computed on the threadpool, on one sync Session
+    from session_factory.
+    """
+    db = session_factory()
+    try:
+        while True:
+            page = await run_in_threadpool(fetch_page, db, after)
+            if page["items"]:
+                yield "".join(
+                    json.dumps(jsonable_encoder(item)) + "\n" for item in page["items"]
+                ).encode()
+            if not page["next_cursor"]:
+                break
+            after = decode_cursor(page["next_cursor"], key_types)
+    finally:
+        await run_in_threadpool(db.close)
+
+
+def ndjson_response(lines: AsyncIterator[bytes]) -> StreamingResponse:
+    # Streams are never buffered by the response cache
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers={"Cache-Control": "no-store"})
@@ -0,0 +1,176 @@
+"""
+app/services/utils/slow_query_log.py
+
+In-process log of slow SQL statements, with their query plans.
+
+Statements at or above SLOW_QUERY_THRESHOLD_MS (timed by the cursor
+listeners in app/middleware/sql_instrumentation.py) are kept in a ring
+buffer of the last SLOW_QUERY_LOG_SIZE entries: statement, bound
+parameters, duration, request path. Read it at GET /api/v1/admin/slow-queries.
+
+Plans are captured off the request path by one background thread on its
+own connection of the sync engine:
+- PostgreSQL: EXPLAIN (ANALYZE, BUFFERS), inside a transaction that is
+  rolled back and with statement_timeout = SLOW_QUERY_EXPLAIN_TIMEOUT_MS
+- SQLite: EXPLAIN QUERY PLAN
+Only SELECT / WITH statements are explained (EXPLAIN ANALYZE runs the
+statement), each distinct statement at most once per
+SLOW_QUERY_EXPLAIN_INTERVAL (later entries reuse that plan; plans of the
+last SLOW_QUERY_LOG_SIZE distinct statements are kept), and work is
+dropped rather than queued without bound. Every worker process keeps its
+own log.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from config import get_settings
+
+settings = get_settings()
+
+EXPLAIN_CONNECTION_FLAG = "slow_query_explain"
+EXPLAIN_QUEUE_SIZE = 100
+MAX_PARAMETER_CHARS = 200
+EXPLAINABLE_PREFIXES = ("select", "with")
+
+
+def _display_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > MAX_PARAMETER_CHARS:
+        return text[:MAX_PARAMETER_CHARS] + "…"
+    return text
+
+
+def display_parameters(parameters, executemany: bool):
+    """JSON-safe, truncated copy of DBAPI parameters (tuple or dict)."""
+    if executemany:
+        return {"executemany_rows": len(parameters)}
+    if isinstance(parameters, dict):
+        return {key: _display_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_display_value(value) for value in parameters]
+    return _display_value(parameters)
+
+
+class SlowQueryLog:
+    """Ring buffer of slow statements plus the background EXPLAIN worker."""
+
+    def __init__(self, size: int):
+        self._entries: deque = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._size = size
+        # statement -> (captured at, plan), least recently used first
+        self._plans: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._worker: Optional[threading.Thread] = None
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+
+    def start(self, engine: Engine) -> None:
+        """Start the EXPLAIN worker (no plans are captured before this)."""
+        with self._lock:
+            if self._worker is not None or not settings.SLOW_QUERY_EXPLAIN:
+                return
+            self._engine = engine
+            self._worker = threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True)
+            self._worker.start()
+
+    def record(self, statement: str, parameters, executemany: bool, duration_ms: float,
+               dialect: str, path: Optional[str] = None) -> None:
+        entry = {
+            "id": next(self._ids),
+            "recorded_at": datetime.utcnow().isoformat(),
+            "duration_ms": round(duration_ms, 2),
+            "path": path,
+            "dialect": dialect,
+            "statement": statement,
+            "parameters": display_parameters(parameters, executemany),
+            "plan": None,
+            "plan_status": "pending"
+        }
+
+        if not statement.lstrip().lower().startswith(EXPLAINABLE_PREFIXES) or executemany:
+            entry["plan_status"] = "not explained (not a single SELECT)"
+        elif self._worker is None:
+            entry["plan_status"] = "not explained (EXPLAIN disabled)"
+        else:
+            cached = self._cached_plan(statement)
+            if cached is not None:
+                entry.update(cached)
+            else:
+                try:
+                    self._queue.put_nowait((entry, statement, parameters))
+                except queue.Full:
+                    entry["plan_status"] = "not explained (EXPLAIN queue full)"
+
+        self._entries.append(entry)
+
+    def entries(self, limit: Optional[int] = None) -> List[dict]:
+        """Newest first."""
+        entries = list(self._entries)[::-1]
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        self._entries.clear()
+        with self._lock:
+            self._plans.clear()
+
+    # ---------------------------------------------------------
+    # EXPLAIN worker
+    # ---------------------------------------------------------
+    def _explain_loop(self) -> None:
+        while True:
+            entry, statement, parameters = self._queue.get()
+            result = self._cached_plan(statement)
+            if result is None:
+                try:
+                    result = {"plan": self._explain(statement, parameters), "plan_status": "captured"}
+                except Exception as exc:  # a failed EXPLAIN must never stop the worker
+                    result = {"plan": None, "plan_status": f"EXPLAIN failed: {exc}"}
+                self._store_plan(statement, result)
+            entry.update(result)
+
+    def _cached_plan(self, statement: str) -> Optional[dict]:
+        """Plan captured within SLOW_QUERY_EXPLAIN_INTERVAL, if any."""
+        with self._lock:
+            cached = self._plans.get(statement)
+            if cached is None or time.monotonic() - cached[0] >= settings.SLOW_QUERY_EXPLAIN_INTERVAL:
+                return None
+            self._plans.move_to_end(statement)
+            return cached[1]
+
+    def _store_plan(self, statement: str, result: dict) -> None:
+        with self._lock:
+            self._plans[statement] = (time.monotonic(), result)
+            self._plans.move_to_end(statement)
+            while len(self._plans) > self._size:
+                self._plans.popitem(last=False)
+
+    def _explain(self, statement: str, parameters) -> List[str]:
+        with self._engine.connect() as conn:
+            # The worker's own statements must not be logged (and explained) again
+            conn.info[EXPLAIN_CONNECTION_FLAG] = True
+            try:
+                if conn.dialect.name == "postgresql":
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+                    rows = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters).all()
+                    return [row[0] for row in rows]
+
+                rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+                # SQLite: (id, parent, notused, detail)
+                return [row[-1] for row in rows]
+            finally:
+                conn.info.pop(EXPLAIN_CONNECTION_FLAG, None)
+                conn.rollback()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
@@ -0,0 +1,200 @@
+"""
+app/services/utils/stack_sampler.py
+
+Sampling profiler for the event loop thread plus every other thread that
+is running application code (the threadpool workers the calculators run
+on, dashboard sections).
+
+A background thread reads the current stacks every `interval` seconds
+(sys._current_frames) and weights each by the time since the previous
+sample. Unlike cProfile this needs no per-call hooks and follows work
+across threads, so it adds little overhead. Work on several threads at
+once is counted once per thread (sampled time can exceed wall time).
+
+Every sample is put in one category (first match, leaf to root):
+- waiting: the event loop is idle in select() (I/O, waiting for the
+  threadpool)
+- db: the driver executing a statement (SQLAlchemy's do_execute*)
+- orm_hydration: building rows/objects from results (sqlalchemy
+  orm/loading.py, engine/result.py, engine/cursor.py, engine/row.py)
+- sqlalchemy: any other SQLAlchemy code (SQL compilation, session, ...)
+- python: everything else (calculators, pandas/numpy, serialization)
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.001
+MAX_STACK_DEPTH = 200
+
+Frame = Tuple[str, int, str]  # (filename, first line, function name)
+
+HYDRATION_FILES = (
+    ("sqlalchemy", "orm", "loading.py"),
+    ("sqlalchemy", "engine", "result.py"),
+    ("sqlalchemy", "engine", "cursor.py"),
+    ("sqlalchemy", "engine", "row.py"),
+)
+# Leaf files of a thread that is parked (waiting for work or a lock)
+BLOCKED_FILES = {"threading.py", "queue.py", "selectors.py"}
+DB_EXECUTE_FUNCTIONS = {"do_execute", "do_executemany", "do_execute_no_params"}
+CATEGORIES = ("db", "orm_hydration", "sqlalchemy", "python", "waiting")
+
+
+def _path_parts(filename: str) -> Tuple[str, ...]:
+    return Path(filename).parts[-3:]
+
+
+def categorize(stack: Tuple[Frame, ...]) -> str:
+    """Category of one root-to-leaf stack."""
+    if stack and Path(stack[-1][0]).name == "selectors.py":
+        return "waiting"
+    if stack and stack[-1][2] in DB_EXECUTE_FUNCTIONS and "sqlalchemy" in _path_parts(stack[-1][0]):
+        return "db"
+    in_sqlalchemy = False
+    for filename, _, _ in stack:
+        parts = _path_parts(filename)
+        if parts in HYDRATION_FILES:
+            return "orm_hydration"
+        if "sqlalchemy" in parts[:-1]:
+            in_sqlalchemy = True
+    return "sqlalchemy" if in_sqlalchemy else "python"
+
+
+class StackSampler:
+    """
+    Samples `thread_id` and, with include_dirs, any other thread whose
+    stack passes through a file under one of them, until stop().
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = DEFAULT_INTERVAL,
+                 include_dirs: Tuple[str, ...] = ()):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.include_dirs = include_dirs
+        self.samples: Counter = Counter()  # stack -> seconds
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = self._stack(frame)
+                if thread_id == self.thread_id or self._included(stack):
+                    self.samples[stack] += now - last
+            last = now
+
+    def _included(self, stack: Tuple[Frame, ...]) -> bool:
+        # Other threads count while they run application code, not while parked
+        if not self.include_dirs or not stack or Path(stack[-1][0]).name in BLOCKED_FILES:
+            return False
+        return any(f[0].startswith(self.include_dirs) for f in stack)
+
+    @staticmethod
+    def _stack(frame) -> Tuple[Frame, ...]:
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    # ---------------------------------------------------------
+    # Reports
+    # ---------------------------------------------------------
+    def breakdown_ms(self) -> Dict[str, float]:
+        totals = dict.fromkeys(CATEGORIES, 0.0)
+        for stack, seconds in self.samples.items():
+            totals[categorize(stack)] += seconds
+        return {category: round(seconds * 1000, 2) for category, seconds in totals.items()}
+
+    def call_tree(self, roots: Tuple[str, ...] = (), min_fraction: float = 0.01) -> List[dict]:
+        """
+        Aggregated call tree (total/self ms per node). With roots
+        (directories), each stack starts at its first frame under one of
+        them (framework and event loop frames above it are dropped); stacks
+        never entering them are left out. Nodes under min_fraction of the
+        sampled time are pruned.
+        """
+        tree: dict = {}
+        for stack, seconds in self.samples.items():
+            if roots:
+                start = next((i for i, f in enumerate(stack) if f[0].startswith(roots)), None)
+                if start is None:
+                    continue
+                stack = stack[start:]
+            level = tree
+            for i, frame in enumerate(stack):
+                node = level.setdefault(frame, {"total": 0.0, "self": 0.0, "children": {}})
+                node["total"] += seconds
+                if i == len(stack) - 1:
+                    node["self"] += seconds
+                level = node["children"]
+
+        cutoff = sum(self.samples.values()) * min_fraction
+
+        def render(level):
+            return [
+                {
+                    "function": f"{name} ({Path(filename).name}:{line})",
+                    "total_ms": round(node["total"] * 1000, 2),
+                    "self_ms": round(node["self"] * 1000, 2),
+                    "children": render(node["children"])
+                }
+                for (filename, line, name), node in sorted(level.items(), key=lambda item: -item[1]["total"])
+                if node["total"] >= cutoff
+            ]
+
+        return render(tree)
+
+    def to_speedscope(self, name: str) -> dict:
+        """Speedscope "sampled" profile (https://www.speedscope.app)."""
+        frame_index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, seconds in self.samples.items():
+            samples.append([frame_index.setdefault(frame, len(frame_index)) for frame in stack])
+            weights.append(round(seconds * 1000, 4))
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [
+                {"name": function, "file": filename, "line": line}
+                for (filename, line, function) in frame_index
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 4),
+                "samples": samples,
+                "weights": weights
+            }],
+            "name": name,
+            "exporter": "inventory_analytics_backend"
+        }
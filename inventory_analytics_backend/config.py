@@ -1,9 +1,38 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./inventory.db"  # fallback only if no .env exists
+    ASYNC_DATABASE_URL: Optional[str] = None  # defaults to DATABASE_URL with the async driver
     DEBUG: bool = True
+    API_THREADPOOL_SIZE: int = 40  # worker threads for the (sync) calculators behind the async routes
+    DB_POOL_SIZE: int = 20  # sync engine pool (API requests, loaders); ignored for SQLite
+    DB_MAX_OVERFLOW: int = 20  # extra connections above DB_POOL_SIZE under load
+    MIN_STOCK_LEVEL: int = 10  # stock alert threshold (units)
+    DASHBOARD_CONCURRENCY: int = 4  # dashboard sections running at once (thread pool size)
+    DASHBOARD_SECTION_TIMEOUT: float = 5.0  # seconds before a section is reported as timed out
+    RESPONSE_CACHE_ENABLED: bool = True  # cache analytics GET responses in-process
+    RESPONSE_CACHE_TTL: float = 60.0  # seconds
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256  # LRU bound
+    DATASET_VERSION_CHECK_INTERVAL: float = 1.0  # seconds between dataset version reads
+    MONTE_CARLO_PATHS: int = 1000  # default demand paths per SKU for /stockout-risk
+    MONTE_CARLO_CHUNK_ELEMENTS: int = 5_000_000  # SKU x path cells simulated at once (memory bound)
+    FORECAST_STORE_DIR: str = "forecast_results"  # offline forecast runs (relative to the backend root)
+    FORECAST_STORE_CHECK_INTERVAL: float = 5.0  # seconds between checks for a new forecast run
+    FORECAST_STORE_MAX_AGE_HOURS: float = 24.0  # older runs are ignored and forecasts computed live
+    SQL_INSTRUMENTATION_ENABLED: bool = True  # per-request query count/time (Server-Timing + app.sql log)
+    N_PLUS_ONE_THRESHOLD: int = 10  # identical statements per request flagged as a likely N+1
+    METRICS_ENABLED: bool = True  # Prometheus /metrics + request/pool instrumentation
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None  # shared by all workers; empty it before starting them
+    ADMIN_TOKEN: Optional[str] = None  # X-Admin-Token for admin-only features; unset disables them
+    PROFILE_DIR: str = "profiles"  # speedscope files from ?profile=speedscope (relative to the backend root)
+    PROFILE_SAMPLE_INTERVAL: float = 0.001  # seconds between stack samples of a profiled request
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0  # statements at least this slow go to the slow-query log (0 = off)
+    SLOW_QUERY_LOG_SIZE: int = 200  # ring buffer entries per worker
+    SLOW_QUERY_EXPLAIN: bool = True  # capture query plans in a background thread
+    SLOW_QUERY_EXPLAIN_INTERVAL: float = 300.0  # seconds before the same statement is explained again
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 10000  # PostgreSQL statement_timeout for EXPLAIN ANALYZE
 
     class Config:
         env_file = ".env"
@@ -1,3 +1,5 @@
+import os
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -6,6 +8,17 @@ from app.database.connection import init_db
 from app.api.v1.router import router as api_v1_router
 from app.middleware.error_handler import setup_exception_handlers
 from app.middleware.logging import setup_logging
+from app.middleware.profiler import setup_profiler
+from app.middleware.response_cache import setup_response_cache, response_cache
+from app.middleware.etag import setup_etag
+from app.middleware.sql_instrumentation import setup_sql_instrumentation
+from app.middleware.metrics import setup_metrics
+from app.services.utils.metrics import mark_process_dead
+from app.database.session import async_engine
+from app.services.analytics.dashboard import DashboardService
+from config import get_settings
+
+settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -13,9 +26,14 @@ async def lifespan(app: FastAPI):
     print("🚀 Initializing database...")
     init_db()
     print("✅ Database initialized")
+    # Routes run the sync calculators on this threadpool (ThreadedSession)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.API_THREADPOOL_SIZE
     yield
     # Shutdown
     print("🛑 Shutting down...")
+    DashboardService.shutdown()
+    await async_engine.dispose()
+    mark_process_dead(os.getpid())
 
 app = FastAPI(
     title="Inventory Analytics API",
@@ -31,11 +49,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Cache", "Server-Timing"],
 )
 
 # Setup middleware
 setup_exception_handlers(app)
 setup_logging(app)
+setup_profiler(app)  # inside the cache: ?profile=1 always runs the endpoint
+setup_response_cache(app)
+setup_etag(app)
+setup_sql_instrumentation(app)  # also times cache hits and 304s
+setup_metrics(app)  # outermost: counts every response
 
 # Include routers
 app.include_router(api_v1_router, prefix="/api/v1")
@@ -44,6 +68,10 @@ app.include_router(api_v1_router, prefix="/api/v1")
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"status": "success", "data": response_cache.stats()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
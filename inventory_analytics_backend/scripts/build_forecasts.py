@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+# ---------------------------------------------------
+# Ensure project root is in PYTHONPATH
+# ---------------------------------------------------
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from app.database.connection import SessionLocal, engine, init_db
+from app.database.dataset_version import bump_dataset_version
+from app.database.models import ProductMaster
+from app.services.analytics.forecasting import ForecastingEngine, HISTORY_DAYS, FORECAST_MODELS, DEFAULT_MODEL
+from app.services.analytics.forecast_result_loader import ForecastResultLoader, store_dir
+
+DEFAULT_HORIZON_DAYS = 90
+
+
+# ===================================================
+#               FORECAST BATCH JOB
+# ===================================================
+
+def build_forecasts(horizon_days=DEFAULT_HORIZON_DAYS, history_days=HISTORY_DAYS, model=DEFAULT_MODEL):
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        sku_ids, _, matrix = ForecastingEngine.sales_matrix(db, history_days)
+        average, forecast = ForecastingEngine.run_model(matrix, horizon_days, model)
+        categories = dict(db.query(ProductMaster.sku_id, ProductMaster.category).all())
+    finally:
+        db.close()
+
+    run_id = ForecastResultLoader.write_run(
+        sku_ids, average, forecast, categories,
+        start_date=(datetime.now() + timedelta(days=1)).date(),
+        extra_metadata={"model": model, "history_days": history_days}
+    )
+
+    # Cached /forecast responses must not outlive the run they came from
+    with engine.begin() as conn:
+        bump_dataset_version(conn)
+
+    print(f"✔️ Forecast run {run_id} ({model}): {len(sku_ids)} SKUs x {horizon_days} days "
+          f"in {time.perf_counter() - started:.2f}s → {store_dir()}")
+    return run_id
+
+
+# ===================================================
+#               MAIN EXECUTION
+# ===================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute forecasts into the offline forecast store.")
+    parser.add_argument("--horizon-days", type=int, default=DEFAULT_HORIZON_DAYS,
+                        help="Days forecast per SKU (requests for more are computed live)")
+    parser.add_argument("--history-days", type=int, default=HISTORY_DAYS,
+                        help="Sales history window the forecasts are fitted on")
+    parser.add_argument("--model", choices=FORECAST_MODELS, default=DEFAULT_MODEL,
+                        help="Forecast model stored in the run")
+    args = parser.parse_args()
+
+    init_db()
+
+    print("🔮 Building forecasts...")
+    build_forecasts(args.horizon_days, args.history_days, args.model)
+    print("🎉 Forecast store updated!")
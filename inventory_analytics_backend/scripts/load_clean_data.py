@@ -1,7 +1,9 @@
 import os
 import sys
+import argparse
+from datetime import datetime
 import pandas as pd
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
 # ---------------------------------------------------
 # Ensure project root is in PYTHONPATH
@@ -14,8 +16,22 @@ if PROJECT_ROOT not in sys.path:
 # ---------------------------------------------------
 # Import DB Session + Models
 # ---------------------------------------------------
-from app.database.connection import SessionLocal, init_db
-from app.database.models import ProductMaster, StockReceipt, SalesTransaction
+from app.database.connection import engine, init_db
+from app.database.models import ProductMaster, StockReceipt, SalesTransaction, IngestionWatermark
+from app.database.bulk import BulkWriter, ThroughputMeter
+from app.database.dataset_version import bump_dataset_version
+from app.services.analytics.stock_balance import StockBalanceService
+from app.services.analytics.sales_rollup import SalesRollupService
+from app.services.utils.elasticity import ElasticityStore
+from app.services.utils.file_loader import (
+    iter_csv_chunks, iter_clean_chunks, file_checksum, RowHasher, DEFAULT_CHUNK_SIZE
+)
+
+try:
+    # Exports loader throughput as loader_* Prometheus metrics
+    import app.services.utils.metrics  # noqa: F401
+except ImportError:  # optional: prometheus_client not installed
+    pass
 
 
 # ===================================================
@@ -32,39 +48,177 @@ PRODUCT_MAPPING = {
     "sale_price": "unit_selling_price"
 }
 
-def load_product_master():
-    csv_path = os.path.join(PROJECT_ROOT, "data", "clean", "product_master.csv")
+def _clean_path(filename):
+    csv_path = os.path.join(PROJECT_ROOT, "data", "clean", filename)
 
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"❌ Missing cleaned file: {csv_path}")
 
-    df = pd.read_csv(csv_path)
-    df.columns = df.columns.str.strip()
-    df = df.rename(columns=PRODUCT_MAPPING)
-    df = df[list(PRODUCT_MAPPING.values())]
-
-    df["unit_cost_price"] = pd.to_numeric(df["unit_cost_price"], errors="coerce").fillna(0)
-    df["unit_selling_price"] = pd.to_numeric(df["unit_selling_price"], errors="coerce").fillna(0)
-
-    session: Session = SessionLocal()
-    inserted = 0
-
-    for _, row in df.iterrows():
-        product = ProductMaster(
-            sku_id=str(row["sku_id"]).strip(),
-            product_name=str(row["product_name"]).strip(),
-            category=str(row["category"]).strip(),
-            sub_category=str(row["sub_category"]).strip(),
-            brand=str(row["brand"]).strip(),
-            unit_cost_price=float(row["unit_cost_price"]),
-            unit_selling_price=float(row["unit_selling_price"])
-        )
-        session.merge(product)  # UPSERT
-        inserted += 1
+    return csv_path
+
+
+def _strip(df, columns):
+    for col in columns:
+        df[col] = df[col].map(str).str.strip()
+    return df
+
+
+def load_product_master(chunk_size=DEFAULT_CHUNK_SIZE, incremental=False):
+    """
+    Upsert the product master. The file's checksum is kept as a watermark:
+    incremental runs skip an unchanged file, and the dataset version is only
+    bumped when the file differs from the last load (an unchanged upsert
+    rewrites the same values, so cached responses stay valid).
+    """
+    filename = "product_master.csv"
+    csv_path = _clean_path(filename)
+    checksum = file_checksum(csv_path)
+    meter = ThroughputMeter("product")
+
+    with engine.begin() as conn:
+        writer = BulkWriter(conn)
+        mark = _get_watermark(conn, filename)
+        changed = mark is None or mark.file_checksum != checksum
+
+        if incremental and not changed:
+            print(f"⏭️  {filename} unchanged since last load — skipping.")
+            return
+
+        for df in iter_csv_chunks(csv_path, PRODUCT_MAPPING, chunk_size):
+            df = _strip(df, ["sku_id", "product_name", "category", "sub_category", "brand"])
+            df["unit_cost_price"] = pd.to_numeric(df["unit_cost_price"], errors="coerce").fillna(0)
+            df["unit_selling_price"] = pd.to_numeric(df["unit_selling_price"], errors="coerce").fillna(0)
+            df["updated_at"] = datetime.utcnow()
 
-    session.commit()
-    session.close()
-    print(f"✔️ Loaded {inserted} product records.")
+            # UPSERT (set-based, one statement per chunk)
+            meter.add(writer.upsert_frame(ProductMaster.__table__, df, ["sku_id"]))
+
+        writer.upsert_frame(IngestionWatermark.__table__, pd.DataFrame([{
+            "source": filename,
+            "max_date": None,
+            "file_checksum": checksum,
+            "rows_loaded": meter.rows,
+            "updated_at": datetime.utcnow()
+        }]), ["source"])
+
+        if changed:
+            bump_dataset_version(conn)
+
+    print(f"✔️ Loaded {meter.report()}.")
+
+
+# ===================================================
+#               WATERMARKED INGESTION
+# ===================================================
+
+def _get_watermark(conn, source):
+    return conn.execute(
+        select(IngestionWatermark).where(IngestionWatermark.source == source)
+    ).first()
+
+
+CLEAN_DIR = os.path.join(PROJECT_ROOT, "data", "clean")
+
+
+def _clean_files(prefix, fmt="csv"):
+    """
+    Cleaned files for one source, relative to data/clean and sorted:
+    - csv:     <prefix>*.csv (monthly splits included)
+    - parquet: <prefix>*.parquet plus <prefix>/month=YYYY-MM/*.parquet partitions
+    """
+    ext = f".{fmt}"
+    files = []
+
+    if os.path.isdir(CLEAN_DIR):
+        files = [f for f in os.listdir(CLEAN_DIR) if f.startswith(prefix) and f.endswith(ext)]
+
+        partition_root = os.path.join(CLEAN_DIR, prefix)
+        if fmt == "parquet" and os.path.isdir(partition_root):
+            for part_dir in os.listdir(partition_root):
+                part_path = os.path.join(partition_root, part_dir)
+                if os.path.isdir(part_path):
+                    files += [
+                        os.path.join(prefix, part_dir, f)
+                        for f in os.listdir(part_path) if f.endswith(ext)
+                    ]
+
+    if not files:
+        raise FileNotFoundError(f"❌ Missing cleaned file: {os.path.join(CLEAN_DIR, prefix + ext)}")
+
+    return sorted(files)
+
+
+def _ingest(filename, mapping, table, date_col, prepare, label, chunk_size, incremental,
+            replace=False, on_insert=None):
+    """
+    Stream one cleaned file into `table`.
+
+    `replace` clears the table first (full mode, first file). Incremental
+    mode skips files whose checksum matches the stored watermark, only
+    considers rows dated on/after the watermark date and relies on the
+    unique row_hash to drop rows that were already loaded, so re-runs are
+    idempotent. `on_insert(conn, rows)` receives the rows actually inserted
+    by each incremental chunk (to maintain derived tables). Returns the
+    number of rows loaded.
+    """
+    path = _clean_path(filename)
+    checksum = file_checksum(path)
+    meter = ThroughputMeter(label)
+    hasher = RowHasher(list(mapping.values()))
+
+    with engine.begin() as conn:
+        writer = BulkWriter(conn)
+        mark = _get_watermark(conn, filename) if incremental else None
+
+        if mark and mark.file_checksum == checksum:
+            print(f"⏭️  {filename} unchanged since last load — skipping.")
+            return 0
+
+        since = mark.max_date if mark else None
+        max_date = since
+
+        if replace:
+            conn.execute(table.delete())
+
+        source_date_col = next(k for k, v in mapping.items() if v == date_col)
+        for df in iter_clean_chunks(path, mapping, chunk_size, source_date_col, since):
+            df = prepare(df)
+            df["row_hash"] = hasher.hash(df)
+
+            if since is not None:
+                df = df[df[date_col].isna() | (df[date_col] >= since)]
+
+            chunk_max = df[date_col].max()
+            if pd.notna(chunk_max) and (max_date is None or chunk_max > max_date):
+                max_date = chunk_max
+
+            df["created_at"] = datetime.utcnow()
+
+            if not incremental:
+                meter.add(writer.insert_frame(table, df))
+                continue
+
+            inserted = writer.insert_frame_returning(
+                table, df, ["row_hash"], returning=list(mapping.values())
+            )
+            meter.add(len(inserted))
+            if on_insert:
+                on_insert(conn, inserted)
+
+        writer.upsert_frame(IngestionWatermark.__table__, pd.DataFrame([{
+            "source": filename,
+            "max_date": max_date,
+            "file_checksum": checksum,
+            "rows_loaded": (mark.rows_loaded if mark else 0) + meter.rows,
+            "updated_at": datetime.utcnow()
+        }]), ["source"])
+
+        if replace or meter.rows:
+            bump_dataset_version(conn)
+
+    mode = "new" if incremental else "total"
+    print(f"✔️ {filename}: loaded {meter.report()} ({mode}); watermark → {max_date}.")
+    return meter.rows
 
 
 # ===================================================
@@ -79,39 +233,27 @@ STOCK_MAPPING = {
     "cost_price": "unit_cost"
 }
 
-def load_stock_receipts():
-    csv_path = os.path.join(PROJECT_ROOT, "data", "clean", "stock_receipts.csv")
-
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"❌ Missing cleaned file: {csv_path}")
-
-    df = pd.read_csv(csv_path)
-    df.columns = df.columns.str.strip()
-    df = df.rename(columns=STOCK_MAPPING)
-    df = df[list(STOCK_MAPPING.values())]
-
-    df["quantity_received"] = pd.to_numeric(df["quantity_received"], errors="coerce").fillna(0)
+def _prepare_stock_receipts(df):
+    df = _strip(df, ["sku_id", "supplier_id"])
+    df["quantity_received"] = pd.to_numeric(df["quantity_received"], errors="coerce").fillna(0).astype("int64")
     df["unit_cost"] = pd.to_numeric(df["unit_cost"], errors="coerce").fillna(0)
-
     df["receipt_date"] = pd.to_datetime(df["receipt_date"], errors="coerce")
+    return df
 
-    session: Session = SessionLocal()
-    inserted = 0
 
-    for _, row in df.iterrows():
-        rec = StockReceipt(
-            receipt_date=row["receipt_date"],
-            sku_id=str(row["sku_id"]).strip(),
-            quantity_received=int(row["quantity_received"]),
-            supplier_id=str(row["supplier_id"]).strip(),
-            unit_cost=float(row["unit_cost"])
-        )
-        session.add(rec)
-        inserted += 1
+def _apply_receipt_movements(conn, rows):
+    StockBalanceService.apply_movements(conn, StockBalanceService.movements_from_rows(
+        rows, "quantity_received", "receipt_date", "received"
+    ))
 
-    session.commit()
-    session.close()
-    print(f"✔️ Loaded {inserted} stock receipt rows.")
+
+def load_stock_receipts(chunk_size=DEFAULT_CHUNK_SIZE, incremental=False, fmt="csv"):
+    for i, filename in enumerate(_clean_files("stock_receipts", fmt)):
+        _ingest(
+            filename, STOCK_MAPPING, StockReceipt.__table__, "receipt_date",
+            _prepare_stock_receipts, "stock receipt", chunk_size, incremental,
+            replace=not incremental and i == 0, on_insert=_apply_receipt_movements
+        )
 
 
 # ===================================================
@@ -126,38 +268,57 @@ SALES_MAPPING = {
     # variable_weight ignored
 }
 
-def load_sales_transactions():
-    csv_path = os.path.join(PROJECT_ROOT, "data", "clean", "sales_transactions.csv")
+def _prepare_sales_transactions(df):
+    df = _strip(df, ["sku_id"])
+    df["quantity_sold"] = pd.to_numeric(df["quantity_sold"], errors="coerce").fillna(0).astype("int64")
+    df["sale_price"] = pd.to_numeric(df["sale_price"], errors="coerce").fillna(0)
+    df["transaction_date"] = pd.to_datetime(df["transaction_date"], errors="coerce")
+    return df
+
 
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"❌ Missing cleaned file: {csv_path}")
+def _apply_sale_movements(conn, rows):
+    StockBalanceService.apply_movements(conn, StockBalanceService.movements_from_rows(
+        rows, "quantity_sold", "transaction_date", "sold"
+    ))
+    SalesRollupService.apply_rows(conn, rows)
 
-    df = pd.read_csv(csv_path)
-    df.columns = df.columns.str.strip()
-    df = df.rename(columns=SALES_MAPPING)
-    df = df[list(SALES_MAPPING.values())]
 
-    df["quantity_sold"] = pd.to_numeric(df["quantity_sold"], errors="coerce").fillna(0)
-    df["sale_price"] = pd.to_numeric(df["sale_price"], errors="coerce").fillna(0)
+def load_sales_transactions(chunk_size=DEFAULT_CHUNK_SIZE, incremental=False, fmt="csv"):
+    loaded = 0
+    for i, filename in enumerate(_clean_files("sales_transactions", fmt)):
+        loaded += _ingest(
+            filename, SALES_MAPPING, SalesTransaction.__table__, "transaction_date",
+            _prepare_sales_transactions, "sales transaction", chunk_size, incremental,
+            replace=not incremental and i == 0, on_insert=_apply_sale_movements
+        )
 
-    df["transaction_date"] = pd.to_datetime(df["transaction_date"], errors="coerce")
+    if not incremental:
+        _rebuild_sales_rollup()
+    # Nothing new to fit on (refresh_elasticities.py keeps the window current)
+    if loaded or not incremental:
+        _refresh_elasticities()
 
-    session: Session = SessionLocal()
-    inserted = 0
 
-    for _, row in df.iterrows():
-        sale = SalesTransaction(
-            transaction_date=row["transaction_date"],
-            sku_id=str(row["sku_id"]).strip(),
-            quantity_sold=int(row["quantity_sold"]),
-            sale_price=float(row["sale_price"])
-        )
-        session.add(sale)
-        inserted += 1
+# ===================================================
+#               DERIVED TABLES
+# ===================================================
+
+def _rebuild_stock_balance():
+    with engine.begin() as conn:
+        skus = StockBalanceService.rebuild(conn)
+    print(f"✔️ Rebuilt stock_balance for {skus} SKUs.")
+
+
+def _rebuild_sales_rollup():
+    with engine.begin() as conn:
+        rows = SalesRollupService.rebuild(conn)
+    print(f"✔️ Rebuilt sales_daily_sku with {rows} SKU-day rows.")
 
-    session.commit()
-    session.close()
-    print(f"✔️ Loaded {inserted} sales transaction rows.")
+
+def _refresh_elasticities():
+    with engine.begin() as conn:
+        counts = ElasticityStore.refresh(conn)
+    print(f"✔️ Refreshed elasticity store ({counts.get('sku', 0)} SKUs).")
 
 
 # ===================================================
@@ -165,16 +326,30 @@ def load_sales_transactions():
 # ===================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load cleaned CSVs into the database.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows per streamed chunk / bulk statement")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only load rows newer than the stored watermark (idempotent)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="Staging format written by clean_data.py for receipts/sales")
+    args = parser.parse_args()
+
     print("🚀 Initializing database...")
     init_db()
 
     print("📦 Loading product master...")
-    load_product_master()
+    load_product_master(args.chunk_size, args.incremental)
 
     print("📦 Loading stock receipts...")
-    load_stock_receipts()
+    load_stock_receipts(args.chunk_size, args.incremental, args.format)
 
     print("📦 Loading sales transactions...")
-    load_sales_transactions()
+    load_sales_transactions(args.chunk_size, args.incremental, args.format)
+
+    # Full loads replace both movement tables: rebuild once, after both
+    # (incremental loads maintain stock_balance per inserted chunk)
+    if not args.incremental:
+        _rebuild_stock_balance()
 
     print("🎉 All data successfully imported!")
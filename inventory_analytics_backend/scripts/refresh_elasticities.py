@@ -0,0 +1,33 @@
+import os
+import sys
+import argparse
+
+# ---------------------------------------------------
+# Ensure project root is in PYTHONPATH
+# ---------------------------------------------------
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from app.database.connection import engine, init_db
+from app.services.utils.elasticity import ElasticityStore, DEFAULT_LOOKBACK_DAYS
+
+
+# ===================================================
+#               MAIN EXECUTION
+# ===================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refit the precomputed price elasticity store.")
+    parser.add_argument("--lookback-days", type=int, default=DEFAULT_LOOKBACK_DAYS,
+                        help="Sales history window used for the fits")
+    args = parser.parse_args()
+
+    init_db()
+
+    print("📈 Fitting elasticities...")
+    with engine.begin() as conn:
+        counts = ElasticityStore.refresh(conn, args.lookback_days)
+
+    print("🎉 Elasticity store refreshed: " + ", ".join(f"{n} {level}" for level, n in counts.items()))
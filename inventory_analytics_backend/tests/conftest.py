@@ -0,0 +1,153 @@
+"""
+tests/conftest.py
+
+Shared fixtures. Settings and engines are created at import time, so the
+throwaway SQLite database (and the settings the tests rely on) are set
+here, before anything from the app is imported.
+
+`dataset` writes a small cleaned dataset (dates relative to today) to a
+temporary data/clean directory and fully loads it with
+scripts/load_clean_data.py; the tests then load or write on top of it.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="inventory-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["DEBUG"] = "False"
+os.environ["DATASET_VERSION_CHECK_INTERVAL"] = "0"
+os.environ["SLOW_QUERY_EXPLAIN"] = "False"
+os.environ["FORECAST_STORE_DIR"] = os.path.join(_TMP, "forecast_results")
+os.environ["PROFILE_DIR"] = os.path.join(_TMP, "profiles")
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_ROOT, "scripts"))
+
+import pandas as pd  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+import load_clean_data  # noqa: E402
+from app.database import dataset_version  # noqa: E402
+from app.database.connection import engine, init_db  # noqa: E402
+from app.database.models import Base  # noqa: E402
+from app.middleware.response_cache import response_cache  # noqa: E402
+
+TODAY = date.today()
+
+PRODUCTS = [
+    # PTC, product_name, Category, GroupName, BrandName, cost_price, sale_price
+    ("SKU001", "Tea 250g", "Beverages", "Tea", "Tata", 80.0, 100.0),
+    ("SKU002", "Coffee 100g", "Beverages", "Coffee", "Nescafe", 150.0, 200.0),
+    ("SKU003", "Rice 5kg", "Staples", "Rice", "India Gate", 400.0, 520.0),
+    ("SKU004", "Salt 1kg", "Staples", "Salt", "Tata", 15.0, 25.0),
+]
+
+RECEIPTS = [
+    # dot, PTC, quantity, vendorCode_, cost_price
+    (TODAY - timedelta(days=40), "SKU001", 200, "V001", 80.0),
+    (TODAY - timedelta(days=40), "SKU002", 80, "V002", 150.0),
+    (TODAY - timedelta(days=30), "SKU003", 50, "V001", 400.0),
+    (TODAY - timedelta(days=20), "SKU001", 100, "V001", 82.0),
+    (TODAY - timedelta(days=10), "SKU004", 300, "V003", 15.0),
+]
+
+
+def _sales_rows():
+    """dot, PTC, quantity, sale_price, variable_weight"""
+    rows = []
+    for day in range(1, 15):
+        when = TODAY - timedelta(days=day)
+        # SKU001: daily, more units on the discounted days (for the elasticity fit)
+        rows.append((when, "SKU001", 2, 100.0, False) if day % 2 else (when, "SKU001", 3, 90.0, False))
+        # SKU002: every other day
+        if day % 2 == 0:
+            rows.append((when, "SKU002", 4, 200.0 if day < 8 else 180.0, False))
+    # SKU003: two identical lines on the same day (both are real sales)
+    rows.append((TODAY - timedelta(days=3), "SKU003", 1, 520.0, False))
+    rows.append((TODAY - timedelta(days=3), "SKU003", 1, 520.0, False))
+    # Today is still in progress (not part of the forecast history)
+    rows.append((TODAY, "SKU001", 50, 100.0, False))
+    return rows
+
+
+SALES = _sales_rows()
+
+
+def write_csv(path, header, rows):
+    pd.DataFrame(rows, columns=header).to_csv(path, index=False)
+
+
+def write_products(clean_dir, rows=PRODUCTS):
+    write_csv(os.path.join(clean_dir, "product_master.csv"),
+              ["PTC", "product_name", "Category", "GroupName", "BrandName", "cost_price", "sale_price"], rows)
+
+
+def write_receipts(clean_dir, rows=RECEIPTS):
+    write_csv(os.path.join(clean_dir, "stock_receipts.csv"),
+              ["dot", "PTC", "quantity", "vendorCode_", "cost_price"], rows)
+
+
+def write_sales(clean_dir, rows=SALES):
+    write_csv(os.path.join(clean_dir, "sales_transactions.csv"),
+              ["dot", "PTC", "quantity", "sale_price", "variable_weight"], rows)
+
+
+def run_loader(incremental=False):
+    """Same steps as `python scripts/load_clean_data.py [--incremental]`."""
+    load_clean_data.load_product_master(incremental=incremental)
+    load_clean_data.load_stock_receipts(incremental=incremental)
+    load_clean_data.load_sales_transactions(incremental=incremental)
+    if not incremental:
+        load_clean_data._rebuild_stock_balance()
+
+
+def current_version():
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM dataset_version")).scalar()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient (and app lifespan) for the whole run."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def clean_dir(tmp_path, monkeypatch):
+    """Empty data/clean directory the loader reads from."""
+    path = tmp_path / "data" / "clean"
+    path.mkdir(parents=True)
+    monkeypatch.setattr(load_clean_data, "PROJECT_ROOT", str(tmp_path))
+    monkeypatch.setattr(load_clean_data, "CLEAN_DIR", str(path))
+    return str(path)
+
+
+@pytest.fixture
+def empty_db():
+    """Fresh schema, no rows, no cached versions or responses."""
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    dataset_version._cached.update(version=None, checked_at=0.0)
+    response_cache.clear()
+    yield engine
+    response_cache.clear()
+
+
+@pytest.fixture
+def dataset(empty_db, clean_dir):
+    """The fixture dataset, fully loaded."""
+    write_products(clean_dir)
+    write_receipts(clean_dir)
+    write_sales(clean_dir)
+    run_loader()
+    return clean_dir
@@ -0,0 +1,38 @@
+"""Parquet staging (scripts/clean_data.py): every chunk is cast to the table's declared schema."""
+
+import pandas as pd
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+import clean_data  # noqa: E402
+
+
+def test_schema_does_not_depend_on_the_first_chunk(tmp_path):
+    writer = clean_data.ParquetChunkWriter(tmp_path / "stock_receipts.parquet", "stock_receipts")
+    # All-null and integer-looking values first, decimals and a numeric PTC later
+    writer.write(pd.DataFrame({"dot": [None], "PTC": [None], "quantity": ["2"],
+                               "vendorCode_": [None], "cost_price": [None]}))
+    writer.write(pd.DataFrame({"dot": ["2024-01-02"], "PTC": [12345], "quantity": ["1.5"],
+                               "vendorCode_": ["V001"], "cost_price": [80.5]}))
+    writer.close()
+
+    table = pq.read_table(tmp_path / "stock_receipts.parquet")
+    assert str(table.schema.field("dot").type) == "timestamp[ns]"
+    assert str(table.schema.field("PTC").type) == "string"
+    assert str(table.schema.field("vendorCode_").type) == "string"
+    assert str(table.schema.field("cost_price").type) == "double"
+    assert table.column("quantity").to_pylist() == [2.0, 1.5]
+    assert table.column("PTC").to_pylist() == [None, "12345"]
+
+
+def test_month_partitions_share_the_sales_schema(tmp_path):
+    writer = clean_data.PartitionedParquetWriter(tmp_path, "sales", "sales_transactions")
+    writer.write(pd.DataFrame({"dot": ["2024-01-31", "2024-02-01"], "PTC": ["SKU001", "SKU002"],
+                               "quantity": [2, 1.5], "sale_price": ["100", "99.5"],
+                               "variable_weight": [False, True]}))
+    writer.close()
+
+    schemas = {pq.read_schema(path) for path in tmp_path.glob("month=*/part-sales.parquet")}
+    assert len(schemas) == 1
+    assert schemas.pop().names == list(clean_data.STAGED_COLUMNS["sales_transactions"])
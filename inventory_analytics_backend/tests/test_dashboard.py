@@ -0,0 +1,52 @@
+"""/dashboard (app/services/analytics/dashboard.py): slow sections give a partial, uncached result."""
+
+import threading
+
+import pytest
+
+from app.services.analytics.stock_alerts import StockAlertSystem
+
+DASHBOARD = "/api/v1/analytics/dashboard"
+
+
+@pytest.fixture
+def slow_alerts(monkeypatch):
+    """Make the alerts section block until the test is over."""
+    release = threading.Event()
+    get_alerts = StockAlertSystem.get_stockout_alerts
+
+    def blocked(db):
+        release.wait(5)
+        return get_alerts(db)
+
+    monkeypatch.setattr(StockAlertSystem, "get_stockout_alerts", staticmethod(blocked))
+    yield
+    release.set()
+
+
+def test_complete_dashboard(client, dataset):
+    response = client.get(DASHBOARD)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "success"
+    assert {meta["status"] for meta in body["meta"]["sections"].values()} == {"ok"}
+    assert "no-store" not in response.headers.get("Cache-Control", "")
+
+
+def test_timed_out_section_gives_partial_result(client, dataset, slow_alerts):
+    response = client.get(DASHBOARD, params={"timeout": 0.2})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert body["status"] == "partial"
+    assert body["meta"]["sections"]["alerts"]["status"] == "timeout"
+    assert "alerts" not in body["data"]
+    for name in ("revenue", "profit", "inventory_value", "suggestions"):
+        assert body["meta"]["sections"][name]["status"] == "ok"
+        assert name in body["data"]
+
+    # Partial results are never replayed from the response cache
+    assert response.headers["Cache-Control"] == "no-store"
+    again = client.get(DASHBOARD, params={"timeout": 0.2})
+    assert again.headers.get("X-Cache") != "HIT"
+    assert again.json()["status"] == "partial"
@@ -0,0 +1,115 @@
+"""stock_balance and sales_daily_sku stay equal to aggregates of the raw tables."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal
+from app.database.models import SalesTransaction, StockReceipt
+from tests.conftest import SALES, TODAY, run_loader, write_sales
+
+STOCK_BALANCE_MISMATCHES = """
+    WITH r AS (SELECT sku_id, SUM(quantity_received) AS qty FROM stock_receipts GROUP BY sku_id),
+         s AS (SELECT sku_id, SUM(quantity_sold) AS qty FROM sales_transactions GROUP BY sku_id),
+         skus AS (SELECT sku_id FROM r UNION SELECT sku_id FROM s)
+    SELECT skus.sku_id
+    FROM skus
+    LEFT JOIN r ON r.sku_id = skus.sku_id
+    LEFT JOIN s ON s.sku_id = skus.sku_id
+    LEFT JOIN stock_balance b ON b.sku_id = skus.sku_id
+    WHERE b.sku_id IS NULL
+       OR b.received != COALESCE(r.qty, 0)
+       OR b.sold != COALESCE(s.qty, 0)
+       OR b.on_hand != COALESCE(r.qty, 0) - COALESCE(s.qty, 0)
+"""
+
+SALES_ROLLUP_MISMATCHES = """
+    WITH raw AS (
+        SELECT sku_id, DATE(transaction_date) AS day, SUM(quantity_sold) AS qty,
+               SUM(quantity_sold * sale_price) AS revenue, COUNT(*) AS txn_count
+        FROM sales_transactions GROUP BY sku_id, DATE(transaction_date)
+    )
+    SELECT raw.sku_id, raw.day FROM raw
+    LEFT JOIN sales_daily_sku d ON d.sku_id = raw.sku_id AND d.day = raw.day
+    WHERE d.sku_id IS NULL OR d.qty != raw.qty OR d.txn_count != raw.txn_count
+       OR ABS(d.revenue - raw.revenue) > 0.01
+    UNION ALL
+    SELECT d.sku_id, d.day FROM sales_daily_sku d
+    LEFT JOIN raw ON raw.sku_id = d.sku_id AND raw.day = d.day
+    WHERE raw.sku_id IS NULL
+"""
+
+
+def assert_derived_tables_match(engine):
+    with engine.connect() as conn:
+        assert conn.execute(text(STOCK_BALANCE_MISMATCHES)).all() == []
+        assert conn.execute(text(SALES_ROLLUP_MISMATCHES)).all() == []
+
+
+def test_full_load(dataset, empty_db):
+    assert_derived_tables_match(empty_db)
+
+
+def test_incremental_load(dataset, empty_db):
+    write_sales(dataset, SALES + [(TODAY, "SKU003", 2, 510.0, False), (TODAY, "SKU004", 7, 25.0, False)])
+    run_loader(incremental=True)
+    assert_derived_tables_match(empty_db)
+
+
+@pytest.fixture
+def db(dataset):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_orm_inserts(db, empty_db):
+    db.add(StockReceipt(sku_id="SKU002", quantity_received=10, supplier_id="V9", unit_cost=150.0,
+                        receipt_date=datetime.now()))
+    db.add(SalesTransaction(sku_id="SKU004", quantity_sold=3, sale_price=25.0, transaction_date=datetime.now()))
+    db.commit()
+    assert_derived_tables_match(empty_db)
+
+
+def test_orm_quantity_and_price_updates(db, empty_db):
+    sale = db.query(SalesTransaction).filter(SalesTransaction.sku_id == "SKU001").first()
+    receipt = db.query(StockReceipt).filter(StockReceipt.sku_id == "SKU001").first()
+    db.commit()  # expire the instances: old values are loaded on change
+
+    sale.quantity_sold += 5
+    sale.sale_price = 95.0
+    receipt.quantity_received -= 20
+    db.commit()
+    assert_derived_tables_match(empty_db)
+
+
+def test_orm_moves_to_another_sku_and_day(db, empty_db):
+    sale = db.query(SalesTransaction).filter(SalesTransaction.sku_id == "SKU002").first()
+    receipt = db.query(StockReceipt).filter(StockReceipt.sku_id == "SKU003").first()
+    db.commit()
+
+    sale.sku_id = "SKU004"
+    sale.transaction_date = sale.transaction_date - timedelta(days=1)
+    receipt.sku_id = "SKU004"
+    db.commit()
+    assert_derived_tables_match(empty_db)
+
+
+def test_orm_deletes(db, empty_db):
+    db.delete(db.query(SalesTransaction).filter(SalesTransaction.sku_id == "SKU003").first())
+    db.delete(db.query(StockReceipt).filter(StockReceipt.sku_id == "SKU004").first())
+    db.commit()
+    assert_derived_tables_match(empty_db)
+
+
+def test_inventory_value_ignores_sales_before_first_receipt(client, db):
+    paths = ["/api/v1/analytics/inventory-value", "/api/v1/analytics/inventory-value/products"]
+    before = [client.get(path).json()["data"] for path in paths]
+
+    # Sold before any stock was tracked (first receipt is 40 days ago)
+    db.add(SalesTransaction(sku_id="SKU001", quantity_sold=9, sale_price=100.0,
+                            transaction_date=datetime.now() - timedelta(days=45)))
+    db.commit()
+
+    assert [client.get(path).json()["data"] for path in paths] == before
@@ -0,0 +1,67 @@
+"""DynamicPricingEngine.recommend_prices_batch gives the same answers as recommend_price."""
+
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal
+from app.database.models import SalesTransaction
+from app.services.analytics.dynamic_pricing import DynamicPricingEngine
+from tests.conftest import PRODUCTS
+
+SKUS = [p[0] for p in PRODUCTS]
+
+
+@pytest.fixture
+def db(dataset):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def assert_same(single, batch):
+    assert single.keys() == batch.keys()
+    for key, value in single.items():
+        if isinstance(value, float) and not math.isinf(value):
+            assert batch[key] == pytest.approx(value, abs=0.011), key
+        else:
+            assert batch[key] == value, key
+
+
+def assert_parity(db, **params):
+    batch = DynamicPricingEngine.recommend_prices_batch(db, sku_ids=SKUS + ["NOPE"], **params)
+    single = [DynamicPricingEngine.recommend_price(db, sku, **params) for sku in SKUS + ["NOPE"]]
+    assert [r["sku_id"] for r in batch] == SKUS + ["NOPE"]
+    for one, many in zip(single, batch):
+        assert_same(one, many)
+
+
+@pytest.mark.parametrize("lookback_days", [0, 1, 7, 90])
+@pytest.mark.parametrize("clearance_days,margin_floor", [(14, 0.05), (3, 0.0), (60, 0.3)])
+def test_batch_matches_single(db, lookback_days, clearance_days, margin_floor):
+    assert_parity(db, clearance_days=clearance_days, margin_floor=margin_floor, lookback_days=lookback_days)
+
+
+def test_batch_matches_single_without_elasticity_store(db):
+    db.execute(text("DELETE FROM elasticity_estimates"))
+    db.commit()
+    for lookback_days in (0, 90):
+        assert_parity(db, clearance_days=14, margin_floor=0.05, lookback_days=lookback_days)
+
+
+def test_batch_matches_single_for_sold_out_and_stale_skus(db):
+    # SKU003 sold out; SKU004's only sale is outside a 7 day window
+    db.add(SalesTransaction(sku_id="SKU003", quantity_sold=48, sale_price=520.0, transaction_date=datetime.now()))
+    db.add(SalesTransaction(sku_id="SKU004", quantity_sold=6, sale_price=24.0,
+                            transaction_date=datetime.now() - timedelta(days=30)))
+    db.commit()
+    assert_parity(db, clearance_days=14, margin_floor=0.05, lookback_days=7)
+
+
+def test_category_batch_matches_single(db):
+    batch = DynamicPricingEngine.recommend_prices_batch(db, category="Beverages")
+    assert [r["sku_id"] for r in batch] == ["SKU001", "SKU002"]
+    for result in batch:
+        assert_same(DynamicPricingEngine.recommend_price(db, result["sku_id"], 14, 0.05), result)
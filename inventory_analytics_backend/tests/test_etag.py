@@ -0,0 +1,107 @@
+"""Conditional GET (app/middleware/etag.py): ETags follow the dataset version, not the clock."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.database.connection import SessionLocal
+from app.database.models import SalesTransaction
+from app.middleware import response_cache
+
+UNDATED = "/api/v1/analytics/inventory-value"
+DATED = "/api/v1/analytics/forecast?sku_id=SKU001&days=7"
+SLIDING = "/api/v1/analytics/revenue"
+
+
+@pytest.fixture
+def later(monkeypatch):
+    """Move the clock seen by the cache / ETag middleware forward."""
+
+    def move(minutes=0, days=0):
+        now = datetime.now() + timedelta(minutes=minutes, days=days)
+        today = date.today() + timedelta(days=days)
+
+        class Clock(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return now
+
+        class Calendar(date):
+            @classmethod
+            def today(cls):
+                return today
+
+        monkeypatch.setattr(response_cache, "datetime", Clock)
+        monkeypatch.setattr(response_cache, "date", Calendar)
+
+    return move
+
+
+def _revalidate(client, url, tag):
+    return client.get(url, headers={"If-None-Match": tag})
+
+
+def test_matching_etag_is_304(client, dataset):
+    first = client.get(UNDATED)
+    assert first.status_code == 200
+    tag = first.headers["ETag"]
+
+    again = _revalidate(client, UNDATED, tag)
+    assert again.status_code == 304
+    assert again.headers["ETag"] == tag
+    assert again.content == b""
+
+
+def test_etag_survives_more_than_a_minute(client, dataset, later):
+    tag = client.get(UNDATED).headers["ETag"]
+    dated_tag = client.get(DATED).headers["ETag"]
+
+    later(minutes=5)
+    assert _revalidate(client, UNDATED, tag).status_code == 304
+    assert _revalidate(client, DATED, dated_tag).status_code == 304
+
+
+def test_dated_endpoints_roll_over_daily(client, dataset, later):
+    tag = client.get(UNDATED).headers["ETag"]
+    dated_tag = client.get(DATED).headers["ETag"]
+
+    later(days=1)
+    assert _revalidate(client, UNDATED, tag).status_code == 304
+    rolled = _revalidate(client, DATED, dated_tag)
+    assert rolled.status_code == 200
+    assert rolled.headers["ETag"] != dated_tag
+
+
+def test_new_dataset_version_changes_etag(client, dataset):
+    tag = client.get(UNDATED).headers["ETag"]
+
+    db = SessionLocal()
+    db.add(SalesTransaction(sku_id="SKU001", quantity_sold=1, sale_price=100.0, transaction_date=datetime.now()))
+    db.commit()
+    db.close()
+
+    changed = _revalidate(client, UNDATED, tag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != tag
+    assert _revalidate(client, UNDATED, changed.headers["ETag"]).status_code == 304
+
+
+def test_etag_ignores_query_order_and_blank_values(client, dataset):
+    tag = client.get("/api/v1/analytics/forecast?days=7&sku_id=SKU001").headers["ETag"]
+    assert _revalidate(client, "/api/v1/analytics/forecast?sku_id=SKU001&model=&days=7", tag).status_code == 304
+
+
+def test_sliding_windows_have_no_etag(client, dataset):
+    # The default window ends at now(): the result changes without a new dataset version
+    response = client.get(SLIDING)
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert _revalidate(client, SLIDING, '"anything"').status_code == 200
+
+
+def test_explicit_window_keeps_its_etag(client, dataset, later):
+    url = f"{SLIDING}?start_date=2026-01-01T00:00:00&end_date=2026-02-01T00:00:00"
+    tag = client.get(url).headers["ETag"]
+
+    later(days=1)
+    assert _revalidate(client, url, tag).status_code == 304
@@ -0,0 +1,98 @@
+"""Forecast values on the fixture dataset and on fixed demand matrices."""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.database.connection import SessionLocal
+from app.services.analytics.forecasting import HISTORY_DAYS, ForecastingEngine
+from tests.conftest import TODAY
+
+# SKU001 in the fixture: 2 units on odd days ago, 3 on even days ago (days 1..14)
+SKU001_LAST_7 = [2, 3, 2, 3, 2, 3, 2]  # 7 days ago .. yesterday
+
+
+@pytest.fixture
+def db(dataset):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_sales_matrix_covers_complete_days_only(db):
+    sku_ids, days, matrix = ForecastingEngine.sales_matrix(db)
+
+    assert sku_ids == ["SKU001", "SKU002", "SKU003"]
+    assert len(days) == HISTORY_DAYS
+    assert days[-1] == pd.Timestamp(TODAY - timedelta(days=1))
+    assert days[0] == pd.Timestamp(TODAY - timedelta(days=HISTORY_DAYS))
+    assert matrix.shape == (3, HISTORY_DAYS)
+
+    # Today's 50 units (day still in progress) are not in the history
+    assert matrix[0, -7:].tolist() == SKU001_LAST_7
+    assert matrix[0].sum() == 7 * 2 + 7 * 3
+    assert matrix[1].sum() == 7 * 4
+    assert matrix[2].tolist().count(2) == 1  # SKU003: two identical sales on one day
+
+
+def test_moving_average_forecast(db):
+    result = ForecastingEngine.forecast_sku(db, "SKU001", forecast_days=5)
+
+    expected_average = round(sum(SKU001_LAST_7) / 7, 2)
+    assert result["average_daily_sales"] == expected_average
+    assert [f["forecast_quantity"] for f in result["forecast"]] == [round(expected_average)] * 5
+    assert result["forecast"][0]["date"] == (TODAY + timedelta(days=1)).isoformat()
+
+
+def test_unknown_sku_has_no_forecast(db):
+    assert ForecastingEngine.forecast_sku(db, "SKU004")["forecast_available"] is False
+
+
+def test_forecast_endpoint(client, dataset):
+    response = client.get("/api/v1/analytics/forecast", params={"sku_id": "SKU001", "days": 3})
+    assert response.status_code == 200
+    assert [f["forecast_quantity"] for f in response.json()["data"]["forecast"]] == [2, 2, 2]
+
+
+@pytest.mark.parametrize("days", [0, -5])
+def test_forecast_horizon_must_be_positive(client, dataset, days):
+    assert client.get("/api/v1/analytics/forecast", params={"days": days}).status_code == 422
+    assert client.get("/api/v1/analytics/forecast", params={"days": days, "format": "arrow"}).status_code == 422
+
+
+def test_croston_and_sba():
+    # 4 units every other day: size 4, interval 2
+    matrix = np.array([[0, 4] * 10, [0] * 20], dtype=float)
+
+    rate, forecast = ForecastingEngine.run_model(matrix, 3, "croston")
+    assert rate.tolist() == [2.0, 0.0]
+    assert forecast.tolist() == [[2.0] * 3, [0.0] * 3]
+
+    rate, _ = ForecastingEngine.run_model(matrix, 3, "sba")
+    assert rate.tolist() == [1.9, 0.0]
+
+
+def test_holt_winters_on_flat_and_weekly_demand():
+    flat = np.full((1, 28), 5.0)
+    average, forecast = ForecastingEngine.run_model(flat, 7, "holt_winters")
+    assert average.tolist() == [5.0]
+    assert forecast.tolist() == [[5.0] * 7]
+
+    week = np.array([[1, 1, 1, 1, 1, 8, 8] * 4], dtype=float)
+    _, forecast = ForecastingEngine.run_model(week, 7, "holt_winters")
+    # Same weekly shape: the next two days are the next weekend
+    assert forecast[0].tolist() == [1.0, 1.0, 1.0, 1.0, 1.0, 8.0, 8.0]
+
+
+def test_holt_winters_short_history_falls_back_to_moving_average():
+    matrix = np.array([[1, 2, 3, 4, 5, 6, 7, 8]], dtype=float)
+    average, forecast = ForecastingEngine.run_model(matrix, 2, "holt_winters")
+    assert average.tolist() == [5.0]
+    assert forecast.tolist() == [[5.0, 5.0]]
+
+
+def test_unknown_model():
+    with pytest.raises(ValueError):
+        ForecastingEngine.run_model(np.zeros((1, 7)), 1, "arima")
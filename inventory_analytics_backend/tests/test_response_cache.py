@@ -0,0 +1,55 @@
+"""Response cache (app/middleware/response_cache.py): hits, dataset version misses, LRU eviction."""
+
+import pytest
+
+from app.middleware.response_cache import response_cache
+from tests.conftest import SALES, TODAY, current_version, run_loader, write_sales
+
+INVENTORY = "/api/v1/analytics/inventory-value"
+
+
+def x_cache(client, url):
+    return client.get(url).headers.get("X-Cache")
+
+
+def test_repeat_request_is_a_hit(client, dataset):
+    first = client.get(INVENTORY)
+    assert first.headers["X-Cache"] == "MISS"
+
+    again = client.get(INVENTORY)
+    assert again.headers["X-Cache"] == "HIT"
+    assert again.content == first.content
+
+
+def test_loader_run_misses_with_new_data(client, dataset):
+    before = client.get(INVENTORY).json()["data"]
+    assert x_cache(client, INVENTORY) == "HIT"
+
+    version = current_version()
+    write_sales(dataset, SALES + [(TODAY, "SKU002", 5, 200.0, False)])
+    run_loader(incremental=True)
+    assert current_version() > version
+
+    after = client.get(INVENTORY)
+    assert after.headers["X-Cache"] == "MISS"
+    assert after.json()["data"]["total_quantity"] == before["total_quantity"] - 5
+
+
+@pytest.fixture
+def two_entries(monkeypatch):
+    monkeypatch.setattr(response_cache, "max_entries", 2)
+
+
+def test_least_recently_used_entry_is_evicted(client, dataset, two_entries):
+    urls = [f"{INVENTORY}/products?limit={n}" for n in (1, 2, 3)]
+    evictions = response_cache.evictions
+
+    assert x_cache(client, urls[0]) == "MISS"
+    assert x_cache(client, urls[1]) == "MISS"
+    assert x_cache(client, urls[0]) == "HIT"  # urls[1] is now the oldest
+    assert x_cache(client, urls[2]) == "MISS"
+
+    assert response_cache.stats()["entries"] == 2
+    assert response_cache.evictions == evictions + 1
+    assert x_cache(client, urls[0]) == "HIT"
+    assert x_cache(client, urls[1]) == "MISS"